@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""Compare pytest-benchmark results against the stored JSON baselines.
+
+Each benchmark's median time and tracemalloc peak are checked against
+benchmarks/baselines/pipeline_<scale>.json; anything slower or larger than the
+baseline by more than the tolerance is reported and the command exits 1.
+
+Usage:
+    pytest benchmarks/ --benchmark-json=bench_output.json
+    python3 benchmarks/compare.py bench_output.json            # check
+    python3 benchmarks/compare.py bench_output.json --update   # record new baselines
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+BASELINE_DIR = Path(__file__).resolve().parent / "baselines"
+DEFAULT_TOLERANCE = {"time": 0.30, "memory": 0.20}
+
+
+def load_results(path: Path) -> dict[str, dict[str, dict]]:
+    """Return {scale: {benchmark name: {median_s, peak_memory_kib}}} from a pytest-benchmark JSON file."""
+    data = json.loads(path.read_text(encoding="utf-8"))
+    results: dict[str, dict[str, dict]] = {}
+    for bench in data["benchmarks"]:
+        scale = bench.get("extra_info", {}).get("scale", "small")
+        results.setdefault(scale, {})[bench["name"]] = {
+            "median_s": bench["stats"]["median"],
+            "peak_memory_kib": bench.get("extra_info", {}).get("peak_memory_kib"),
+        }
+    return results
+
+
+def compare(current: dict[str, dict], baseline: dict) -> list[str]:
+    """Return regression messages for one scale (empty when within tolerance)."""
+    tolerance = {**DEFAULT_TOLERANCE, **baseline.get("tolerance", {})}
+    problems = []
+    for name, base in baseline["benchmarks"].items():
+        result = current.get(name)
+        if result is None:
+            problems.append(f"{name}: missing from results")
+            continue
+        limit = base["median_s"] * (1 + tolerance["time"])
+        if result["median_s"] > limit:
+            problems.append(
+                f"{name}: median {result['median_s'] * 1000:.3f} ms > baseline "
+                f"{base['median_s'] * 1000:.3f} ms (+{tolerance['time']:.0%})"
+            )
+        if base.get("peak_memory_kib") and result.get("peak_memory_kib"):
+            limit = base["peak_memory_kib"] * (1 + tolerance["memory"])
+            if result["peak_memory_kib"] > limit:
+                problems.append(
+                    f"{name}: peak memory {result['peak_memory_kib']:.0f} KiB > baseline "
+                    f"{base['peak_memory_kib']:.0f} KiB (+{tolerance['memory']:.0%})"
+                )
+    return problems
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("results", type=Path, help="JSON written by --benchmark-json")
+    parser.add_argument("--update", action="store_true", help="Overwrite the baselines with these results")
+    args = parser.parse_args()
+
+    status = 0
+    for scale, current in load_results(args.results).items():
+        baseline_path = BASELINE_DIR / f"pipeline_{scale}.json"
+        if args.update:
+            previous = json.loads(baseline_path.read_text()) if baseline_path.exists() else {}
+            baseline = {"tolerance": previous.get("tolerance", DEFAULT_TOLERANCE), "benchmarks": current}
+            baseline_path.parent.mkdir(parents=True, exist_ok=True)
+            baseline_path.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+            print(f"Baseline written to {baseline_path}")
+            continue
+        if not baseline_path.exists():
+            print(f"No baseline for scale {scale!r} ({baseline_path}); run with --update first")
+            status = 1
+            continue
+        problems = compare(current, json.loads(baseline_path.read_text()))
+        for problem in problems:
+            print(f"REGRESSION [{scale}] {problem}")
+        if not problems:
+            print(f"[{scale}] {len(current)} benchmarks within baseline")
+        status = status or (1 if problems else 0)
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
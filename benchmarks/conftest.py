@@ -0,0 +1,58 @@
+# conftest.py
+"""Shared fixtures for the benchmark suite (run with `pytest benchmarks/`)."""
+
+import sys
+import tracemalloc
+from collections.abc import Callable
+from pathlib import Path
+
+import pytest
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root / "src"))
+sys.path.insert(0, str(Path(__file__).parent))
+
+# Sizes per --bench-scale. "full" matches a multi-year, many-base backfill.
+SCALES = {
+    "small": {"payloads": 200, "wide_currencies": 1_000, "rows": 100_000},
+    "full": {"payloads": 5_000, "wide_currencies": 10_000, "rows": 1_000_000},
+}
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--bench-scale",
+        choices=sorted(SCALES),
+        default="small",
+        help="Size of the synthetic workloads (default: small)",
+    )
+
+
+@pytest.fixture(scope="session")
+def scale(request) -> dict[str, int]:
+    return SCALES[request.config.getoption("--bench-scale")]
+
+
+def peak_memory_kib(func: Callable[[], object]) -> float:
+    """Run func once under tracemalloc and return its peak traced memory in KiB."""
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return round(peak / 1024, 1)
+
+
+@pytest.fixture
+def measure(benchmark, request):
+    """Benchmark func and attach its tracemalloc peak to the saved results."""
+
+    def run(func: Callable[[], object], rounds: int | None = None):
+        benchmark.extra_info["scale"] = request.config.getoption("--bench-scale")
+        benchmark.extra_info["peak_memory_kib"] = peak_memory_kib(func)
+        if rounds is None:
+            return benchmark(func)
+        return benchmark.pedantic(func, rounds=rounds, iterations=1)
+
+    return run
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""Drive the real extract code against the mock API and report latency percentiles.
+
+Starts a MockApiServer in-process (or targets --url) and calls
+extract.fetch_exchange_rates (plus payload decoding) from a thread pool, then prints throughput and
+p50/p90/p99 latency. By default calls go through the production retry policy,
+so injected errors show up as retry-inflated tail latency; --single-attempt
+bypasses the retry decorator to measure raw request cost.
+
+Usage:
+    python3 benchmarks/extract_load_test.py --requests 500 --concurrency 8 --latency-ms 20 --error-rate 0.01
+"""
+
+import argparse
+import json
+import logging
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from mock_api_server import MockApiConfig, MockApiServer
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return float("nan")
+    rank = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def run_load_test(url: str, requests: int, concurrency: int, single_attempt: bool = False) -> dict:
+    """Fetch url `requests` times with `concurrency` workers and summarise the results."""
+    from extract import fetch_exchange_rates
+    from json_backend import decode_payload
+
+    fetch = fetch_exchange_rates
+    if single_attempt:
+        # Unwrap @timed and @retry to time exactly one HTTP attempt per call
+        while hasattr(fetch, "__wrapped__"):
+            fetch = fetch.__wrapped__
+
+    def one_call(_: int) -> tuple[float, bool]:
+        start = time.perf_counter()
+        try:
+            decode_payload(fetch(url))
+            ok = True
+        except Exception:
+            ok = False
+        return time.perf_counter() - start, ok
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one_call, range(requests)))
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency for latency, _ in results)
+    failures = sum(1 for _, ok in results if not ok)
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "failures": failures,
+        "elapsed_seconds": elapsed,
+        "throughput_rps": requests / elapsed if elapsed else float("inf"),
+        "latency_ms": {
+            "mean": statistics.fmean(latencies) * 1000,
+            "p50": percentile(latencies, 50) * 1000,
+            "p90": percentile(latencies, 90) * 1000,
+            "p99": percentile(latencies, 99) * 1000,
+            "max": latencies[-1] * 1000,
+        },
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="Target URL; default starts an in-process mock server")
+    parser.add_argument("--base", default="USD")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--single-attempt", action="store_true", help="Bypass the retry decorator")
+    parser.add_argument("--currencies", type=int)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--json", type=Path, help="Also write the report to this file")
+    parser.add_argument("--verbose", action="store_true", help="Show the extract module's per-request logging")
+    args = parser.parse_args()
+
+    # Injected errors would otherwise print one log line per failed request
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.CRITICAL)
+
+    server = None
+    url = args.url
+    if url is None:
+        config = MockApiConfig(
+            currencies=args.currencies,
+            latency_ms=args.latency_ms,
+            jitter_ms=args.jitter_ms,
+            error_rate=args.error_rate,
+            rate_limit_rate=args.rate_limit_rate,
+        )
+        server = MockApiServer(config).start()
+        url = f"{server.base_url}/TEST-KEY/latest/{args.base}"
+
+    try:
+        report = run_load_test(url, args.requests, args.concurrency, args.single_attempt)
+    finally:
+        if server is not None:
+            report_status = dict(sorted(server.status_counts.items()))
+            server.stop()
+
+    if server is not None:
+        report["server_status_counts"] = report_status
+    lat = report["latency_ms"]
+    print(
+        f"{report['requests']} requests x{report['concurrency']} in {report['elapsed_seconds']:.2f}s "
+        f"-> {report['throughput_rps']:.1f} req/s, {report['failures']} failed"
+    )
+    print(
+        f"latency ms: mean={lat['mean']:.1f} p50={lat['p50']:.1f} p90={lat['p90']:.1f} "
+        f"p99={lat['p99']:.1f} max={lat['max']:.1f}"
+    )
+    if "server_status_counts" in report:
+        print(f"server responses: {report['server_status_counts']}")
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
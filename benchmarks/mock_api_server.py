@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""Local stand-in for the exchange-rate provider's HTTP API.
+
+Serves ``.../latest/<BASE>`` and ``.../history/<BASE>/<YYYY>/<MM>/<DD>`` with
+synthetic payloads (see synthetic.py) and can inject latency, server errors and
+429 responses carrying ``Retry-After``. Any path prefix is accepted, so the
+pipeline's normal URL construction works when ``api.base_url`` points here:
+
+    python3 benchmarks/mock_api_server.py --port 8099 --latency-ms 50 --error-rate 0.05
+    # configs: base_url: http://127.0.0.1:8099/v6
+"""
+
+import argparse
+import random
+import re
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+import json_backend
+from synthetic import generate_payload
+
+LATEST = re.compile(r"/latest/(?P<base>[A-Za-z]{3})/?$")
+HISTORY = re.compile(r"/history/(?P<base>[A-Za-z]{3})/(?P<y>\d{4})/(?P<m>\d{1,2})/(?P<d>\d{1,2})/?$")
+
+
+@dataclass
+class MockApiConfig:
+    """Behaviour knobs for the mock server."""
+
+    currencies: int | None = None  # payload width; None = the real sample's ~160
+    latency_ms: float = 0.0  # mean added latency per request
+    jitter_ms: float = 0.0  # uniform +/- jitter around latency_ms
+    error_rate: float = 0.0  # fraction of requests answered with HTTP 500
+    rate_limit_rate: float = 0.0  # fraction of requests answered with HTTP 429
+    retry_after: int = 1  # Retry-After seconds sent with 429s
+    seed: int = 0
+
+
+class MockApiServer:
+    """Threaded mock provider; use as a context manager or call start()/stop()."""
+
+    def __init__(self, config: MockApiConfig | None = None, host: str = "127.0.0.1", port: int = 0) -> None:
+        self.config = config or MockApiConfig()
+        self._rng = random.Random(self.config.seed)
+        self._rng_lock = threading.Lock()
+        self._cache: dict[tuple, bytes] = {}
+        self._cache_lock = threading.Lock()
+        self.request_count = 0
+        self.status_counts: dict[int, int] = {}
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        """URL to use as ``api.base_url`` (the API key segment follows it)."""
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v6"
+
+    def start(self) -> "MockApiServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="mock-api", daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self) -> None:
+        """Serve in the current thread until interrupted."""
+        try:
+            self._httpd.serve_forever()
+        finally:
+            self._httpd.server_close()
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "MockApiServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def _random(self) -> float:
+        with self._rng_lock:
+            return self._rng.random()
+
+    def _latest_body(self, base: str) -> bytes:
+        key = ("latest", base)
+        with self._cache_lock:
+            if key not in self._cache:
+                payload = generate_payload(self.config.currencies, base, seed=self.config.seed)
+                self._cache[key] = json_backend.dumps(payload)
+            return self._cache[key]
+
+    def _history_body(self, base: str, day: date) -> bytes:
+        key = ("history", base, day)
+        with self._cache_lock:
+            if key not in self._cache:
+                unix = int(datetime(day.year, day.month, day.day, tzinfo=timezone.utc).timestamp())
+                latest = generate_payload(self.config.currencies, base, unix, seed=day.toordinal())
+                payload = {
+                    "result": "success",
+                    "documentation": latest["documentation"],
+                    "terms_of_use": latest["terms_of_use"],
+                    "year": day.year,
+                    "month": day.month,
+                    "day": day.day,
+                    "base_code": base,
+                    "conversion_rates": latest["conversion_rates"],
+                }
+                self._cache[key] = json_backend.dumps(payload)
+            return self._cache[key]
+
+    def _handler_class(self) -> type[BaseHTTPRequestHandler]:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):  # noqa: A002 - silence per-request stderr logging
+                pass
+
+            def _send(self, status: int, body: bytes, headers: dict[str, str] | None = None) -> None:
+                with server._rng_lock:
+                    server.request_count += 1
+                    server.status_counts[status] = server.status_counts.get(status, 0) + 1
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                cfg = server.config
+                if cfg.latency_ms or cfg.jitter_ms:
+                    jitter = (server._random() * 2 - 1) * cfg.jitter_ms
+                    time.sleep(max(0.0, cfg.latency_ms + jitter) / 1000)
+
+                roll = server._random()
+                if roll < cfg.rate_limit_rate:
+                    body = b'{"result": "error", "error-type": "quota-reached"}'
+                    return self._send(429, body, {"Retry-After": str(cfg.retry_after)})
+                if roll < cfg.rate_limit_rate + cfg.error_rate:
+                    return self._send(500, b'{"result": "error", "error-type": "internal"}')
+
+                path = self.path.split("?", 1)[0]
+                if match := LATEST.search(path):
+                    return self._send(200, server._latest_body(match["base"].upper()))
+                if match := HISTORY.search(path):
+                    try:
+                        day = date(int(match["y"]), int(match["m"]), int(match["d"]))
+                    except ValueError:
+                        return self._send(400, b'{"result": "error", "error-type": "malformed-request"}')
+                    return self._send(200, server._history_body(match["base"].upper(), day))
+                return self._send(404, b'{"result": "error", "error-type": "unsupported-code"}')
+
+        return Handler
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--currencies", type=int, help="Currencies per payload (default: sample width)")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    config = MockApiConfig(
+        currencies=args.currencies,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        retry_after=args.retry_after,
+        seed=args.seed,
+    )
+    server = MockApiServer(config, args.host, args.port)
+    print(f"Mock API listening on {server.base_url} (Ctrl-C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""Query benchmark showing partition pruning on the partitioned rates table.
+
+Builds two scratch tables in the configured MySQL database, one from
+sql/create_rates_table.sql's layout and one from
+sql/create_rates_table_partitioned.sql, fills both with the same synthetic
+history, then for a set of typical range queries prints the partitions EXPLAIN
+says are read and the median query time on each table.
+
+Needs a reachable MySQL server (.env credentials); the scratch tables are
+dropped afterwards unless --keep is given.
+
+    python3 benchmarks/partition_pruning.py --months 24 --currencies 160 --repeat 5
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from config import load_database_config, load_environment
+from db_utilities import connect_to_mysql, load_sql_template
+from partition_maintenance import add_months, build_reorganize_sql
+from synthetic import currency_codes
+
+PLAIN = "bench_rates_plain"
+PARTITIONED = "bench_rates_partitioned"
+
+COLUMNS = (
+    "base_code, target_code, rate, time_last_update_utc, time_next_update_utc, "
+    "time_last_update_unix, time_next_update_unix"
+)
+
+
+def create_tables(cursor, start: date, months: int) -> None:
+    plain_ddl = load_sql_template("create_rates_table.sql").replace("CREATE TABLE rates", f"CREATE TABLE {PLAIN}")
+    cursor.execute(f"DROP TABLE IF EXISTS {PLAIN}, {PARTITIONED}")
+    cursor.execute(plain_ddl)
+    cursor.execute(load_sql_template("create_rates_table_partitioned.sql").format(table=PARTITIONED))
+    cursor.execute(build_reorganize_sql(PARTITIONED, [add_months(start, i) for i in range(months)]))
+
+
+def seed(conn, start: date, months: int, currencies: int) -> int:
+    """Insert one snapshot per day of `currencies` pairs into both tables."""
+    codes = currency_codes(currencies, [])
+    day = datetime(start.year, start.month, 1, tzinfo=timezone.utc)
+    end = datetime(*add_months(start, months).timetuple()[:3], tzinfo=timezone.utc)
+    cursor = conn.cursor()
+    total = 0
+    while day < end:
+        nxt = day + timedelta(days=1)
+        rows = [
+            (
+                "USD",
+                code,
+                1 + i / 1000,
+                day.replace(tzinfo=None),
+                nxt.replace(tzinfo=None),
+                int(day.timestamp()),
+                int(nxt.timestamp()),
+            )
+            for i, code in enumerate(codes)
+        ]
+        for table in (PLAIN, PARTITIONED):
+            cursor.executemany(f"INSERT INTO {table} ({COLUMNS}) VALUES (%s, %s, %s, %s, %s, %s, %s)", rows)
+        total += len(rows)
+        day = nxt
+    conn.commit()
+    cursor.close()
+    return total
+
+
+def explain_partitions(cursor, sql: str, params: tuple) -> str:
+    cursor.execute("EXPLAIN " + sql, params)
+    names = [d[0] for d in cursor.description]
+    row = cursor.fetchone()
+    cursor.fetchall()
+    return row[names.index("partitions")] or "-"
+
+
+def time_query(cursor, sql: str, params: tuple, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        cursor.execute(sql, params)
+        cursor.fetchall()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--months", type=int, default=24)
+    parser.add_argument("--currencies", type=int, default=160)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch tables")
+    args = parser.parse_args()
+
+    load_environment()
+    conn = connect_to_mysql(load_database_config())
+    start = add_months(date.today().replace(day=1), -args.months)
+    cursor = conn.cursor()
+    try:
+        create_tables(cursor, start, args.months)
+        rows = seed(conn, start, args.months, args.currencies)
+        print(f"Seeded {rows} rows per table over {args.months} months")
+
+        last_month = add_months(start, args.months - 1)
+        queries = {
+            "one month, all pairs": (
+                "SELECT * FROM {t} WHERE time_last_update_utc >= %s AND time_last_update_utc < %s",
+                (last_month, add_months(last_month, 1)),
+            ),
+            "one pair, one quarter": (
+                "SELECT rate FROM {t} WHERE base_code = %s AND target_code = %s "
+                "AND time_last_update_utc >= %s AND time_last_update_utc < %s",
+                ("USD", "AAB", add_months(last_month, -2), add_months(last_month, 1)),
+            ),
+            "daily count, one month": (
+                "SELECT DATE(time_last_update_utc), COUNT(*) FROM {t} "
+                "WHERE time_last_update_utc >= %s AND time_last_update_utc < %s GROUP BY 1",
+                (last_month, add_months(last_month, 1)),
+            ),
+        }
+        print(f"{'query':<26}{'partitions read':<40}{'plain ms':>10}{'partitioned ms':>16}")
+        for label, (template, params) in queries.items():
+            partitions = explain_partitions(cursor, template.format(t=PARTITIONED), params)
+            plain = time_query(cursor, template.format(t=PLAIN), params, args.repeat)
+            parted = time_query(cursor, template.format(t=PARTITIONED), params, args.repeat)
+            print(f"{label:<26}{partitions:<40}{plain * 1000:>10.2f}{parted * 1000:>16.2f}")
+    finally:
+        if not args.keep:
+            cursor.execute(f"DROP TABLE IF EXISTS {PLAIN}, {PARTITIONED}")
+        cursor.close()
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""Cold-start import benchmark for the ETL entry point.
+
+Runs ``python -X importtime -c "import main"`` in fresh interpreters, sums the
+per-module import times and reports the slowest modules. With --check the
+median is compared against benchmarks/baselines/startup.json and the script
+exits non-zero when it regresses past the allowed tolerance or when one of the
+lazily imported heavy dependencies shows up at startup again. Import times are
+machine specific, so record the baseline on the Pi that runs the pipeline.
+
+Usage:
+    python3 benchmarks/startup_importtime.py            # report only
+    python3 benchmarks/startup_importtime.py --check    # fail on regression
+    python3 benchmarks/startup_importtime.py --update   # record a new baseline
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+BASELINE_PATH = Path(__file__).resolve().parent / "baselines" / "startup.json"
+
+# Heavy dependencies that main.py must only import on the code path that needs them
+DEFAULT_FORBIDDEN = ["slack_sdk", "mysql", "requests"]
+
+
+def parse_importtime(stderr: str) -> dict[str, tuple[int, int]]:
+    """Parse -X importtime output into {module: (self_us, cumulative_us)}."""
+    modules: dict[str, tuple[int, int]] = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line.removeprefix("import time:").split("|", 2)
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+def measure_once(statement: str) -> tuple[float, dict[str, tuple[int, int]]]:
+    """Run one fresh interpreter and return (wall seconds, per-module import times)."""
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return time.perf_counter() - start, parse_importtime(result.stderr)
+
+
+def run_benchmark(statement: str, runs: int) -> dict:
+    """Measure startup `runs` times and summarise the median run."""
+    walls: list[float] = []
+    totals: list[int] = []
+    last_modules: dict[str, tuple[int, int]] = {}
+    for _ in range(runs):
+        wall, modules = measure_once(statement)
+        walls.append(wall)
+        totals.append(sum(self_us for self_us, _ in modules.values()))
+        last_modules = modules
+
+    slowest = sorted(last_modules.items(), key=lambda kv: kv[1][0], reverse=True)[:15]
+    return {
+        "statement": statement,
+        "runs": runs,
+        "median_wall_seconds": statistics.median(walls),
+        "median_import_us": int(statistics.median(totals)),
+        "modules": sorted(last_modules),
+        "slowest": [{"module": name, "self_us": s, "cumulative_us": c} for name, (s, c) in slowest],
+    }
+
+
+def check(result: dict, baseline: dict) -> list[str]:
+    """Return a list of regression messages (empty when within budget)."""
+    problems = []
+    tolerance = baseline.get("tolerance", 0.25)
+    budget = baseline["median_import_us"] * (1 + tolerance)
+    if result["median_import_us"] > budget:
+        problems.append(
+            f"median import time {result['median_import_us']} us exceeds baseline "
+            f"{baseline['median_import_us']} us (+{tolerance:.0%} = {budget:.0f} us)"
+        )
+    for forbidden in baseline.get("forbidden_modules", DEFAULT_FORBIDDEN):
+        if any(m == forbidden or m.startswith(forbidden + ".") for m in result["modules"]):
+            problems.append(f"{forbidden} is imported at startup")
+    return problems
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--statement", default="import main", help="Python statement to time")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--check", action="store_true", help="Compare against the stored baseline")
+    parser.add_argument("--update", action="store_true", help="Overwrite the stored baseline")
+    parser.add_argument("--json", type=Path, help="Also write the full result to this file")
+    args = parser.parse_args()
+
+    result = run_benchmark(args.statement, args.runs)
+    print(
+        f"{args.statement!r}: median wall {result['median_wall_seconds'] * 1000:.1f} ms, "
+        f"median imports {result['median_import_us'] / 1000:.1f} ms over {args.runs} runs"
+    )
+    for entry in result["slowest"]:
+        print(f"  {entry['self_us']:>8} us self {entry['cumulative_us']:>8} us cumulative  {entry['module']}")
+
+    if args.json:
+        args.json.write_text(json.dumps(result, indent=2), encoding="utf-8")
+
+    if args.update:
+        previous = json.loads(BASELINE_PATH.read_text()) if BASELINE_PATH.exists() else {}
+        baseline = {
+            "statement": args.statement,
+            "median_import_us": result["median_import_us"],
+            "tolerance": previous.get("tolerance", 0.25),
+            "forbidden_modules": previous.get("forbidden_modules", DEFAULT_FORBIDDEN),
+        }
+        BASELINE_PATH.write_text(json.dumps(baseline, indent=2) + "\n", encoding="utf-8")
+        print(f"Baseline written to {BASELINE_PATH}")
+
+    if args.check:
+        problems = check(result, json.loads(BASELINE_PATH.read_text()))
+        for problem in problems:
+            print(f"REGRESSION: {problem}")
+        return 1 if problems else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
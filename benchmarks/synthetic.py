@@ -0,0 +1,162 @@
+# synthetic.py
+"""Synthetic payload and row generators for the benchmark suite.
+
+Payloads are scaled up from the real ~160-currency data/raw/sample_rates.json:
+the real codes and rates come first, then made-up three-letter codes with
+rates jittered from the real ones, so payloads of any width keep a realistic
+shape.
+"""
+
+import csv
+import itertools
+import random
+import re
+import sqlite3
+import string
+from email.utils import format_datetime
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+import json_backend
+
+SAMPLE_PATH = Path(__file__).resolve().parent.parent / "data" / "raw" / "sample_rates.json"
+
+DAY_SECONDS = 86_400
+
+
+def load_sample() -> dict[str, Any]:
+    """Return the real sample payload."""
+    return json_backend.loads(SAMPLE_PATH.read_bytes())
+
+
+def currency_codes(count: int, seed_codes: list[str]) -> list[str]:
+    """Return `count` unique codes: the real ones first, then synthetic AAA, AAB, ..."""
+    codes = list(seed_codes[:count])
+    seen = set(codes)
+    for letters in itertools.product(string.ascii_uppercase, repeat=3):
+        if len(codes) >= count:
+            break
+        code = "".join(letters)
+        if code not in seen:
+            codes.append(code)
+            seen.add(code)
+    return codes
+
+
+def _utc_string(unix: int) -> str:
+    return format_datetime(datetime.fromtimestamp(unix, tz=timezone.utc))
+
+
+def generate_payload(
+    n_currencies: int | None = None,
+    base_code: str = "USD",
+    time_last_update_unix: int | None = None,
+    seed: int = 0,
+) -> dict[str, Any]:
+    """Return one payload shaped like the provider's `latest/<BASE>` response."""
+    sample = load_sample()
+    rng = random.Random(seed)
+    real = sample["conversion_rates"]
+    n_currencies = n_currencies or len(real)
+    real_rates = list(real.values())
+
+    rates = {}
+    for i, code in enumerate(currency_codes(n_currencies, list(real))):
+        base_rate = real.get(code, real_rates[i % len(real_rates)])
+        rates[code] = round(base_rate * rng.uniform(0.98, 1.02), 6) if code != base_code else 1
+
+    last = time_last_update_unix or sample["time_last_update_unix"]
+    payload = dict(sample)
+    payload.update(
+        {
+            "base_code": base_code,
+            "time_last_update_unix": last,
+            "time_last_update_utc": _utc_string(last),
+            "time_next_update_unix": last + DAY_SECONDS,
+            "time_next_update_utc": _utc_string(last + DAY_SECONDS),
+            "conversion_rates": rates,
+        }
+    )
+    return payload
+
+
+def generate_payloads(count: int, n_currencies: int | None = None, base_code: str = "USD") -> list[dict[str, Any]]:
+    """Return `count` payloads for consecutive days, as a backfill would see them."""
+    start = load_sample()["time_last_update_unix"] - count * DAY_SECONDS
+    return [generate_payload(n_currencies, base_code, start + i * DAY_SECONDS, seed=i) for i in range(count)]
+
+
+def generate_rows(n_rows: int, n_currencies: int | None = None) -> list[dict[str, Any]]:
+    """Return roughly n_rows transformed rows (whole payloads, so always a multiple of the width)."""
+    from transform import transform_rates
+
+    width = n_currencies or len(load_sample()["conversion_rates"])
+    rows: list[dict[str, Any]] = []
+    for payload in generate_payloads(max(1, -(-n_rows // width)), n_currencies):
+        rows.extend(transform_rates(payload))
+    return rows[:n_rows]
+
+
+class SqliteLoadDataConnection:
+    """Stand-in for a MySQL connection that executes `LOAD DATA LOCAL INFILE` against SQLite.
+
+    The CSV named in the statement is parsed and bulk-inserted with executemany,
+    which is close enough to the server-side work to benchmark the load path
+    without a MySQL server.
+    """
+
+    _LOAD_DATA = re.compile(
+        r"LOAD DATA LOCAL INFILE '(?P<path>[^']+)'\s+(?P<duplicates>IGNORE|REPLACE)?\s*INTO TABLE (?P<table>\w+)", re.I
+    )
+
+    def __init__(self, database: str = ":memory:") -> None:
+        self.conn = sqlite3.connect(database)
+
+    def cursor(self) -> "SqliteLoadDataCursor":
+        return SqliteLoadDataCursor(self)
+
+    def commit(self) -> None:
+        self.conn.commit()
+
+    def rollback(self) -> None:
+        self.conn.rollback()
+
+    def close(self) -> None:
+        """Keep the in-memory database alive between benchmark rounds."""
+
+
+class SqliteLoadDataCursor:
+    def __init__(self, owner: SqliteLoadDataConnection) -> None:
+        self.owner = owner
+        self.rowcount = 0
+
+    def execute(self, sql: str, params: tuple = ()) -> None:
+        match = SqliteLoadDataConnection._LOAD_DATA.search(sql)
+        if not match:
+            # Timestamps are stored as the CSV text, so compare against the same text
+            params = tuple(str(p) if isinstance(p, datetime) else p for p in params)
+            self._result = self.owner.conn.execute(sql.replace("%s", "?"), params)
+            self.rowcount = self._result.rowcount
+            return
+        table = match["table"]
+        with Path(match["path"]).open(newline="", encoding="utf-8") as f:
+            reader = csv.reader(f)
+            header = next(reader)
+            columns = ", ".join(header)
+            self.owner.conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} ({columns}, UNIQUE (base_code, target_code, time_last_update_utc))"
+            )
+            placeholders = ", ".join("?" for _ in header)
+            before = self.owner.conn.total_changes
+            duplicates = (match["duplicates"] or "IGNORE").upper()
+            self.owner.conn.executemany(
+                f"INSERT OR {duplicates} INTO {table} ({columns}) VALUES ({placeholders})", reader
+            )
+            self.rowcount = self.owner.conn.total_changes - before
+
+    def fetchone(self) -> tuple | None:
+        return self._result.fetchone()
+
+    def close(self) -> None:
+        pass
@@ -0,0 +1,67 @@
+# test_bench_pipeline.py
+"""Benchmarks for payload decoding, transform, CSV write and load paths.
+
+Usage:
+    pytest benchmarks/ --benchmark-json=bench_output.json [--bench-scale=full]
+    python3 benchmarks/compare.py bench_output.json
+"""
+
+import pytest
+
+import json_backend
+import load
+from data_utilities import save_to_csv
+from synthetic import SqliteLoadDataConnection, generate_payload, generate_payloads, generate_rows
+from transform import transform_rates
+
+
+@pytest.fixture(scope="module")
+def rows(request):
+    scale = request.getfixturevalue("scale")
+    return generate_rows(scale["rows"])
+
+
+def test_decode_many_payloads(measure, scale):
+    blobs = [json_backend.dumps(p) for p in generate_payloads(scale["payloads"])]
+    payloads = measure(lambda: [json_backend.decode_payload(b) for b in blobs], rounds=3)
+    assert len(payloads) == scale["payloads"]
+
+
+def test_transform_sample_payload(measure):
+    payload = generate_payload()
+    result = measure(lambda: transform_rates(payload))
+    assert len(result) == len(payload["conversion_rates"])
+
+
+def test_transform_wide_payload(measure, scale):
+    payload = generate_payload(scale["wide_currencies"])
+    result = measure(lambda: transform_rates(payload))
+    assert len(result) == scale["wide_currencies"]
+
+
+def test_transform_many_payloads(measure, scale):
+    payloads = generate_payloads(scale["payloads"])
+    total = measure(lambda: sum(len(transform_rates(p)) for p in payloads), rounds=3)
+    assert total == scale["payloads"] * len(payloads[0]["conversion_rates"])
+
+
+def test_save_to_csv(measure, rows, tmp_path):
+    path = measure(lambda: save_to_csv(rows, tmp_path, "rates.csv"), rounds=3)
+    assert path.exists()
+
+
+def test_save_to_csv_gzip(measure, rows, tmp_path):
+    path = measure(lambda: save_to_csv(rows, tmp_path, "rates.csv", compress=True), rounds=3)
+    assert path.name == "rates.csv.gz"
+
+
+def test_load_csv_sqlite(measure, rows, tmp_path, monkeypatch):
+    csv_path = save_to_csv(rows, tmp_path, "rates.csv")
+
+    def fresh_load():
+        # A new in-memory database per round so every round inserts every row
+        monkeypatch.setattr(load, "connect_to_mysql", lambda cfg: SqliteLoadDataConnection())
+        return load.load_csv_to_mysql(csv_path, "rates", {})
+
+    loaded = measure(fresh_load, rounds=3)
+    assert loaded == len(rows)
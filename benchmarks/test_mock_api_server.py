@@ -0,0 +1,53 @@
+# test_mock_api_server.py
+"""Smoke tests for the mock API server and the extract load-test harness."""
+
+import requests
+
+from extract_load_test import percentile, run_load_test
+from mock_api_server import MockApiConfig, MockApiServer
+from transform import transform_rates
+
+
+def test_latest_payload_goes_through_real_extract_and_transform():
+    from extract import get_exchange_rates
+
+    with MockApiServer(MockApiConfig(currencies=500)) as server:
+        raw = get_exchange_rates(f"{server.base_url}/KEY/latest/EUR")
+
+    assert raw["base_code"] == "EUR"
+    assert len(transform_rates(raw)) == 500
+
+
+def test_history_endpoint():
+    with MockApiServer() as server:
+        body = requests.get(f"{server.base_url}/KEY/history/USD/2024/2/29", timeout=5).json()
+        bad = requests.get(f"{server.base_url}/KEY/history/USD/2023/2/29", timeout=5)
+
+    assert (body["year"], body["month"], body["day"]) == (2024, 2, 29)
+    assert body["conversion_rates"]["USD"] == 1
+    assert bad.status_code == 400
+
+
+def test_rate_limit_sends_retry_after():
+    with MockApiServer(MockApiConfig(rate_limit_rate=1.0, retry_after=7)) as server:
+        response = requests.get(f"{server.base_url}/KEY/latest/USD", timeout=5)
+
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "7"
+
+
+def test_load_test_report():
+    with MockApiServer(MockApiConfig(error_rate=0.5, seed=1)) as server:
+        report = run_load_test(f"{server.base_url}/KEY/latest/USD", 20, 4, single_attempt=True)
+        counts = server.status_counts
+
+    assert report["requests"] == 20
+    assert report["failures"] == counts.get(500, 0)
+    assert report["latency_ms"]["p50"] <= report["latency_ms"]["p99"]
+
+
+def test_percentile():
+    values = [float(v) for v in range(1, 101)]
+    assert percentile(values, 50) == 50
+    assert percentile(values, 99) == 99
+    assert percentile(values, 100) == 100
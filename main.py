@@ -8,13 +8,18 @@ for processing exchange rate data:
    sample data for testing
 2. Transform: Processes and normalizes the raw API response into structured
    records for database storage
-3. Load: Saves transformed data to CSV files and loads into MySQL database
+3. Load: Hands the rows to the configured output sinks (CSV file, MySQL
+   database, ...) concurrently; see src/sinks.py
 
 The pipeline supports both live API data and sample data for testing purposes.
 Configuration is managed through YAML files and environment variables.
 
 Usage:
-    python3 main.py
+    python3 main.py [--sample] [--profile] [--force]
+
+    --profile additionally dumps cProfile and tracemalloc reports to logs/
+    --force transforms and loads even when the freshness watermark says the
+    payload was already loaded
 
 Configuration:
     - Environment variables: .env file (API keys, database credentials)
@@ -25,11 +30,16 @@ Output:
     - CSV files: data/processed/rates_YYYY-MM-DD.csv
     - Database: MySQL table with exchange rate records
     - Logs: logs/main.log and console output
+    - Quarantine: data/quarantine/quarantine_YYYY-MM-DD.csv (rows flagged by validation)
+    - Raw archive: data/raw/archive (compressed response bodies; replay with scripts/replay_archive.py)
+    - Statistics: data/processed/stats_YYYY-MM-DD.csv (rolling MA/volatility per pair)
+    - Timings: logs/timings_main_YYYY-MM-DD.json (per-stage wall/CPU time and rows)
+    - Metrics: Prometheus textfile (and optional JSON) configured under `metrics`
 """
 
-import json
 import logging
 import sys
+import time
 from datetime import date
 from pathlib import Path
 import argparse
@@ -40,20 +50,35 @@ sys.path.append(str(Path(__file__).parent / "src"))
 
 from config import (
     construct_api_url,
+    get_target_currencies,
     load_configuration,
     load_database_config,
     load_environment,
 )
-from extract import get_exchange_rates
-from load import load_csv_to_mysql
 from transform import transform_rates
-from data_utilities import save_to_csv
-from logging_utilities import setup_logging, get_log_file_path
-from slack_utilities import notify_success, notify_failure
+import metrics
+from logging_utilities import flush_logging, get_log_file_path, setup_logging, shutdown_logging
+from profiling_utilities import get_timings, profile_run, timed_stage, write_timing_summary
+
+# extract (requests) and load (mysql.connector) are imported where they are used:
+# each costs noticeable startup time on the Pi and --sample runs never need them.
+# The stage modules (watermark, quota, data_utilities, ...) are imported by their stage too.
+# slack_sdk is only imported by the notifier's background thread.
+
+
+def _record_success() -> None:
+    """Set the gauges success and staleness alerts watch; called before each successful return."""
+    metrics.set_gauge("last_run_success", 1, "1 if the most recent run succeeded")
+    metrics.set_gauge("last_success_timestamp_seconds", time.time(), "Unix time of the last successful run")
 
 
-def main(use_sample: bool) -> None:
-    """Main entry point for the Exchange Rates ETL pipeline."""
+def main(use_sample: bool, force: bool = False) -> str:
+    """Main entry point for the Exchange Rates ETL pipeline.
+
+    Returns:
+        str: "loaded" if a new snapshot was loaded, "skipped" if the payload was
+        not newer than the stored watermark (and force was not set)
+    """
     logger = logging.getLogger(__name__)
 
     logger.info("=" * 60)
@@ -61,79 +86,286 @@ def main(use_sample: bool) -> None:
     logger.info("=" * 60)
     logger.info(f"******* Running in {'sample' if use_sample else 'live'} data mode *******\n")
 
+    run_start = time.time()
+    cfg = None
     try:
         # 1) Env, config, DB creds
         logger.info("##### Step 1: Loading configuration and environment variables")
-        load_environment()
-        cfg = load_configuration()
-        db_cfg = load_database_config()
+        with timed_stage("config"):
+            load_environment()
+            cfg = load_configuration()
+            db_cfg = load_database_config()
+            currencies = get_target_currencies(cfg)
+            # Every API request below is charged to this ledger
+            import quota
+
+            quota.configure(cfg, Path(__file__).parent)
+        if currencies is not None:
+            logger.info(f"Projecting to {len(currencies)} target currencies: {', '.join(currencies)}")
         logger.info("Configuration loaded successfully\n")
 
         # 2) Extract
         logger.info("##### Step 2: Extracting exchange rate data")
-        if use_sample:
-            sample_path = Path(__file__).parent / "data" / "raw" / "sample_rates.json"
-            logger.info(f"Using sample JSON at {sample_path}")
-            raw = json.loads(sample_path.read_text(encoding="utf-8"))
-        else:
-            url = construct_api_url(cfg)
-            logger.info("Fetching live data from API")
-            raw = get_exchange_rates(url)
+        with timed_stage("extract") as stage:
+            from json_backend import decode_payload
+
+            if use_sample:
+                sample_path = Path(__file__).parent / "data" / "raw" / "sample_rates.json"
+                logger.info(f"Using sample JSON at {sample_path}")
+                body = sample_path.read_bytes()
+            else:
+                from extract import fetch_exchange_rates
+
+                url = construct_api_url(cfg)
+                logger.info("Fetching live data from API")
+                body = fetch_exchange_rates(url)
+            raw = decode_payload(body, currencies)
+            stage.rows = len(raw.get("conversion_rates", {}))
+        metrics.record_freshness(raw["time_last_update_unix"])
         logger.info("Data extraction completed successfully\n")
 
+        # Keep the raw response so it can be replayed without calling the API again
+        archive_cfg = cfg.get("archive", {}) or {}
+        if archive_cfg.get("enabled", True) and not use_sample:
+            with timed_stage("archive"):
+                import raw_archive
+
+                _, stored = raw_archive.archive_payload(
+                    body,
+                    raw,
+                    Path(__file__).parent / archive_cfg.get("directory", "data/raw/archive"),
+                    archive_cfg.get("codec"),
+                )
+            metrics.set_gauge("payload_archived", int(stored), "1 if this run stored a new raw payload")
+
+        # Short-circuit when the provider hasn't published anything since the last load
+        import watermark
+
+        wm_cfg = cfg.get("watermark", {}) or {}
+        wm_enabled = wm_cfg.get("enabled", True)
+        wm_args = {
+            "state_path": Path(__file__).parent / wm_cfg.get("state_file", "data/state/watermarks.json"),
+            "table": wm_cfg.get("table", watermark.DEFAULT_TABLE),
+        }
+        if wm_enabled and not force:
+            with timed_stage("watermark"):
+                is_new = watermark.has_new_data(raw, db_cfg, **wm_args)
+            if not is_new:
+                metrics.set_gauge("run_skipped", 1, "1 if the run found no new data and skipped transform/load")
+                logger.info("=" * 60)
+                logger.info(
+                    f"No new data for {raw['base_code']} since time_last_update_unix "
+                    f"{raw['time_last_update_unix']}; skipping transform and load (use --force to reload)"
+                )
+                logger.info("=" * 60)
+                _record_success()
+                return "skipped"
+        elif force:
+            logger.info("Forced reload requested; ignoring the freshness watermark")
+        metrics.set_gauge("run_skipped", 0, "1 if the run found no new data and skipped transform/load")
+
         # 3) Transform
         logger.info("##### Step 3: Transforming exchange rate data")
-        rows = transform_rates(raw)
+        with timed_stage("transform") as stage:
+            rows = transform_rates(raw, currencies)
+            stage.rows = len(rows)
+        metrics.set_gauge("rows_transformed", len(rows), "Rows produced by transform_rates")
         logger.info("Data transformation completed successfully\n")
 
-        # 4) Save CSV
-        logger.info("##### Step 4: Saving data to CSV file")
-        out_dir = Path(__file__).parent / "data" / "processed"
-        filename = f"rates_{date.today().isoformat()}.csv"
-        csv_path = save_to_csv(rows, out_dir, filename)
-        logger.info("CSV file saved successfully\n")
+        # Check the snapshot against recent history before anything is written
+        val_cfg = cfg.get("validation", {}) or {}
+        stats_cfg = cfg.get("statistics", {}) or {}
+        stats_state = Path(__file__).parent / stats_cfg.get("state_file", "data/state/rolling_stats.json")
+        val_action = val_cfg.get("action", "quarantine")
+        held_back = []
+        if val_cfg.get("enabled", True):
+            logger.info("##### Validating transformed data against recent history")
+            with timed_stage("validate") as stage:
+                import validation
+
+                history = validation.History.from_rolling_stats(stats_state, stats_cfg.get("windows", (7, 30, 90)))
+                report = validation.apply_validation(
+                    rows,
+                    history,
+                    action=val_action,
+                    quarantine_dir=Path(__file__).parent / val_cfg.get("quarantine_dir", "data/quarantine"),
+                    quarantine_name=f"quarantine_{date.today().isoformat()}.csv",
+                    max_missing_fraction=val_cfg.get("max_missing_fraction", 0.2),
+                    currencies=currencies,
+                    z_threshold=val_cfg.get("z_threshold", 6.0),
+                    max_ratio=val_cfg.get("max_ratio", 10.0),
+                    min_history=val_cfg.get("min_history", 5),
+                )
+                rows = report.accepted
+                if val_action == "quarantine":
+                    # Held in the rolling statistics so a lasting level shift can re-baseline the pair
+                    held_back = report.flagged
+                stage.rows = len(rows)
+            metrics.set_gauge("rows_flagged", len(report.flagged), "Rows flagged by validation")
+            metrics.set_gauge("currencies_missing", len(report.missing_codes), "Known codes absent from the snapshot")
+            metrics.set_gauge("currencies_new", len(report.new_codes), "Codes in the snapshot with no history")
+            logger.info("Validation completed\n")
 
-        # 5) Load into MySQL
-        logger.info("##### Step 5: Loading data into MySQL database")
-        load_csv_to_mysql(csv_path, db_cfg["table"], db_cfg)
-        logger.info("Database loading completed successfully")
+        # 4) Hand the batch to every output sink (CSV file, MySQL, ...) concurrently
+        logger.info("##### Step 4: Writing data to output sinks")
+        sink_cfg = cfg.get("sinks", {}) or {}
+        with timed_stage("sinks") as stage:
+            import sinks
+
+            enabled_sinks = sinks.build_sinks(cfg)
+            batch = sinks.SinkBatch(rows, date.today(), Path(__file__).parent, db_cfg)
+            results = sinks.run_sinks(enabled_sinks, batch, sink_cfg.get("max_workers", sinks.DEFAULT_MAX_WORKERS))
+            stage.rows = len(rows)
+        rows_loaded = sum(results[s.name].rows for s in enabled_sinks if s.loads_database)
+        metrics.set_gauge("rows_loaded", rows_loaded, "Rows reported loaded by MySQL")
+        logger.info("Output sinks completed successfully\n")
+
+        # 5) Rolling statistics; runs before the watermark is recorded so a
+        # failure here is retried by the next run (updates are idempotent per timestamp)
+        if stats_cfg.get("enabled", True):
+            logger.info("##### Step 5: Updating rolling statistics")
+            with timed_stage("statistics") as stage:
+                import rolling_stats
+                from data_utilities import save_to_csv
+
+                stats_rows = rolling_stats.update_statistics(
+                    rows,
+                    stats_state,
+                    stats_cfg.get("windows", rolling_stats.DEFAULT_WINDOWS),
+                    held_back,
+                    val_cfg.get("rebaseline_after", 3),
+                    val_cfg.get("rebaseline_tolerance", rolling_stats.DEFAULT_REBASELINE_TOLERANCE),
+                )
+                save_to_csv(
+                    stats_rows,
+                    Path(__file__).parent / stats_cfg.get("output_dir", "data/processed"),
+                    f"stats_{date.today().isoformat()}.csv",
+                )
+                stage.rows = len(stats_rows)
+            logger.info("Rolling statistics updated successfully")
+
+        # 6) Hand the new snapshot to local worker processes through shared memory
+        shm_cfg = cfg.get("shared_rates", {}) or {}
+        if shm_cfg.get("enabled", False):
+            logger.info("##### Step 6: Publishing latest rates to shared memory")
+            with timed_stage("shared_rates") as stage:
+                import shared_rates
+
+                directory = shm_cfg.get("directory")
+                published = shared_rates.publish_rows(
+                    rows,
+                    Path(directory) if directory else None,
+                    shm_cfg.get("capacity", shared_rates.DEFAULT_CAPACITY),
+                )
+                stage.rows = len(rows)
+            for base_code, seq in published.items():
+                metrics.set_gauge("shared_rates_seq", seq, "Sequence number of the published snapshot", base=base_code)
+
+        # 7) Tell change feed subscribers what moved
+        feed_cfg = cfg.get("change_feed", {}) or {}
+        if feed_cfg.get("enabled", False):
+            logger.info("##### Step 7: Publishing changes to the change feed")
+            with timed_stage("change_feed") as stage:
+                import change_feed
+
+                project_root = Path(__file__).parent
+                events = change_feed.publish_changes(
+                    rows,
+                    project_root / feed_cfg.get("journal", "data/state/change_feed.jsonl"),
+                    project_root / feed_cfg.get("state_file", "data/state/change_feed_last.json"),
+                    project_root / feed_cfg.get("socket", "data/state/change_feed.sock"),
+                )
+                stage.rows = sum(len(event["changed"]) for event in events)
+            metrics.set_gauge("change_feed_pairs_changed", stage.rows, "Pairs whose rate changed in this run")
+
+        if wm_enabled:
+            watermark.record_watermark(raw["base_code"], raw["time_last_update_unix"], db_cfg, **wm_args)
 
         logger.info("=" * 60)
         logger.info("Exchange Rates ETL Pipeline completed successfully!")
         logger.info("=" * 60)
+        _record_success()
+        return "loaded"
 
     except Exception as e:
         logger.error("=" * 60)
         logger.error("PIPELINE FAILED!")
         logger.error(f"Error: {e}")
         logger.error("=" * 60)
+        metrics.set_gauge("last_run_success", 0, "1 if the most recent run succeeded")
         raise
 
+    finally:
+        metrics.set_gauge("run_duration_seconds", time.time() - run_start, "Wall time of the most recent run")
+        metrics.record_stage_timings(get_timings())
+        metrics.record_api_retries()
+        metrics.export_metrics(cfg, Path(__file__).parent)
+
 
 if __name__ == "__main__":
     # Argument parsing
     parser = argparse.ArgumentParser()
     parser.add_argument("--sample", action="store_true")
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Dump cProfile and tracemalloc output to logs/ for offline analysis",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Transform and load even if the payload is not newer than the stored watermark",
+    )
     args = parser.parse_args()
 
-    # Setup logging
-    setup_logging("main")
+    # Setup logging from the `logging` section of the YAML config
+    try:
+        log_cfg = load_configuration().get("logging", {}) or {}
+    except Exception:
+        log_cfg = {}
+    setup_logging(
+        "main",
+        level=log_cfg.get("level", "INFO"),
+        fmt=log_cfg.get("format"),
+        use_queue=log_cfg.get("queue", False),
+        json_format=log_cfg.get("json", False),
+    )
     logger = logging.getLogger("main")
 
     # compute the log path for today
     log_path = get_log_file_path("main")
     logger.info(f"Log file created at: {log_path}")
 
-    # Slack channel for notifications
+    # Slack notifications are coalesced into one message and sent from a
+    # background thread; close() waits at most the notifier's timeout.
     slack_channel = "exchange_rates_etl"
+    from slack_utilities import SlackNotifier, failure_message, skipped_message, success_message
+
+    notifier = SlackNotifier(slack_channel)
+
+    # Per-run timing summary and optional profiler output live next to the logs
+    timings_dir = Path(__file__).parent / "logs"
 
     try:
-        main(use_sample=args.sample)
+        if args.profile:
+            with profile_run(timings_dir, "profile_main"):
+                status = main(use_sample=args.sample, force=args.force)
+        else:
+            status = main(use_sample=args.sample, force=args.force)
+        write_timing_summary(timings_dir, "main", {"status": status})
         logger.info("ETL succeeded, sending Slack notification…")
-        notify_success(log_path, slack_channel)
-        sys.exit(0)
+        notifier.add_event(success_message() if status == "loaded" else skipped_message())
+        exit_code = 0
 
     except Exception as err:
+        write_timing_summary(timings_dir, "main", {"status": "failed", "error": str(err)})
         logger.exception("ETL failed, sending Slack notification…")
-        notify_failure(log_path, str(err), slack_channel)
-        sys.exit(1)
+        notifier.add_event(failure_message(str(err)))
+        notifier.attach_log_tail(log_path)
+        exit_code = 1
+
+    # Make sure the log file is complete before its tail is uploaded
+    flush_logging()
+    notifier.close()
+    shutdown_logging()
+    sys.exit(exit_code)
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""Backfill historical rates with any number of workers sharing one queue.
+
+Queue the work once, then start workers on as many processes or machines as
+you like (point --queue at a file they all see; see src/backfill.py):
+
+    python3 scripts/backfill.py enqueue --base USD --base EUR --since 2024-01-01 --until 2024-12-31
+    python3 scripts/backfill.py work [--max-units 10] [--wait 30]
+    python3 scripts/backfill.py progress
+    python3 scripts/backfill.py retry-failed
+
+Each unit is fetched from the API's history endpoint, transformed and loaded
+in bulk through the database sinks the pipeline uses (sinks.outputs, or the
+`load` section of configs/default.yaml), keeping only etl.target_currencies /
+etl.currency_set. Days that already have rows for the base, loaded live or by
+an earlier run of the unit, are skipped before they are fetched: history
+snapshots are stamped at midnight and live ones a few seconds later, so
+loading such a day again would store it twice.
+
+Every request is charged to the API quota ledger at backfill priority
+(quota.reserve.backfill); a worker stops, leaving the remaining units queued,
+when the quota no longer covers its next unit.
+"""
+
+import argparse
+import sys
+from datetime import date
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(PROJECT_ROOT / "src"))
+
+import backfill
+from config import (
+    construct_history_url,
+    get_target_currencies,
+    load_configuration,
+    load_database_config,
+    load_environment,
+)
+from logging_utilities import setup_logging
+from sinks import RowLoader
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--queue", type=Path, default=backfill.DEFAULT_QUEUE, help="Shared queue file")
+    parser.add_argument("--lease", type=float, default=backfill.DEFAULT_LEASE_SECONDS, help="Lease length in seconds")
+    parser.add_argument("--max-attempts", type=int, default=backfill.DEFAULT_MAX_ATTEMPTS, help="Tries per unit")
+    commands = parser.add_subparsers(dest="command", required=True)
+    enqueue = commands.add_parser("enqueue", help="Queue bases x days as work units")
+    enqueue.add_argument("--base", action="append", required=True, help="Base currency (repeatable)")
+    enqueue.add_argument("--since", type=date.fromisoformat, required=True, help="First day (UTC)")
+    enqueue.add_argument("--until", type=date.fromisoformat, required=True, help="Last day (UTC)")
+    enqueue.add_argument("--days-per-unit", type=int, default=backfill.DEFAULT_DAYS_PER_UNIT)
+    work = commands.add_parser("work", help="Claim and run units until the queue is drained")
+    work.add_argument("--owner", help="Worker name (defaults to host:pid)")
+    work.add_argument("--max-units", type=int, help="Stop after this many units")
+    work.add_argument("--wait", type=float, help="Poll every N seconds for expired leases instead of exiting")
+    commands.add_parser("progress", help="Show how far the backfill has got")
+    commands.add_parser("retry-failed", help="Requeue failed units")
+    args = parser.parse_args()
+
+    setup_logging("backfill")
+    queue = backfill.BackfillQueue(args.queue, args.lease, args.max_attempts)
+    if args.command == "enqueue":
+        queue.enqueue(args.base, args.since, args.until, args.days_per_unit)
+    elif args.command == "retry-failed":
+        print(f"Requeued {queue.retry_failed()} failed units")
+    elif args.command == "work":
+        import quota
+        from extract import fetch_exchange_rates
+
+        load_environment()
+        cfg = load_configuration()
+        ledger = quota.configure(cfg, PROJECT_ROOT)
+        if ledger is not None:
+            print(ledger.status().summary())
+        currencies = get_target_currencies(cfg)
+        load_rows = RowLoader(cfg, load_database_config(), PROJECT_ROOT)
+
+        def process(unit):
+            return backfill.backfill_unit(
+                unit,
+                lambda base_code, day: fetch_exchange_rates(
+                    construct_history_url(cfg, base_code, day), priority="backfill"
+                ),
+                load_rows,
+                currencies,
+                load_rows.loaded_days,
+            )
+
+        def admit(unit):
+            # One request per day; retries are charged as they happen
+            return quota.allows("backfill", len(list(unit.days())))
+
+        backfill.run_worker(queue, process, args.owner, args.max_units, args.wait, admit)
+
+    progress = queue.progress()
+    print(progress.summary())
+    for unit_id, base_code, first_day, last_day, error in queue.failures():
+        print(f"failed unit {unit_id}: {base_code} {first_day}..{last_day}: {error}")
+    return 0 if args.command != "work" or not progress.units["failed"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""Rebuild the rolling statistics state from history.
+
+Reads every processed CSV (data/processed/rates_*.csv[.gz]) or the rates table,
+rebuilds the per-pair buffers the daily run updates incrementally, and writes
+the current statistics. With --history it also writes the statistics for every
+historical observation, computed in one vectorized pass:
+
+    python3 scripts/bootstrap_stats.py [--source csv|db] [--history stats_history.csv]
+
+--rebaseline leaves the rest of the state alone and re-baselines the given
+pairs after a level shift validation keeps flagging: their history is replaced
+by the quarantined readings held for them, or dropped if none are held.
+
+    python3 scripts/bootstrap_stats.py --rebaseline USD/ARS [USD/VES ...]
+"""
+
+import argparse
+import logging
+import sys
+from datetime import date
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(PROJECT_ROOT / "src"))
+
+import rolling_stats
+from config import load_configuration, load_database_config, load_environment
+from data_utilities import save_to_csv
+from logging_utilities import setup_logging
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--source", choices=["csv", "db"], default="csv")
+    parser.add_argument("--history", type=Path, help="Also write per-observation statistics to this CSV")
+    parser.add_argument("--rebaseline", nargs="+", metavar="BASE/TARGET", help="Only re-baseline these pairs")
+    args = parser.parse_args()
+
+    setup_logging("bootstrap_stats")
+    logger = logging.getLogger("bootstrap_stats")
+
+    load_environment()
+    stats_cfg = load_configuration().get("statistics", {}) or {}
+    windows = stats_cfg.get("windows", rolling_stats.DEFAULT_WINDOWS)
+    state_path = PROJECT_ROOT / stats_cfg.get("state_file", "data/state/rolling_stats.json")
+    output_dir = PROJECT_ROOT / stats_cfg.get("output_dir", "data/processed")
+
+    if args.rebaseline:
+        keys = [tuple(pair.upper().split("/", 1)) for pair in args.rebaseline]
+        if any(len(key) != 2 for key in keys):
+            parser.error("--rebaseline pairs look like USD/ARS")
+        done = rolling_stats.rebaseline_pairs(keys, state_path, windows)
+        for key in sorted(set(keys) - set(done)):
+            logger.warning(f"{key[0]}/{key[1]} has no rolling statistics; nothing to re-baseline")
+        logger.info(f"Re-baselined {len(done)} pairs in {state_path}")
+        return 0 if done else 1
+
+    def history():
+        if args.source == "db":
+            db_cfg = load_database_config()
+            return rolling_stats.read_history_db(db_cfg, db_cfg["table"])
+        processed = PROJECT_ROOT / "data" / "processed"
+        paths = [*processed.glob("rates_*.csv"), *processed.glob("rates_*.csv.gz")]
+        return rolling_stats.read_history_csvs(sorted(paths))
+
+    stats = rolling_stats.bootstrap_state(history(), windows)
+    if not stats.pairs:
+        logger.error("No history found; nothing to bootstrap")
+        return 1
+    stats.save(state_path)
+    save_to_csv(stats.snapshot_rows(), output_dir, f"stats_{date.today().isoformat()}.csv")
+    logger.info(f"Rolling statistics state written to {state_path}")
+
+    if args.history:
+        rows = rolling_stats.history_stats_rows(history(), windows)
+        save_to_csv(rows, args.history.parent, args.history.name)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""Run the change feed server that pushes new rate snapshots to local subscribers.
+
+Serves the events the pipeline journals after each load (see src/change_feed.py)
+on the Unix socket configured in the `change_feed` section of
+configs/default.yaml. Run it as a long-lived service next to the cron job:
+
+    python3 scripts/change_feed_server.py
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(PROJECT_ROOT / "src"))
+
+import change_feed
+from config import load_configuration
+from logging_utilities import setup_logging
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--socket", type=Path, help="Socket path (overrides change_feed.socket)")
+    args = parser.parse_args()
+
+    setup_logging("change_feed_server")
+    logger = logging.getLogger("change_feed_server")
+
+    feed_cfg = load_configuration().get("change_feed", {}) or {}
+    server = change_feed.ChangeFeedServer(
+        args.socket or PROJECT_ROOT / feed_cfg.get("socket", "data/state/change_feed.sock"),
+        PROJECT_ROOT / feed_cfg.get("journal", "data/state/change_feed.jsonl"),
+        feed_cfg.get("retain", change_feed.DEFAULT_RETAIN),
+    )
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        logger.info("Change feed server stopped")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""Export a slice of the rates table to CSV, gzipped CSV or Parquet.
+
+Streams rows from MySQL in fixed-size chunks, so memory stays flat however
+large the slice is, and reports throughput when done:
+
+    python3 scripts/export_rates.py out/usd_2024.csv.gz --since 2024-01-01 --until 2024-12-31 --base USD
+    python3 scripts/export_rates.py out/eur_jpy.parquet --target EUR --target JPY
+"""
+
+import argparse
+import sys
+from datetime import date
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(PROJECT_ROOT / "src"))
+
+import export
+from config import load_database_config, load_environment
+from logging_utilities import setup_logging
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("output", type=Path, help="Output file (.csv, .csv.gz or .parquet)")
+    parser.add_argument("--format", choices=export.FORMATS, help="Override the format implied by the file name")
+    parser.add_argument("--since", type=date.fromisoformat, help="First day (UTC) of time_last_update_utc")
+    parser.add_argument("--until", type=date.fromisoformat, help="Last day (UTC) of time_last_update_utc")
+    parser.add_argument("--base", action="append", default=[], help="Base code to include (repeatable)")
+    parser.add_argument("--target", action="append", default=[], help="Target code to include (repeatable)")
+    parser.add_argument(
+        "--columns",
+        type=lambda value: value.split(","),
+        default=list(export.DEFAULT_COLUMNS),
+        help="Comma-separated columns to export",
+    )
+    parser.add_argument("--chunk-size", type=int, default=export.DEFAULT_CHUNK_SIZE, help="Rows per fetch")
+    parser.add_argument("--table", help="Source table (defaults to DB_TABLE)")
+    args = parser.parse_args()
+
+    setup_logging("export_rates")
+    load_environment()
+    export.export_rates(
+        load_database_config(),
+        args.output,
+        args.format,
+        args.since,
+        args.until,
+        args.base,
+        args.target,
+        args.columns,
+        args.chunk_size,
+        args.table,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""Partition maintenance for the rates table.
+
+Creates monthly partitions ahead of time and, when a retention window is set,
+rolls expired partitions up into the daily summary table before archiving or
+dropping them. Settings default to the `partitioning` section of
+configs/default.yaml. Run it from cron, e.g. monthly:
+
+    python3 scripts/maintain_partitions.py [--dry-run] [--months-ahead 3] [--retention-months 24]
+"""
+
+import argparse
+import logging
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "src"))
+
+from config import load_configuration, load_database_config, load_environment
+from logging_utilities import setup_logging
+from partition_maintenance import run_maintenance
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--months-ahead", type=int)
+    parser.add_argument("--retention-months", type=int)
+    parser.add_argument("--action", choices=["archive", "drop"], help="What to do with expired partitions")
+    parser.add_argument("--dry-run", action="store_true", help="Print the SQL without executing it")
+    args = parser.parse_args()
+
+    setup_logging("maintain_partitions")
+    logger = logging.getLogger("maintain_partitions")
+
+    load_environment()
+    part_cfg = load_configuration().get("partitioning", {}) or {}
+    db_cfg = load_database_config()
+
+    retention = args.retention_months if args.retention_months is not None else part_cfg.get("retention_months")
+    report = run_maintenance(
+        db_cfg,
+        db_cfg["table"],
+        months_ahead=args.months_ahead if args.months_ahead is not None else part_cfg.get("months_ahead", 3),
+        retention_months=retention,
+        daily_table=part_cfg.get("daily_table", "rates_daily"),
+        archive=(args.action or part_cfg.get("retention_action", "archive")) == "archive",
+        dry_run=args.dry_run,
+    )
+    if args.dry_run:
+        for sql in report.statements:
+            print(sql.strip() + ";\n")
+    logger.info("Partition maintenance finished")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""Migrate an existing rates table into the compact schema in batches.
+
+    python3 scripts/migrate_to_compact.py [--source rates] [--batch-size 10000] [--start-after-id N]
+
+The source table defaults to DB_TABLE; target tables come from the `load`
+section of configs/default.yaml. Progress (last migrated id) is logged after
+every batch so an interrupted run can be resumed with --start-after-id. With
+load.adaptive_batch enabled the batch size adapts to each batch's commit time.
+"""
+
+import argparse
+import logging
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(PROJECT_ROOT / "src"))
+
+import adaptive_batch
+from compact_schema import DEFAULT_CURRENCY_TABLE, DEFAULT_TABLE, migrate_to_compact
+from config import load_configuration, load_database_config, load_environment
+from logging_utilities import setup_logging
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--source", help="Source table (default: DB_TABLE)")
+    parser.add_argument(
+        "--batch-size", type=int, default=10_000, help="Rows per batch (the starting size when adaptive)"
+    )
+    parser.add_argument("--start-after-id", type=int, default=0)
+    args = parser.parse_args()
+
+    setup_logging("migrate_to_compact")
+    logger = logging.getLogger("migrate_to_compact")
+
+    load_environment()
+    load_cfg = load_configuration().get("load", {}) or {}
+    db_cfg = load_database_config()
+
+    migrated = migrate_to_compact(
+        db_cfg,
+        args.source or db_cfg["table"],
+        table=load_cfg.get("compact_table", DEFAULT_TABLE),
+        currency_table=load_cfg.get("currency_table", DEFAULT_CURRENCY_TABLE),
+        batch_size=args.batch_size,
+        start_after_id=args.start_after_id,
+        batcher=adaptive_batch.from_config(
+            load_cfg.get("adaptive_batch"), PROJECT_ROOT, "migrate_to_compact", initial_size=args.batch_size
+        ),
+    )
+    logger.info(f"Migrated {migrated} rows")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""Reconcile the processed CSVs with the rates table and optionally repair it.
+
+Compares per-day, then per-base hash digests of both sides and only looks at
+the rows of buckets that differ (see src/reconcile.py). The files are the
+reference:
+
+    python3 scripts/reconcile_rates.py [--since 2025-01-01] [--until 2025-06-30]
+    python3 scripts/reconcile_rates.py --repair [--delete-extra]
+
+Exits with 1 when drift remains.
+"""
+
+import argparse
+import sys
+from datetime import date
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(PROJECT_ROOT / "src"))
+
+import reconcile
+from config import load_database_config, load_environment
+from db_utilities import connect_to_mysql
+from logging_utilities import setup_logging
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--directory", type=Path, default=PROJECT_ROOT / "data" / "processed", help="Processed CSV directory"
+    )
+    parser.add_argument("--since", type=date.fromisoformat, help="First day (UTC) of time_last_update_utc")
+    parser.add_argument("--until", type=date.fromisoformat, help="Last day (UTC) of time_last_update_utc")
+    parser.add_argument("--table", help="Table to check (defaults to DB_TABLE)")
+    parser.add_argument("--repair", action="store_true", help="Insert missing and replace changed rows")
+    parser.add_argument("--delete-extra", action="store_true", help="With --repair, delete rows the files don't have")
+    parser.add_argument("--show", type=int, default=20, help="Differing rows to print per kind")
+    args = parser.parse_args()
+
+    setup_logging("reconcile_rates")
+    load_environment()
+    db_config = load_database_config()
+    files = reconcile.FileRows.from_directory(args.directory)
+    conn = connect_to_mysql(db_config)
+    try:
+        table = reconcile.TableRows(conn, args.table or db_config["table"])
+        report = reconcile.compare(files, table, args.since, args.until)
+        for label, rows in (("missing", report.missing), ("extra", report.extra)):
+            for row in rows[: args.show]:
+                print(f"{label}: {','.join(row)}")
+        for file_row, table_row in report.changed[: args.show]:
+            print(f"changed: {','.join(file_row)} (table: {','.join(table_row)})")
+        if report.clean:
+            return 0
+        if not args.repair:
+            return 1
+        reconcile.repair(table, report, args.delete_extra)
+        after = reconcile.compare(files, table, args.since, args.until)
+        return 0 if after.clean else 1
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""Replay archived raw payloads through transform and load.
+
+Reads payloads from the raw archive (see src/raw_archive.py) instead of calling
+the API, transforms them and loads the rows in bulk through the database sinks
+the pipeline uses (sinks.outputs, or the `load` section of
+configs/default.yaml), keeping only the currencies selected by
+etl.target_currencies / etl.currency_set. Watermarks and rolling statistics
+are left untouched.
+
+By default LOAD DATA LOCAL skips rows whose key is already in the table, so
+replaying a range that is already loaded adds nothing. To correct rows after a
+transform bug, pass --replace: the replayed rows then overwrite the stored ones
+(LOAD DATA ... REPLACE). The compact schema's upserts always overwrite.
+
+    python3 scripts/replay_archive.py [--base USD] [--since 2025-01-01] [--until 2025-06-30] [--replace] [--dry-run]
+"""
+
+import argparse
+import logging
+import sys
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(PROJECT_ROOT / "src"))
+
+import raw_archive
+from config import get_target_currencies, load_configuration, load_database_config, load_environment
+from logging_utilities import setup_logging
+from sinks import RowLoader
+
+
+def _unix(day: date) -> int:
+    """Unix time of midnight UTC at the start of day."""
+    return int(datetime(day.year, day.month, day.day, tzinfo=timezone.utc).timestamp())
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base", help="Only replay payloads for this base currency")
+    parser.add_argument("--since", type=date.fromisoformat, help="First day (UTC) of time_last_update to replay")
+    parser.add_argument("--until", type=date.fromisoformat, help="Last day (UTC) of time_last_update to replay")
+    parser.add_argument("--batch-payloads", type=int, default=200, help="Payloads per bulk load")
+    parser.add_argument("--replace", action="store_true", help="Overwrite rows that are already loaded")
+    parser.add_argument("--dry-run", action="store_true", help="List the payloads that would be replayed")
+    args = parser.parse_args()
+
+    setup_logging("replay_archive")
+    logger = logging.getLogger("replay_archive")
+
+    load_environment()
+    cfg = load_configuration()
+    archive_dir = PROJECT_ROOT / (cfg.get("archive", {}) or {}).get("directory", "data/raw/archive")
+    entries = raw_archive.select_entries(
+        raw_archive.read_index(archive_dir),
+        args.base,
+        _unix(args.since) if args.since else None,
+        _unix(args.until + timedelta(days=1)) - 1 if args.until else None,
+    )
+    logger.info(f"{len(entries)} archived payloads selected from {archive_dir}")
+    if args.dry_run:
+        for entry in entries:
+            logger.info(f"{entry.base_code} {entry.time_last_update_unix} {entry.sha256[:12]} ({entry.codec})")
+        return 0
+    if not entries:
+        return 0
+
+    load_rows = RowLoader(cfg, load_database_config(), PROJECT_ROOT, args.replace)
+    currencies = get_target_currencies(cfg)
+    payloads, loaded = raw_archive.replay(entries, load_rows, archive_dir, args.batch_payloads, currencies)
+    logger.info(f"Replayed {payloads} payloads, {loaded} rows loaded")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,20 @@
+-- sql/create_compact_schema.sql
+-- Compact alternative to create_rates_table.sql: currency codes live once in a
+-- dimension table and rows carry 2-byte ids, a single 4-byte timestamp
+-- (time_last_update_unix) and the rate. The clustered primary key doubles as
+-- the covering index for "pair over time range" queries.
+CREATE TABLE IF NOT EXISTS {currency_table} (
+    currency_id SMALLINT UNSIGNED NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    code CHAR(3) NOT NULL,
+    UNIQUE KEY uq_currency_code (code)
+);
+
+CREATE TABLE IF NOT EXISTS {table} (
+    base_id SMALLINT UNSIGNED NOT NULL,
+    target_id SMALLINT UNSIGNED NOT NULL,
+    updated_at INT UNSIGNED NOT NULL,
+    rate DECIMAL(20,8) NOT NULL,
+
+    PRIMARY KEY (base_id, target_id, updated_at),
+    INDEX idx_updated_at (updated_at)
+);
@@ -0,0 +1,15 @@
+-- sql/create_rates_daily_table.sql
+-- Daily summary of rates, filled from old partitions before they are dropped or archived.
+CREATE TABLE IF NOT EXISTS {daily_table} (
+    base_code CHAR(3) NOT NULL,
+    target_code CHAR(3) NOT NULL,
+    rate_date DATE NOT NULL,
+    open_rate DECIMAL(20,8) NOT NULL,
+    close_rate DECIMAL(20,8) NOT NULL,
+    min_rate DECIMAL(20,8) NOT NULL,
+    max_rate DECIMAL(20,8) NOT NULL,
+    avg_rate DECIMAL(20,8) NOT NULL,
+    samples INT NOT NULL,
+
+    PRIMARY KEY (base_code, target_code, rate_date)
+);
@@ -0,0 +1,24 @@
+-- sql/create_rates_table_partitioned.sql
+-- Same columns as create_rates_table.sql, RANGE-partitioned by month on
+-- time_last_update_utc. MySQL requires the partitioning column in every unique
+-- key, hence the composite primary key. Monthly partitions are split off
+-- p_future by scripts/maintain_partitions.py.
+CREATE TABLE {table} (
+    id BIGINT AUTO_INCREMENT,
+    base_code CHAR(3) NOT NULL,
+    target_code CHAR(3) NOT NULL,
+    rate DECIMAL(20,8) NOT NULL,
+    time_last_update_utc DATETIME NOT NULL,
+    time_next_update_utc DATETIME NOT NULL,
+    time_last_update_unix BIGINT NOT NULL,
+    time_next_update_unix BIGINT NOT NULL,
+    row_created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    row_updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+
+    PRIMARY KEY (id, time_last_update_utc),
+    UNIQUE KEY uq_rate (base_code, target_code, time_last_update_utc),
+    INDEX idx_last_update_utc (time_last_update_utc)
+)
+PARTITION BY RANGE COLUMNS (time_last_update_utc) (
+    PARTITION p_future VALUES LESS THAN (MAXVALUE)
+);
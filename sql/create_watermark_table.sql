@@ -0,0 +1,6 @@
+-- sql/create_watermark_table.sql
+CREATE TABLE IF NOT EXISTS {table} (
+    base_code CHAR(3) NOT NULL PRIMARY KEY,
+    time_last_update_unix BIGINT NOT NULL,
+    loaded_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
@@ -0,0 +1,4 @@
+-- sql/insert_rates_compact.sql
+INSERT INTO {table} (base_id, target_id, updated_at, rate)
+VALUES (%s, %s, %s, %s)
+ON DUPLICATE KEY UPDATE rate = VALUES(rate);
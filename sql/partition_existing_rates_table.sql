@@ -0,0 +1,10 @@
+-- sql/partition_existing_rates_table.sql
+-- Converts an existing, unpartitioned rates table in place. This rebuilds the
+-- table, so run it in a maintenance window; afterwards run
+-- scripts/maintain_partitions.py to split p_future into monthly partitions.
+ALTER TABLE {table}
+    DROP PRIMARY KEY,
+    ADD PRIMARY KEY (id, time_last_update_utc)
+PARTITION BY RANGE COLUMNS (time_last_update_utc) (
+    PARTITION p_future VALUES LESS THAN (MAXVALUE)
+);
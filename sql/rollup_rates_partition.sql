@@ -0,0 +1,22 @@
+-- sql/rollup_rates_partition.sql
+INSERT INTO {daily_table}
+    (base_code, target_code, rate_date, open_rate, close_rate, min_rate, max_rate, avg_rate, samples)
+SELECT
+    base_code,
+    target_code,
+    DATE(time_last_update_utc) AS rate_date,
+    SUBSTRING_INDEX(GROUP_CONCAT(rate ORDER BY time_last_update_utc ASC), ',', 1),
+    SUBSTRING_INDEX(GROUP_CONCAT(rate ORDER BY time_last_update_utc DESC), ',', 1),
+    MIN(rate),
+    MAX(rate),
+    AVG(rate),
+    COUNT(*)
+FROM {table} PARTITION ({partition})
+GROUP BY base_code, target_code, DATE(time_last_update_utc)
+ON DUPLICATE KEY UPDATE
+    open_rate = VALUES(open_rate),
+    close_rate = VALUES(close_rate),
+    min_rate = VALUES(min_rate),
+    max_rate = VALUES(max_rate),
+    avg_rate = VALUES(avg_rate),
+    samples = VALUES(samples);
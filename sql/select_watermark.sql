@@ -0,0 +1,4 @@
+-- sql/select_watermark.sql
+SELECT time_last_update_unix
+FROM {table}
+WHERE base_code = %s;
@@ -0,0 +1,5 @@
+-- sql/upsert_watermark.sql
+INSERT INTO {table} (base_code, time_last_update_unix)
+VALUES (%s, %s)
+ON DUPLICATE KEY UPDATE
+    time_last_update_unix = GREATEST(time_last_update_unix, VALUES(time_last_update_unix));
@@ -0,0 +1,184 @@
+# adaptive_batch.py
+"""Batch sizes for chunked database loads that adapt to how long batches take.
+
+AdaptiveBatcher times every batch it hands out and steers the size towards
+target_seconds with AIMD, as TCP does with its window:
+
+- a batch slower than the target multiplies the size by decrease (0.5),
+- a full batch within the target adds increase rows,
+- a short batch (the tail of the data) leaves the size alone,
+
+always staying within [min_size, max_size]. Backing off fast keeps
+transactions short when the server is busy or waiting on locks; growing slowly
+probes for fewer round trips when it isn't.
+
+Every decision is logged at debug level, exported as load_batch_* metrics and,
+with decisions_file, appended there as a JSON line (size, rows, seconds,
+rows/s, action, next size), so the defaults can be tuned from real runs.
+summary() gives the per-run overview.
+"""
+
+import logging
+import time
+from collections.abc import Callable, Sequence
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any
+
+import json_backend
+import metrics
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INITIAL_SIZE = 5000
+DEFAULT_MIN_SIZE = 500
+DEFAULT_MAX_SIZE = 50_000
+DEFAULT_TARGET_SECONDS = 0.5
+DEFAULT_DECREASE = 0.5
+
+
+@dataclass(frozen=True)
+class BatchDecision:
+    """One timed batch and the size chosen for the next one."""
+
+    path: str
+    batch: int
+    size: int
+    rows: int
+    seconds: float
+    rows_per_second: float
+    action: str  # increase | decrease | hold
+    next_size: int
+    at: float
+
+
+class AdaptiveBatcher:
+    """AIMD controller for the size of the next batch of one load path."""
+
+    def __init__(
+        self,
+        name: str,
+        initial_size: int = DEFAULT_INITIAL_SIZE,
+        min_size: int = DEFAULT_MIN_SIZE,
+        max_size: int = DEFAULT_MAX_SIZE,
+        target_seconds: float = DEFAULT_TARGET_SECONDS,
+        increase: int | None = None,
+        decrease: float = DEFAULT_DECREASE,
+        decisions_file: Path | None = None,
+    ) -> None:
+        if not 0 < min_size <= max_size:
+            raise ValueError(f"Batch size bounds must satisfy 0 < min_size <= max_size, got {min_size}, {max_size}")
+        if not 0 < decrease < 1:
+            raise ValueError(f"decrease must be between 0 and 1, got {decrease}")
+        self.name = name
+        self.min_size = min_size
+        self.max_size = max_size
+        self.size = min(max(initial_size, min_size), max_size)
+        self.target_seconds = target_seconds
+        # Default step: a tenth of the starting size, so growth takes a few batches
+        self.increase = increase or max(self.size // 10, 1)
+        self.decrease = decrease
+        self.decisions_file = decisions_file
+        self.decisions: list[BatchDecision] = []
+
+    def record(self, rows: int, seconds: float) -> BatchDecision:
+        """Feed back how long a batch of rows took and pick the next size."""
+        if seconds > self.target_seconds:
+            next_size = max(self.min_size, int(self.size * self.decrease))
+        elif rows >= self.size:
+            next_size = min(self.max_size, self.size + self.increase)
+        else:
+            next_size = self.size
+        action = "increase" if next_size > self.size else "decrease" if next_size < self.size else "hold"
+        decision = BatchDecision(
+            self.name,
+            len(self.decisions) + 1,
+            self.size,
+            rows,
+            round(seconds, 6),
+            round(rows / seconds, 1) if seconds > 0 else 0.0,
+            action,
+            next_size,
+            time.time(),
+        )
+        self.decisions.append(decision)
+        self.size = next_size
+        self._publish(decision)
+        return decision
+
+    def _publish(self, decision: BatchDecision) -> None:
+        logger.debug(
+            f"Batch {decision.batch} of {self.name}: {decision.rows} rows in {decision.seconds:.3f}s "
+            f"({decision.rows_per_second:,.0f} rows/s) -> {decision.action} to {decision.next_size}"
+        )
+        metrics.set_gauge("load_batch_size", decision.next_size, "Size chosen for the next load batch", path=self.name)
+        metrics.set_gauge("load_batch_seconds", decision.seconds, "Duration of the last load batch", path=self.name)
+        metrics.inc(
+            "load_batch_decisions_total",
+            help_text="Adaptive batch size decisions",
+            path=self.name,
+            action=decision.action,
+        )
+        if self.decisions_file is not None:
+            try:
+                self.decisions_file.parent.mkdir(parents=True, exist_ok=True)
+                with self.decisions_file.open("ab") as f:
+                    f.write(json_backend.dumps(asdict(decision)) + b"\n")
+            except OSError as e:
+                # Losing the tuning record must never fail a load
+                logger.warning(f"Could not record batch decision in {self.decisions_file}: {e}")
+
+    def run(self, items: Sequence[Any], send: Callable[[Sequence[Any]], Any]) -> int:
+        """Call send() on consecutive slices of items sized by the controller; returns len(items)."""
+        start = 0
+        while start < len(items):
+            chunk = items[start : start + self.size]
+            began = time.perf_counter()
+            send(chunk)
+            self.record(len(chunk), time.perf_counter() - began)
+            start += len(chunk)
+        return len(items)
+
+    def summary(self) -> str:
+        if not self.decisions:
+            return f"{self.name}: no batches"
+        rows = sum(d.rows for d in self.decisions)
+        seconds = sum(d.seconds for d in self.decisions)
+        sizes = [d.size for d in self.decisions]
+        return (
+            f"{self.name}: {len(self.decisions)} batches, {rows} rows in {seconds:.2f}s "
+            f"({rows / seconds if seconds else 0:,.0f} rows/s); size {sizes[0]} -> {self.size} "
+            f"(range {min(sizes)}..{max(sizes)}, target {self.target_seconds}s per batch)"
+        )
+
+
+# One controller per load path, so repeated loads in a process (replays, backfills) keep what they learned
+_batchers: dict[str, AdaptiveBatcher] = {}
+
+
+def from_config(
+    config: dict | None,
+    project_root: Path,
+    name: str,
+    initial_size: int | None = None,
+) -> AdaptiveBatcher | None:
+    """The process-wide controller for load path `name`, per the `load.adaptive_batch` section.
+
+    Returns None when the section is missing or disabled, leaving fixed batch sizes.
+    """
+    config = config or {}
+    if not config.get("enabled", False):
+        return None
+    if name not in _batchers:
+        decisions_file = config.get("decisions_file")
+        _batchers[name] = AdaptiveBatcher(
+            name,
+            initial_size or config.get("initial_size", DEFAULT_INITIAL_SIZE),
+            config.get("min_size", DEFAULT_MIN_SIZE),
+            config.get("max_size", DEFAULT_MAX_SIZE),
+            config.get("target_seconds", DEFAULT_TARGET_SECONDS),
+            config.get("increase"),
+            config.get("decrease", DEFAULT_DECREASE),
+            project_root / decisions_file if decisions_file else None,
+        )
+    return _batchers[name]
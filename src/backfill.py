@@ -0,0 +1,414 @@
+# backfill.py
+"""Historical reloads split into work units that any number of workers share.
+
+A work unit is one base currency over a range of days. Units live in a small
+SQLite queue file:
+
+    enqueue()   adds units for bases x [since, until], days_per_unit days each
+    claim()     leases the next pending unit to a worker for lease_seconds
+    heartbeat() extends the lease while the worker is busy
+    complete()  / fail() finish the unit; failures are retried up to max_attempts
+
+A unit whose lease runs out without a heartbeat (the worker died or lost its
+box) is handed to the next worker that asks. Completing a unit only counts if
+the worker still holds its lease. If the lease was lost, the unit may be loaded
+twice; loads are idempotent, so that is harmless.
+
+Workers on several machines can share one queue file on a network filesystem
+with working POSIX locks. The file stays in rollback-journal mode, because
+WAL needs shared memory on a single host. Every operation is a short
+transaction on a fresh connection.
+
+run_worker() is the worker loop and backfill_unit() the extract -> transform
+-> load work for one unit, using the API's history endpoint.
+"""
+
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from collections.abc import Callable, Iterator, Sequence
+from contextlib import closing, contextmanager
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any
+
+import json_backend
+from profiling_utilities import timed
+from quota import QuotaExceededError
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = Path(__file__).parent.parent
+DEFAULT_QUEUE = PROJECT_ROOT / "data" / "state" / "backfill.sqlite"
+DEFAULT_LEASE_SECONDS = 300.0
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_DAYS_PER_UNIT = 7
+STATUSES = ("pending", "leased", "done", "failed")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS units (
+    id INTEGER PRIMARY KEY,
+    base_code TEXT NOT NULL,
+    first_day TEXT NOT NULL,
+    last_day TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    owner TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    rows_loaded INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    updated_at REAL,
+    UNIQUE (base_code, first_day, last_day)
+);
+CREATE INDEX IF NOT EXISTS idx_units_status ON units (status, lease_expires);
+"""
+
+
+def default_owner() -> str:
+    """host:pid, which identifies a worker across machines."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+@dataclass(frozen=True)
+class WorkUnit:
+    id: int
+    base_code: str
+    first_day: date
+    last_day: date
+    attempts: int
+
+    def days(self) -> Iterator[date]:
+        day = self.first_day
+        while day <= self.last_day:
+            yield day
+            day += timedelta(days=1)
+
+
+@dataclass
+class BackfillProgress:
+    """Unit counts per status plus the rows and days loaded so far."""
+
+    units: dict[str, int]
+    rows_loaded: int
+    days_done: int
+    days_total: int
+    workers: list[str]
+
+    @property
+    def finished(self) -> bool:
+        return not (self.units["pending"] or self.units["leased"])
+
+    def summary(self) -> str:
+        total = sum(self.units.values())
+        percent = 100 * self.days_done / self.days_total if self.days_total else 100.0
+        return (
+            f"{self.units['done']}/{total} units done ({percent:.1f}% of {self.days_total} days), "
+            f"{self.units['leased']} leased, {self.units['pending']} pending, {self.units['failed']} failed; "
+            f"{self.rows_loaded} rows loaded; {len(self.workers)} active workers"
+        )
+
+
+class BackfillQueue:
+    """The shared queue file; cheap to create, holds no open connection."""
+
+    def __init__(
+        self,
+        path: Path = DEFAULT_QUEUE,
+        lease_seconds: float = DEFAULT_LEASE_SECONDS,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+    ) -> None:
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with self._transaction() as conn:
+            for statement in SCHEMA.split(";"):
+                conn.execute(statement)
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        # BEGIN IMMEDIATE takes the write lock up front, so two workers can't claim the same unit
+        with closing(sqlite3.connect(self.path, timeout=30.0, isolation_level=None)) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                conn.execute("COMMIT")
+            except BaseException:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                raise
+
+    def enqueue(
+        self,
+        bases: Sequence[str],
+        since: date,
+        until: date,
+        days_per_unit: int = DEFAULT_DAYS_PER_UNIT,
+    ) -> int:
+        """Add units covering every base over since..until (inclusive); returns how many were new."""
+        units = []
+        for base_code in bases:
+            first = since
+            while first <= until:
+                last = min(first + timedelta(days=days_per_unit - 1), until)
+                units.append((base_code.upper(), first.isoformat(), last.isoformat(), time.time()))
+                first = last + timedelta(days=1)
+        with self._transaction() as conn:
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO units (base_code, first_day, last_day, updated_at) VALUES (?, ?, ?, ?)", units
+            )
+            added = conn.total_changes - before
+        logger.info(f"Queued {added} new backfill units ({len(units) - added} already queued) in {self.path}")
+        return added
+
+    def claim(self, owner: str) -> WorkUnit | None:
+        """Lease the oldest pending (or abandoned) unit to owner; None when there is nothing to do."""
+        now = time.time()
+        with self._transaction() as conn:
+            # Abandoned units that already used up their attempts are given up on
+            conn.execute(
+                "UPDATE units SET status = 'failed', owner = NULL, "
+                "last_error = COALESCE(last_error, 'lease expired'), updated_at = ? "
+                "WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?",
+                (now, now, self.max_attempts),
+            )
+            row = conn.execute(
+                "SELECT id, base_code, first_day, last_day, attempts, owner FROM units "
+                "WHERE status = 'pending' OR (status = 'leased' AND lease_expires < ?) ORDER BY id LIMIT 1",
+                (now,),
+            ).fetchone()
+            if row is None:
+                return None
+            unit_id, base_code, first_day, last_day, attempts, previous_owner = row
+            conn.execute(
+                "UPDATE units SET status = 'leased', owner = ?, lease_expires = ?, attempts = attempts + 1, "
+                "updated_at = ? WHERE id = ?",
+                (owner, now + self.lease_seconds, now, unit_id),
+            )
+        if previous_owner:
+            logger.warning(f"Reclaimed unit {unit_id} ({base_code} {first_day}..{last_day}) from {previous_owner}")
+        return WorkUnit(unit_id, base_code, date.fromisoformat(first_day), date.fromisoformat(last_day), attempts + 1)
+
+    def _update_leased(self, unit: WorkUnit, owner: str, sql: str, params: tuple) -> bool:
+        with self._transaction() as conn:
+            cursor = conn.execute(f"{sql} WHERE id = ? AND owner = ? AND status = 'leased'", (*params, unit.id, owner))
+            return cursor.rowcount == 1
+
+    def heartbeat(self, unit: WorkUnit, owner: str) -> bool:
+        """Extend owner's lease on unit; False if it has lost the lease."""
+        now = time.time()
+        return self._update_leased(
+            unit, owner, "UPDATE units SET lease_expires = ?, updated_at = ?", (now + self.lease_seconds, now)
+        )
+
+    def complete(self, unit: WorkUnit, owner: str, rows_loaded: int) -> bool:
+        """Mark unit done; False if owner no longer held the lease."""
+        return self._update_leased(
+            unit,
+            owner,
+            "UPDATE units SET status = 'done', owner = NULL, lease_expires = NULL, rows_loaded = ?, "
+            "last_error = NULL, updated_at = ?",
+            (rows_loaded, time.time()),
+        )
+
+    def fail(self, unit: WorkUnit, owner: str, error: str) -> bool:
+        """Give unit back for a retry, or mark it failed once it has had max_attempts."""
+        status = "failed" if unit.attempts >= self.max_attempts else "pending"
+        return self._update_leased(
+            unit,
+            owner,
+            "UPDATE units SET status = ?, owner = NULL, lease_expires = NULL, last_error = ?, updated_at = ?",
+            (status, error[:1000], time.time()),
+        )
+
+    def release(self, unit: WorkUnit, owner: str) -> bool:
+        """Hand unit back untouched (the attempt isn't counted), e.g. when it has to wait for quota."""
+        return self._update_leased(
+            unit,
+            owner,
+            "UPDATE units SET status = 'pending', owner = NULL, lease_expires = NULL, attempts = attempts - 1, "
+            "updated_at = ?",
+            (time.time(),),
+        )
+
+    def retry_failed(self) -> int:
+        """Put failed units back in the queue with fresh attempts."""
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE units SET status = 'pending', attempts = 0, updated_at = ? WHERE status = 'failed'",
+                (time.time(),),
+            )
+            return cursor.rowcount
+
+    def progress(self) -> BackfillProgress:
+        now = time.time()
+        with self._transaction() as conn:
+            rows = conn.execute(
+                "SELECT status, COUNT(*), SUM(rows_loaded), "
+                "SUM(julianday(last_day) - julianday(first_day) + 1) FROM units GROUP BY status"
+            ).fetchall()
+            workers = [
+                owner
+                for (owner,) in conn.execute(
+                    "SELECT DISTINCT owner FROM units WHERE status = 'leased' AND lease_expires >= ? ORDER BY owner",
+                    (now,),
+                )
+            ]
+        units = dict.fromkeys(STATUSES, 0)
+        days = dict.fromkeys(STATUSES, 0)
+        rows_loaded = 0
+        for status, count, loaded, n_days in rows:
+            units[status] = count
+            days[status] = int(n_days or 0)
+            rows_loaded += loaded or 0
+        return BackfillProgress(units, rows_loaded, days["done"], sum(days.values()), workers)
+
+    def failures(self) -> list[tuple[int, str, str, str, str | None]]:
+        """(id, base_code, first_day, last_day, last_error) of failed units."""
+        with self._transaction() as conn:
+            return conn.execute(
+                "SELECT id, base_code, first_day, last_day, last_error FROM units WHERE status = 'failed' ORDER BY id"
+            ).fetchall()
+
+
+class _Heartbeat:
+    """Background thread that keeps a unit's lease alive while it is processed."""
+
+    def __init__(self, queue: BackfillQueue, unit: WorkUnit, owner: str) -> None:
+        self.queue, self.unit, self.owner = queue, unit, owner
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"backfill-heartbeat-{unit.id}", daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.queue.lease_seconds / 3):
+            try:
+                if not self.queue.heartbeat(self.unit, self.owner):
+                    logger.warning(f"Lost the lease on unit {self.unit.id}; another worker may redo it")
+                    self.lost = True
+                    return
+            except sqlite3.Error as e:
+                # Keep trying: the lease is still good until it expires
+                logger.warning(f"Backfill heartbeat for unit {self.unit.id} failed: {e}")
+
+    def __enter__(self) -> "_Heartbeat":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self._stop.set()
+        self._thread.join()
+
+
+def run_worker(
+    queue: BackfillQueue,
+    process_unit: Callable[[WorkUnit], int],
+    owner: str | None = None,
+    max_units: int | None = None,
+    idle_wait: float | None = None,
+    admit: Callable[[WorkUnit], bool] | None = None,
+) -> int:
+    """Claim and process units until the queue is empty (or max_units are done).
+
+    process_unit(unit) does the work and returns the rows it loaded. With
+    idle_wait the worker keeps polling an empty queue every idle_wait seconds
+    until no unit is pending or leased, so it can take over expired leases.
+    admit(unit) is asked before each unit is started (e.g. whether the API quota
+    still covers it); when it says no, or process_unit runs into
+    QuotaExceededError, the unit is released and the worker stops.
+    Returns the number of units this worker completed.
+    """
+    owner = owner or default_owner()
+    completed = 0
+    while max_units is None or completed < max_units:
+        unit = queue.claim(owner)
+        if unit is None:
+            if idle_wait is None or queue.progress().finished:
+                break
+            time.sleep(idle_wait)
+            continue
+        if admit is not None and not admit(unit):
+            queue.release(unit, owner)
+            logger.warning(f"Deferring unit {unit.id} and the rest of the backfill: not admitted (quota)")
+            break
+        logger.info(f"{owner} working on unit {unit.id}: {unit.base_code} {unit.first_day}..{unit.last_day}")
+        with _Heartbeat(queue, unit, owner):
+            try:
+                rows = process_unit(unit)
+            except QuotaExceededError as e:
+                queue.release(unit, owner)
+                logger.warning(f"Deferring unit {unit.id} and the rest of the backfill: {e}")
+                break
+            except Exception as e:
+                logger.error(f"Backfill unit {unit.id} failed (attempt {unit.attempts}): {e}")
+                queue.fail(unit, owner, f"{type(e).__name__}: {e}")
+                continue
+        if queue.complete(unit, owner, rows):
+            completed += 1
+        else:
+            logger.warning(f"Unit {unit.id} finished after its lease was lost; its result is not counted")
+        logger.info(f"Backfill progress: {queue.progress().summary()}")
+    return completed
+
+
+def history_to_payload(data: bytes, currencies: Sequence[str] | None = None) -> json_backend.RatesPayload:
+    """Turn a `history/<BASE>/<Y>/<M>/<D>` response into the RatesPayload of that day.
+
+    History responses carry year/month/day instead of the update timestamps;
+    the snapshot is dated midnight UTC of that day and valid for one day. Live
+    snapshots are stamped a few seconds later, which is why backfill_unit
+    skips days that are already loaded.
+    """
+    raw = json_backend.loads(data)
+    if raw.get("result") != "success":
+        raise json_backend.PayloadError(f"History request failed: {raw.get('error-type', raw.get('result'))}")
+    last = datetime(raw["year"], raw["month"], raw["day"], tzinfo=timezone.utc)
+    following = last + timedelta(days=1)
+    payload = json_backend.RatesPayload.from_mapping(
+        {
+            "base_code": raw["base_code"],
+            "time_last_update_unix": int(last.timestamp()),
+            "time_last_update_utc": last.strftime("%a, %d %b %Y %H:%M:%S %z"),
+            "time_next_update_unix": int(following.timestamp()),
+            "time_next_update_utc": following.strftime("%a, %d %b %Y %H:%M:%S %z"),
+            "conversion_rates": raw["conversion_rates"],
+        }
+    )
+    if currencies is not None:
+        payload.conversion_rates = json_backend.project_rates(payload.conversion_rates, currencies)
+    return payload
+
+
+@timed("backfill.backfill_unit", rows=lambda loaded: loaded)
+def backfill_unit(
+    unit: WorkUnit,
+    fetch: Callable[[str, date], bytes],
+    load_rows: Callable[[list[dict[str, Any]]], int],
+    currencies: Sequence[str] | None = None,
+    loaded_days: Callable[[str, date, date], set[date]] | None = None,
+) -> int:
+    """Fetch every day of unit, transform it and load all of its rows in one bulk load.
+
+    fetch(base_code, day) returns the raw history response. Returns the rows loaded.
+
+    loaded_days(base_code, first_day, last_day) returns the days that already
+    have rows; those are neither fetched nor loaded. A history snapshot is
+    stamped at midnight but the live one a few seconds later, so loading a day
+    the pipeline already has would store it a second time under another key.
+    """
+    from transform import transform_rates
+
+    skip = loaded_days(unit.base_code, unit.first_day, unit.last_day) if loaded_days is not None else set()
+    if skip:
+        logger.info(f"Unit {unit.id}: skipping {len(skip)} days that are already loaded")
+    rows: list[dict[str, Any]] = []
+    for day in unit.days():
+        if day in skip:
+            continue
+        rows.extend(transform_rates(history_to_payload(fetch(unit.base_code, day), currencies), currencies))
+    return load_rows(rows) if rows else 0
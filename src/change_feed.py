@@ -0,0 +1,322 @@
+# change_feed.py
+"""Push new rate snapshots to local subscribers as compact diffs.
+
+After each successful load the pipeline calls publish_changes(), which
+
+1. diffs the rows against the last published rates (kept in a small state file),
+2. appends the diff as one numbered event to the journal (JSON lines), and
+3. pokes the feed server over its Unix socket so it can push the event out.
+
+The server (scripts/change_feed_server.py, run as a long-lived service) keeps
+the most recent events and the folded current rates in memory, and serves any
+number of subscribers concurrently with asyncio. Each message on the socket is
+one JSON object per line. A subscriber sends
+
+    {"op": "subscribe", "since": <last seq it saw, 0 for none>}
+
+and receives every retained event after `since`, then live events:
+
+    {"type": "diff", "seq": 7, "base_code": "USD", "time_last_update_unix": ...,
+     "changed": {"EUR": 0.91, ...}, "removed": ["XYZ"]}
+
+If `since` is older than the retained events (or newer than the journal) it
+gets one {"type": "snapshot", "seq": ..., "bases": {...}} with the full current
+rates instead, followed by live events. subscribe() wraps this with automatic
+reconnection. A subscriber that falls more than SUBSCRIBER_QUEUE events behind
+is disconnected and catches up by reconnecting.
+
+The pipeline never depends on the server: if it is not running the event is
+still journaled and will be served once it starts.
+"""
+
+import asyncio
+import collections
+import fcntl
+import logging
+import os
+import socket
+import tempfile
+from collections.abc import AsyncIterator
+from pathlib import Path
+from typing import Any
+
+import json_backend
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = Path(__file__).parent.parent
+DEFAULT_SOCKET = PROJECT_ROOT / "data" / "state" / "change_feed.sock"
+DEFAULT_JOURNAL = PROJECT_ROOT / "data" / "state" / "change_feed.jsonl"
+DEFAULT_STATE_FILE = PROJECT_ROOT / "data" / "state" / "change_feed_last.json"
+DEFAULT_RETAIN = 1000
+SUBSCRIBER_QUEUE = 256
+NOTIFY_TIMEOUT = 2.0
+# Full snapshots of every base can be long lines
+LINE_LIMIT = 2**22
+
+
+def diff_rates(previous: dict[str, float], current: dict[str, float]) -> tuple[dict[str, float], list[str]]:
+    """Return (changed or new pairs with their new rate, codes that disappeared)."""
+    changed = {code: rate for code, rate in current.items() if previous.get(code) != rate}
+    removed = sorted(code for code in previous if code not in current)
+    return changed, removed
+
+
+def apply_event(state: dict[str, dict[str, Any]], event: dict[str, Any]) -> None:
+    """Fold one diff event into {base: {"time_last_update_unix": ..., "rates": {...}}}."""
+    base = state.setdefault(event["base_code"], {"time_last_update_unix": 0, "rates": {}})
+    base["time_last_update_unix"] = event["time_last_update_unix"]
+    base["rates"].update(event["changed"])
+    for code in event["removed"]:
+        base["rates"].pop(code, None)
+
+
+def read_journal(journal_path: Path = DEFAULT_JOURNAL) -> list[dict[str, Any]]:
+    """Return every journaled event, oldest first."""
+    try:
+        with journal_path.open("rb") as f:
+            return [json_backend.loads(line) for line in f if line.strip()]
+    except FileNotFoundError:
+        return []
+
+
+def _last_seq(journal_path: Path) -> int:
+    # The journal only grows by a line a day, so reading its tail is enough
+    try:
+        with journal_path.open("rb") as f:
+            f.seek(max(0, f.seek(0, os.SEEK_END) - LINE_LIMIT))
+            lines = [line for line in f.read().splitlines() if line.strip()]
+    except FileNotFoundError:
+        return 0
+    return json_backend.loads(lines[-1])["seq"] if lines else 0
+
+
+def _read_state(state_path: Path) -> dict[str, dict[str, float]]:
+    try:
+        return json_backend.loads(state_path.read_bytes())
+    except FileNotFoundError:
+        return {}
+
+
+def _write_state(state_path: Path, state: dict[str, dict[str, float]]) -> None:
+    state_path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=state_path.parent, prefix=f".{state_path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(json_backend.dumps(state))
+        os.replace(tmp_name, state_path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+
+
+def publish_changes(
+    rows: list[dict[str, Any]],
+    journal_path: Path = DEFAULT_JOURNAL,
+    state_path: Path = DEFAULT_STATE_FILE,
+    socket_path: Path | None = DEFAULT_SOCKET,
+) -> list[dict[str, Any]]:
+    """Journal the diff of rows against the last published rates and notify the server.
+
+    Returns:
+        list[dict]: The events written, one per base currency in rows
+    """
+    by_base: dict[str, dict[str, float]] = {}
+    times: dict[str, int] = {}
+    for row in rows:
+        by_base.setdefault(row["base_code"], {})[row["target_code"]] = row["rate"]
+        times[row["base_code"]] = max(times.get(row["base_code"], 0), row["time_last_update_unix"])
+
+    journal_path.parent.mkdir(parents=True, exist_ok=True)
+    events = []
+    with journal_path.open("ab") as journal:
+        # seq numbers must not be handed out twice by overlapping runs
+        fcntl.flock(journal, fcntl.LOCK_EX)
+        seq = _last_seq(journal_path)
+        last = _read_state(state_path)
+        for base_code, rates in by_base.items():
+            changed, removed = diff_rates(last.get(base_code, {}), rates)
+            seq += 1
+            event = {
+                "type": "diff",
+                "seq": seq,
+                "base_code": base_code,
+                "time_last_update_unix": times[base_code],
+                "changed": changed,
+                "removed": removed,
+            }
+            journal.write(json_backend.dumps(event) + b"\n")
+            events.append(event)
+            last[base_code] = rates
+            logger.info(f"Change feed event {seq}: {base_code} {len(changed)} changed, {len(removed)} removed")
+        journal.flush()
+        os.fsync(journal.fileno())
+        # A crash before this line only means the next diff is computed against older rates
+        _write_state(state_path, last)
+
+    if socket_path is not None:
+        notify(socket_path, events)
+    return events
+
+
+def notify(socket_path: Path, events: list[dict[str, Any]]) -> bool:
+    """Hand events to a running feed server; returns False (and logs) if none is listening."""
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(NOTIFY_TIMEOUT)
+            sock.connect(str(socket_path))
+            sock.sendall(json_backend.dumps({"op": "publish", "events": events}) + b"\n")
+            sock.recv(64)
+        return True
+    except OSError as e:
+        logger.warning(f"Change feed server at {socket_path} not reachable ({e}); events stay in the journal")
+        return False
+
+
+class ChangeFeedServer:
+    """asyncio Unix-socket server that fans journaled events out to subscribers."""
+
+    def __init__(
+        self,
+        socket_path: Path = DEFAULT_SOCKET,
+        journal_path: Path = DEFAULT_JOURNAL,
+        retain: int = DEFAULT_RETAIN,
+    ) -> None:
+        self.socket_path = socket_path
+        self.journal_path = journal_path
+        self.events: collections.deque[dict[str, Any]] = collections.deque(maxlen=retain)
+        self.state: dict[str, dict[str, Any]] = {}
+        self.seq = 0
+        self.subscribers: set[asyncio.Queue[bytes | None]] = set()
+        self._server: asyncio.Server | None = None
+        self.reload()
+
+    def reload(self) -> None:
+        """Rebuild the retained events and current rates from the journal."""
+        self.events.clear()
+        self.state = {}
+        for event in read_journal(self.journal_path):
+            self._apply(event)
+        logger.info(f"Change feed loaded {self.seq} events from {self.journal_path}")
+
+    def _apply(self, event: dict[str, Any]) -> None:
+        apply_event(self.state, event)
+        self.events.append(event)
+        self.seq = event["seq"]
+
+    def snapshot(self) -> dict[str, Any]:
+        return {"type": "snapshot", "seq": self.seq, "bases": self.state}
+
+    def backlog(self, since: int) -> list[dict[str, Any]]:
+        """Messages a subscriber that last saw `since` needs to be current."""
+        if since == self.seq:
+            return []
+        oldest = self.events[0]["seq"] if self.events else self.seq + 1
+        if since > self.seq or since < oldest - 1:
+            return [self.snapshot()]
+        return [event for event in self.events if event["seq"] > since]
+
+    def publish(self, events: list[dict[str, Any]]) -> None:
+        """Take events that were just journaled and push them to every subscriber."""
+        previous = self.seq
+        if events and events[0]["seq"] > self.seq + 1:
+            # Events were journaled while nobody told us (e.g. written during a restart)
+            logger.warning(f"Change feed gap after seq {self.seq}; reloading the journal")
+            self.reload()
+            new_events = [event for event in self.events if event["seq"] > previous]
+        else:
+            new_events = [event for event in events if event["seq"] > previous]
+            for event in new_events:
+                self._apply(event)
+        for event in new_events:
+            self._broadcast(event)
+
+    def _broadcast(self, message: dict[str, Any]) -> None:
+        line = json_backend.dumps(message) + b"\n"
+        for queue in list(self.subscribers):
+            if queue.qsize() >= SUBSCRIBER_QUEUE:
+                # Too slow: cut it off, it will reconnect and replay from its last seq
+                self.subscribers.discard(queue)
+                queue.put_nowait(None)
+            else:
+                queue.put_nowait(line)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            request = json_backend.loads(await reader.readline())
+            if request.get("op") == "publish":
+                self.publish(request["events"])
+                writer.write(b'{"ok":true}\n')
+                await writer.drain()
+            elif request.get("op") == "subscribe":
+                await self._serve_subscriber(int(request.get("since", 0)), writer)
+            else:
+                writer.write(json_backend.dumps({"error": f"unknown op {request.get('op')!r}"}) + b"\n")
+        except (ConnectionError, ValueError, KeyError) as e:
+            logger.debug(f"Change feed client dropped: {e}")
+        finally:
+            writer.close()
+
+    async def _serve_subscriber(self, since: int, writer: asyncio.StreamWriter) -> None:
+        # None in the queue means "disconnect"; the length is capped in _broadcast
+        queue: asyncio.Queue[bytes | None] = asyncio.Queue()
+        # Backlog and registration happen without an await in between, so no event is lost or doubled
+        for message in self.backlog(since):
+            writer.write(json_backend.dumps(message) + b"\n")
+        self.subscribers.add(queue)
+        try:
+            await writer.drain()
+            while (line := await queue.get()) is not None:
+                writer.write(line)
+                await writer.drain()
+        finally:
+            self.subscribers.discard(queue)
+
+    async def start(self) -> None:
+        self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+        self.socket_path.unlink(missing_ok=True)
+        self._server = await asyncio.start_unix_server(self._handle, path=str(self.socket_path), limit=LINE_LIMIT)
+        logger.info(f"Change feed listening on {self.socket_path} at seq {self.seq}")
+
+    async def serve_forever(self) -> None:
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self) -> None:
+        for queue in self.subscribers:
+            queue.put_nowait(None)
+        self.subscribers.clear()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        self.socket_path.unlink(missing_ok=True)
+
+
+async def subscribe(
+    socket_path: Path = DEFAULT_SOCKET,
+    since: int = 0,
+    reconnect_delay: float | None = 1.0,
+) -> AsyncIterator[dict[str, Any]]:
+    """Yield feed messages, reconnecting and resuming from the last seq seen.
+
+    With reconnect_delay=None the generator ends when the connection does.
+    """
+    while True:
+        try:
+            reader, writer = await asyncio.open_unix_connection(str(socket_path), limit=LINE_LIMIT)
+            try:
+                writer.write(json_backend.dumps({"op": "subscribe", "since": since}) + b"\n")
+                await writer.drain()
+                while line := await reader.readline():
+                    message = json_backend.loads(line)
+                    since = message["seq"]
+                    yield message
+            finally:
+                writer.close()
+        except OSError as e:
+            logger.warning(f"Change feed connection to {socket_path} failed: {e}")
+        if reconnect_delay is None:
+            return
+        await asyncio.sleep(reconnect_delay)
@@ -0,0 +1,252 @@
+# compact_schema.py
+"""Compact rates schema: currency dimension table plus narrow fact rows.
+
+See sql/create_compact_schema.sql. Rows are stored as
+(base_id, target_id, updated_at, rate) where the ids are SMALLINTs from the
+currency table and updated_at is time_last_update_unix. Code -> id lookups go
+through an in-memory CurrencyIdCache so the loader never joins or round-trips
+per row.
+"""
+
+import logging
+import time
+from collections.abc import Callable, Iterable
+from datetime import date, datetime, timedelta, timezone
+from typing import Any
+
+from adaptive_batch import AdaptiveBatcher
+from db_utilities import connect_to_mysql, load_sql_template, split_sql_statements
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TABLE = "rates_compact"
+DEFAULT_CURRENCY_TABLE = "currencies"
+
+
+class CurrencyIdCache:
+    """In-memory code -> SMALLINT id mapping backed by the currency table."""
+
+    def __init__(self, currency_table: str = DEFAULT_CURRENCY_TABLE) -> None:
+        self.currency_table = currency_table
+        self._ids: dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def refresh(self, cursor) -> None:
+        """Reload the whole mapping from the database."""
+        cursor.execute(f"SELECT code, currency_id FROM {self.currency_table}")
+        self._ids = {code: int(currency_id) for code, currency_id in cursor.fetchall()}
+
+    def ids_for(self, cursor, codes: Iterable[str]) -> dict[str, int]:
+        """Return ids for codes, registering any codes the table hasn't seen yet."""
+        codes = set(codes)
+        missing = codes - self._ids.keys()
+        if missing:
+            cursor.executemany(
+                f"INSERT IGNORE INTO {self.currency_table} (code) VALUES (%s)",
+                [(code,) for code in sorted(missing)],
+            )
+            self.refresh(cursor)
+            still_missing = codes - self._ids.keys()
+            if still_missing:
+                raise RuntimeError(f"Could not register currency codes: {sorted(still_missing)}")
+            logger.info(f"Registered {len(missing)} new currency codes")
+        return {code: self._ids[code] for code in codes}
+
+
+# One cache per database so repeated loads in a process (replays, backfills) skip the lookup
+_caches: dict[tuple, CurrencyIdCache] = {}
+
+
+def get_currency_cache(db_config: dict[str, Any], currency_table: str = DEFAULT_CURRENCY_TABLE) -> CurrencyIdCache:
+    """Return the process-wide cache for the database in db_config."""
+    key = (db_config.get("host"), db_config.get("port"), db_config.get("database"), currency_table)
+    if key not in _caches:
+        _caches[key] = CurrencyIdCache(currency_table)
+    return _caches[key]
+
+
+def create_compact_schema(
+    conn,
+    table: str = DEFAULT_TABLE,
+    currency_table: str = DEFAULT_CURRENCY_TABLE,
+) -> None:
+    """Create the currency dimension and compact rates tables if they don't exist."""
+    template = load_sql_template("create_compact_schema.sql")
+    cursor = conn.cursor()
+    try:
+        for statement in split_sql_statements(template.format(table=table, currency_table=currency_table)):
+            cursor.execute(statement)
+        conn.commit()
+    finally:
+        cursor.close()
+
+
+def to_compact_tuples(rows: Iterable[dict[str, Any]], ids: dict[str, int]) -> list[tuple]:
+    """Map transformed row dicts to (base_id, target_id, updated_at, rate) tuples."""
+    return [
+        (ids[row["base_code"]], ids[row["target_code"]], int(row["time_last_update_unix"]), row["rate"]) for row in rows
+    ]
+
+
+def insert_compact_rows(
+    cursor,
+    table: str,
+    tuples: list[tuple],
+    batch_size: int = 5000,
+    batcher: AdaptiveBatcher | None = None,
+    commit: Callable[[], Any] | None = None,
+) -> int:
+    """Upsert compact tuples in batches of batch_size (or as sized by batcher); return the rows sent.
+
+    With commit, it is called after every batch, so each batch is its own short
+    transaction and the batcher times the upsert and the commit together.
+    """
+    sql = split_sql_statements(load_sql_template("insert_rates_compact.sql").format(table=table))[0]
+
+    def send(chunk: list[tuple]) -> None:
+        cursor.executemany(sql, chunk)
+        if commit is not None:
+            commit()
+
+    if batcher is not None:
+        return batcher.run(tuples, send)
+    for start in range(0, len(tuples), batch_size):
+        send(tuples[start : start + batch_size])
+    return len(tuples)
+
+
+def load_rows_compact(
+    rows: list[dict[str, Any]],
+    db_config: dict[str, Any],
+    table: str = DEFAULT_TABLE,
+    currency_table: str = DEFAULT_CURRENCY_TABLE,
+    batcher: AdaptiveBatcher | None = None,
+) -> int:
+    """Load transformed rows into the compact schema and return the number of rows written.
+
+    With batcher the upserts are sent in adaptively sized batches (see
+    adaptive_batch.py), each committed on its own so locks are held for one
+    batch only. The upserts are idempotent, so a load that fails part way
+    through can simply be retried.
+    """
+    if not rows:
+        logger.warning("No rows to load into the compact schema")
+        return 0
+
+    cache = get_currency_cache(db_config, currency_table)
+    conn = connect_to_mysql(db_config)
+    cursor = conn.cursor()
+    try:
+        codes = {row["base_code"] for row in rows} | {row["target_code"] for row in rows}
+        ids = cache.ids_for(cursor, codes)
+        count = insert_compact_rows(
+            cursor,
+            table,
+            to_compact_tuples(rows, ids),
+            batcher=batcher,
+            commit=conn.commit if batcher is not None else None,
+        )
+        conn.commit()
+        logger.info(f"Loaded {count} rows into compact table `{table}`")
+        if batcher is not None:
+            logger.info(f"Adaptive batching {batcher.summary()}")
+        return count
+    except Exception as e:
+        logger.error(f"Error loading data into compact table `{table}`: {e}")
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+        logger.info("MySQL connection closed")
+
+
+def loaded_days(
+    db_config: dict[str, Any],
+    base_code: str,
+    first_day: date,
+    last_day: date,
+    table: str = DEFAULT_TABLE,
+    currency_table: str = DEFAULT_CURRENCY_TABLE,
+) -> set[date]:
+    """Return the days (UTC) from first_day to last_day that already have rows for base_code."""
+    epoch = date(1970, 1, 1)
+    start = int(datetime(first_day.year, first_day.month, first_day.day, tzinfo=timezone.utc).timestamp())
+    end = start + ((last_day - first_day).days + 1) * 86400
+    conn = connect_to_mysql(db_config)
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            f"SELECT DISTINCT r.updated_at DIV 86400 FROM {table} r "
+            f"JOIN {currency_table} c ON c.currency_id = r.base_id "
+            "WHERE c.code = %s AND r.updated_at >= %s AND r.updated_at < %s",
+            (base_code, start, end),
+        )
+        return {epoch + timedelta(days=int(row[0])) for row in cursor.fetchall()}
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def migrate_to_compact(
+    db_config: dict[str, Any],
+    source_table: str,
+    table: str = DEFAULT_TABLE,
+    currency_table: str = DEFAULT_CURRENCY_TABLE,
+    batch_size: int = 10_000,
+    start_after_id: int = 0,
+    batcher: AdaptiveBatcher | None = None,
+) -> int:
+    """Copy an existing rates table into the compact schema in id-ordered batches.
+
+    Each batch is read with keyset pagination (``id > last_id``) and committed
+    on its own, so the migration can be interrupted and resumed with
+    start_after_id set to the last id it logged. With batcher, each batch's
+    size follows how long the previous read-upsert-commit took instead of
+    being fixed at batch_size.
+
+    Returns:
+        int: Number of source rows migrated
+    """
+    cache = get_currency_cache(db_config, currency_table)
+    conn = connect_to_mysql(db_config)
+    create_compact_schema(conn, table, currency_table)
+    cursor = conn.cursor()
+    last_id = start_after_id
+    migrated = 0
+    try:
+        cache.refresh(cursor)
+        while True:
+            size = batcher.size if batcher is not None else batch_size
+            started = time.perf_counter()
+            cursor.execute(
+                f"SELECT id, base_code, target_code, time_last_update_unix, rate FROM {source_table} "
+                "WHERE id > %s ORDER BY id LIMIT %s",
+                (last_id, size),
+            )
+            batch = cursor.fetchall()
+            if not batch:
+                break
+            ids = cache.ids_for(cursor, {r[1] for r in batch} | {r[2] for r in batch})
+            tuples = [(ids[base], ids[target], int(ts), rate) for _, base, target, ts, rate in batch]
+            insert_compact_rows(cursor, table, tuples, size)
+            conn.commit()
+            if batcher is not None:
+                batcher.record(len(batch), time.perf_counter() - started)
+            last_id = batch[-1][0]
+            migrated += len(batch)
+            logger.info(f"Migrated {migrated} rows from {source_table} (last id {last_id})")
+    except Exception as e:
+        logger.error(f"Migration stopped after id {last_id}: {e}")
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
+    logger.info(f"Migration of {source_table} into {table} complete: {migrated} rows")
+    if batcher is not None:
+        logger.info(f"Adaptive batching {batcher.summary()}")
+    return migrated
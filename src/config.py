@@ -3,6 +3,7 @@
 
 import logging
 import os
+from datetime import date
 from pathlib import Path
 
 import yaml
@@ -72,6 +73,38 @@ def construct_api_url(config: dict) -> str:
         raise
 
 
+def construct_history_url(config: dict, base_code: str, day: date) -> str:
+    """Construct the URL of the API's historical rates for base_code on day."""
+    api_key = os.getenv("EXCHANGE_RATE_API_KEY")
+    if not api_key:
+        raise ValueError("EXCHANGE_RATE_API_KEY environment variable is not set")
+    return f"{config['api']['base_url']}/{api_key}/history/{base_code.upper()}/{day.year}/{day.month}/{day.day}"
+
+
+def get_target_currencies(config: dict) -> tuple[str, ...] | None:
+    """Return the target currency codes this deployment needs, or None for all of them.
+
+    The set named by the ETL_CURRENCY_SET environment variable (or
+    `etl.currency_set`) is looked up in `etl.currency_sets`; without one,
+    `etl.target_currencies` is used. Codes are upper-cased and de-duplicated in
+    config order.
+    """
+    etl_config = config.get("etl", {}) or {}
+    set_name = os.getenv("ETL_CURRENCY_SET") or etl_config.get("currency_set")
+    if set_name:
+        currency_sets = etl_config.get("currency_sets", {}) or {}
+        if set_name not in currency_sets:
+            raise ValueError(f"Unknown currency set {set_name!r}; defined sets: {sorted(currency_sets)}")
+        codes = currency_sets[set_name]
+        logger.info(f"Using currency set {set_name!r}")
+    else:
+        codes = etl_config.get("target_currencies")
+
+    if not codes:
+        return None
+    return tuple(dict.fromkeys(str(code).strip().upper() for code in codes))
+
+
 def load_database_config() -> dict:
     """Load database configuration from environment variables."""
     try:
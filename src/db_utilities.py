@@ -2,23 +2,56 @@
 """Database utilities for exchange rates ETL pipeline."""
 
 import logging
+from collections.abc import Iterator
 from pathlib import Path
 from typing import Any
 
-import mysql.connector
 from retrying import retry
 
+from profiling_utilities import timed
+
+# mysql.connector is imported inside the functions that talk to the server so
+# that importing this module (e.g. for load_sql_template) stays cheap.
+
 logger = logging.getLogger(__name__)
 
 
+def _is_mysql_error(e: Exception) -> bool:
+    """Return True if e is a mysql.connector.Error (retry predicate)."""
+    import mysql.connector
+
+    return isinstance(e, mysql.connector.Error)
+
+
+@timed("db.connect_to_mysql")
 @retry(
     stop_max_attempt_number=3,
     wait_fixed=10000,
-    retry_on_exception=lambda e: isinstance(e, mysql.connector.Error),
+    retry_on_exception=_is_mysql_error,
 )
 def connect_to_mysql(db_config: dict[str, Any]):
     """Establish and return a MySQL connection using db_config.
 
+    MySQL errors are retried up to 3 attempts, 10 seconds apart.
+
+    Args:
+        db_config: Dictionary containing database connection parameters
+
+    Returns:
+        MySQLConnection: Active database connection
+
+    Raises:
+        mysql.connector.Error: If every attempt fails
+    """
+    return connect_to_mysql_once(db_config)
+
+
+def connect_to_mysql_once(db_config: dict[str, Any]):
+    """Establish and return a MySQL connection using db_config, without retrying.
+
+    For optional lookups that have a fallback and shouldn't stall the run while
+    the server is down.
+
     Args:
         db_config: Dictionary containing database connection parameters
 
@@ -28,6 +61,8 @@ def connect_to_mysql(db_config: dict[str, Any]):
     Raises:
         mysql.connector.Error: If connection fails
     """
+    import mysql.connector
+
     logger.info("Attempting to connect to MySQL database...")
     logger.info(
         "Connection details: %s@%s:%s/%s",
@@ -116,3 +151,42 @@ def load_sql_template(name: str) -> str:
     except Exception as e:
         logger.error(f"Unexpected error loading SQL template {name}: {e}")
         raise
+
+
+def split_sql_statements(sql: str) -> list[str]:
+    """Split an SQL script into statements, dropping `--` comment lines.
+
+    Intended for our own DDL templates (no semicolons inside string literals).
+    """
+    lines = [line for line in sql.splitlines() if not line.lstrip().startswith("--")]
+    return [stmt.strip() for stmt in "\n".join(lines).split(";") if stmt.strip()]
+
+
+def stream_query(
+    connection,
+    sql: str,
+    params: tuple | dict | None = None,
+    chunk_size: int = 10_000,
+) -> tuple[list[str], Iterator[list[tuple]]]:
+    """Run a query on an unbuffered cursor and return (column names, chunk iterator).
+
+    Rows are pulled from the server chunk_size at a time as the iterator is
+    consumed, so memory stays flat no matter how large the result is. The
+    connection can't run anything else until the iterator is exhausted; if the
+    caller stops early it should close the connection.
+    """
+    cursor = connection.cursor(buffered=False)
+    cursor.execute(sql, params)
+
+    def chunks() -> Iterator[list[tuple]]:
+        finished = False
+        try:
+            while chunk := cursor.fetchmany(chunk_size):
+                yield chunk
+            finished = True
+        finally:
+            # Closing with unread rows raises "Unread result found"; closing the connection drops them
+            if finished:
+                cursor.close()
+
+    return list(cursor.column_names), chunks()
@@ -0,0 +1,230 @@
+# export.py
+"""Stream slices of the rates table to CSV, gzipped CSV or Parquet files.
+
+Rows come off an unbuffered cursor (db_utilities.stream_query) chunk_size at a
+time. Each chunk is written out before the next is fetched, so memory use
+depends on chunk_size, not on how many rows the slice has. The file is built
+under a temporary name and renamed into place when complete.
+
+Parquet needs the optional `pyarrow` package. Each chunk becomes one row
+group, with a fixed schema that keeps rate as DECIMAL(20,8).
+"""
+
+import csv
+import gzip
+import logging
+import os
+import tempfile
+import time
+from collections.abc import Iterator, Sequence
+from dataclasses import dataclass
+from datetime import date, datetime, time as dt_time, timedelta
+from pathlib import Path
+
+from db_utilities import connect_to_mysql, stream_query
+from profiling_utilities import timed
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ("csv", "csv.gz", "parquet")
+DEFAULT_CHUNK_SIZE = 10_000
+DEFAULT_COLUMNS = (
+    "base_code",
+    "target_code",
+    "rate",
+    "time_last_update_utc",
+    "time_next_update_utc",
+    "time_last_update_unix",
+    "time_next_update_unix",
+)
+# Columns of the rates table (sql/create_rates_table.sql) that may be exported
+EXPORTABLE_COLUMNS = (*DEFAULT_COLUMNS, "id", "row_created_at", "row_updated_at")
+PROGRESS_EVERY = 5.0  # seconds between throughput log lines
+
+
+@dataclass
+class ExportReport:
+    """What an export wrote and how fast."""
+
+    path: Path
+    format: str
+    rows: int
+    bytes: int
+    chunks: int
+    seconds: float
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    @property
+    def megabytes_per_second(self) -> float:
+        return self.bytes / 1e6 / self.seconds if self.seconds else 0.0
+
+
+def infer_format(path: Path) -> str:
+    """Pick the output format from the file name (.csv, .csv.gz or .parquet)."""
+    name = path.name.lower()
+    for fmt in sorted(FORMATS, key=len, reverse=True):
+        if name.endswith(f".{fmt}"):
+            return fmt
+    raise ValueError(f"Can't infer export format from {path.name!r}; use one of {FORMATS} or pass format")
+
+
+def build_export_query(
+    table: str,
+    since: date | None = None,
+    until: date | None = None,
+    bases: Sequence[str] = (),
+    targets: Sequence[str] = (),
+    columns: Sequence[str] = DEFAULT_COLUMNS,
+) -> tuple[str, list]:
+    """Return (sql, params) selecting columns for the given inclusive day range and codes.
+
+    The day range filters time_last_update_utc, the partitioning and index key,
+    so only the matching partitions are read. Rows come back in that order.
+    """
+    unknown = [column for column in columns if column not in EXPORTABLE_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown export columns {unknown}; choose from {EXPORTABLE_COLUMNS}")
+    where, params = [], []
+    if since is not None:
+        where.append("time_last_update_utc >= %s")
+        params.append(datetime.combine(since, dt_time.min))
+    if until is not None:
+        where.append("time_last_update_utc < %s")
+        params.append(datetime.combine(until + timedelta(days=1), dt_time.min))
+    for column, codes in (("base_code", bases), ("target_code", targets)):
+        if codes:
+            where.append(f"{column} IN ({', '.join(['%s'] * len(codes))})")
+            params.extend(code.upper() for code in codes)
+    sql = f"SELECT {', '.join(columns)} FROM {table}"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    return sql + " ORDER BY time_last_update_utc", params
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        return None
+    return pyarrow
+
+
+def _arrow_schema(pa, columns: Sequence[str]):
+    types = {
+        "id": pa.int64(),
+        "base_code": pa.string(),
+        "target_code": pa.string(),
+        "rate": pa.decimal128(20, 8),
+        "time_last_update_unix": pa.int64(),
+        "time_next_update_unix": pa.int64(),
+    }
+    return pa.schema([(column, types.get(column, pa.timestamp("s"))) for column in columns])
+
+
+def write_chunks(
+    columns: Sequence[str],
+    chunks: Iterator[list[tuple]],
+    out_path: Path,
+    fmt: str,
+    on_chunk=None,
+) -> tuple[int, int]:
+    """Write row chunks to out_path as they arrive; returns (rows, chunks).
+
+    on_chunk(rows_so_far) is called after each chunk is written.
+    """
+    rows = n_chunks = 0
+    if fmt in ("csv", "csv.gz"):
+        opener = gzip.open if fmt == "csv.gz" else open
+        with opener(out_path, "wt", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(columns)
+            for chunk in chunks:
+                writer.writerows(chunk)
+                rows += len(chunk)
+                n_chunks += 1
+                if on_chunk:
+                    on_chunk(rows)
+    elif fmt == "parquet":
+        pa = _pyarrow()
+        if pa is None:
+            raise RuntimeError("Parquet export needs the pyarrow package (pip install pyarrow)")
+        schema = _arrow_schema(pa, columns)
+        with pa.parquet.ParquetWriter(out_path, schema, compression="zstd") as writer:
+            for chunk in chunks:
+                arrays = [pa.array(values, type=field.type) for values, field in zip(zip(*chunk), schema)]
+                writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+                rows += len(chunk)
+                n_chunks += 1
+                if on_chunk:
+                    on_chunk(rows)
+    else:
+        raise ValueError(f"Unknown export format {fmt!r}; choose from {FORMATS}")
+    return rows, n_chunks
+
+
+@timed("export.export_rates", rows=lambda report: report.rows)
+def export_rates(
+    db_config: dict,
+    out_path: Path,
+    fmt: str | None = None,
+    since: date | None = None,
+    until: date | None = None,
+    bases: Sequence[str] = (),
+    targets: Sequence[str] = (),
+    columns: Sequence[str] = DEFAULT_COLUMNS,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    table: str | None = None,
+) -> ExportReport:
+    """Stream the selected rates to out_path and return a throughput report.
+
+    Args:
+        db_config: Connection settings from config.load_database_config()
+        out_path: Destination file; its suffix picks the format unless fmt is given
+        fmt: "csv", "csv.gz" or "parquet"
+        since, until: Inclusive UTC days of time_last_update_utc
+        bases, targets: Only these base / target codes (all when empty)
+        columns: Columns to export, in order
+        chunk_size: Rows fetched from the server and written per chunk
+        table: Source table; defaults to db_config["table"]
+    """
+    fmt = fmt or infer_format(out_path)
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format {fmt!r}; choose from {FORMATS}")
+    sql, params = build_export_query(table or db_config["table"], since, until, bases, targets, columns)
+    logger.info(f"Exporting to {out_path} ({fmt}, {chunk_size} rows per fetch): {sql}")
+
+    start = time.perf_counter()
+    last_report = start
+
+    def progress(rows: int) -> None:
+        nonlocal last_report
+        now = time.perf_counter()
+        if now - last_report >= PROGRESS_EVERY:
+            last_report = now
+            logger.info(f"Exported {rows} rows ({rows / (now - start):,.0f} rows/s)")
+
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=out_path.parent, prefix=f".{out_path.name}.", suffix=".tmp")
+    os.close(fd)
+    conn = connect_to_mysql(db_config)
+    try:
+        names, chunks = stream_query(conn, sql, params, chunk_size)
+        rows, n_chunks = write_chunks(names, chunks, Path(tmp_name), fmt, progress)
+        os.replace(tmp_name, out_path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+    finally:
+        conn.close()
+
+    report = ExportReport(out_path, fmt, rows, out_path.stat().st_size, n_chunks, time.perf_counter() - start)
+    logger.info(
+        f"Exported {report.rows} rows in {report.chunks} chunks to {out_path} "
+        f"({report.bytes / 1e6:.1f} MB) in {report.seconds:.2f}s: "
+        f"{report.rows_per_second:,.0f} rows/s, {report.megabytes_per_second:.1f} MB/s"
+    )
+    return report
@@ -2,22 +2,33 @@
 """Extract module for exchange rates ETL pipeline."""
 
 import logging
-from collections.abc import Mapping
-from typing import Any
+import time
 
 import requests
 from retrying import retry
 
+import metrics
+import quota
+from json_backend import RatesPayload, decode_payload
+from profiling_utilities import timed
+
 logger = logging.getLogger(__name__)
 
 
+@timed("extract.fetch_exchange_rates")
 @retry(
     stop_max_attempt_number=3,
     wait_fixed=10000,
     retry_on_exception=lambda e: isinstance(e, requests.RequestException),
 )
-def get_exchange_rates(url: str, timeout: float = 10.0) -> Mapping[str, Any]:
-    """Fetch exchange rates from the API endpoint."""
+def fetch_exchange_rates(url: str, timeout: float = 10.0, priority: str = "scheduled") -> bytes:
+    """Fetch the raw response body from the API endpoint.
+
+    Every attempt, retries included, is charged to the active quota ledger at
+    the given priority; QuotaExceededError (not retried) means it was refused.
+    """
+    quota.spend(priority, caller="extract")
+    start = time.perf_counter()
     try:
         logger.info(f"Fetching rates from {url[:30]}***.. (truncated for security)")
         response = requests.get(url, timeout=timeout)
@@ -26,5 +37,18 @@ def get_exchange_rates(url: str, timeout: float = 10.0) -> Mapping[str, Any]:
     except requests.RequestException as e:
         status = getattr(e.response, "status_code", "N/A")
         logger.error(f"Error fetching exchange rates (status={status}): {e}")
+        _record_request("error", time.perf_counter() - start)
         raise
-    return response.json()
+    _record_request("success", time.perf_counter() - start)
+    return response.content
+
+
+def get_exchange_rates(url: str, timeout: float = 10.0, priority: str = "scheduled") -> RatesPayload:
+    """Fetch exchange rates from the API endpoint and decode them into a RatesPayload."""
+    return decode_payload(fetch_exchange_rates(url, timeout, priority))
+
+
+def _record_request(outcome: str, seconds: float) -> None:
+    """Count one API attempt (retries included) and record its latency."""
+    metrics.inc("api_requests_total", help_text="API request attempts, including retries", outcome=outcome)
+    metrics.set_gauge("api_request_duration_seconds", seconds, "Latency of the most recent API request attempt")
@@ -0,0 +1,198 @@
+# json_backend.py
+"""Pluggable JSON layer for API payloads and raw archives.
+
+The fastest installed backend is picked at import time: msgspec, then orjson,
+then the stdlib json module. Set EXCHANGE_RATES_JSON_BACKEND to orjson,
+msgspec or stdlib to force one.
+
+decode_payload() turns response bytes straight into a RatesPayload, optionally
+projected to the configured target currencies. With msgspec the bytes are
+decoded and type-checked in one pass with no intermediate dict; the other
+backends parse to a dict and then check the fields. Integer rates stay ints on
+every backend, so the processed CSVs don't depend on which one is installed.
+RatesPayload is also a read-only Mapping, so code written against the raw dict
+(raw["base_code"], raw.get("conversion_rates", {})) keeps working.
+"""
+
+import importlib.util
+import json
+import logging
+import os
+from collections.abc import Iterator, Mapping, Sequence
+from dataclasses import MISSING, dataclass, fields
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("msgspec", "orjson", "stdlib")
+
+
+class PayloadError(ValueError):
+    """Raised when bytes are not valid JSON or don't match the payload schema."""
+
+
+@dataclass(slots=True, eq=False)
+class RatesPayload(Mapping):
+    """A `latest/<BASE>` response from the exchange rates API."""
+
+    base_code: str
+    time_last_update_unix: int
+    time_last_update_utc: str
+    time_next_update_unix: int
+    time_next_update_utc: str
+    conversion_rates: dict[str, int | float]
+    result: str = "success"
+    documentation: str = ""
+    terms_of_use: str = ""
+
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return getattr(self, key)
+        except (AttributeError, TypeError):
+            raise KeyError(key) from None
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(_FIELD_NAMES)
+
+    def __len__(self) -> int:
+        return len(_FIELD_NAMES)
+
+    def to_dict(self) -> dict[str, Any]:
+        """Return the payload as a plain dict in API field order."""
+        return {name: getattr(self, name) for name in _API_ORDER}
+
+    @classmethod
+    def from_mapping(cls, data: Mapping[str, Any]) -> "RatesPayload":
+        """Build a payload from an already-parsed dict, checking field types."""
+        if not isinstance(data, Mapping):
+            raise PayloadError(f"Expected a JSON object, got {type(data).__name__}")
+        kwargs = {}
+        for name, expected in _FIELD_TYPES.items():
+            if name not in data:
+                if name in _REQUIRED:
+                    raise PayloadError(f"Payload is missing required field {name!r}")
+                continue
+            value = data[name]
+            if not isinstance(value, expected) or (expected is int and isinstance(value, bool)):
+                raise PayloadError(f"Payload field {name!r} should be {expected.__name__}, got {type(value).__name__}")
+            kwargs[name] = value
+        rates = kwargs["conversion_rates"]
+        if not all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in rates.values()):
+            raise PayloadError("Payload field 'conversion_rates' must map codes to numbers")
+        return cls(**kwargs)
+
+
+_FIELD_NAMES = tuple(f.name for f in fields(RatesPayload))
+_REQUIRED = {f.name for f in fields(RatesPayload) if f.default is MISSING}
+_FIELD_TYPES = {
+    f.name: {"conversion_rates": dict, "time_last_update_unix": int, "time_next_update_unix": int}.get(f.name, str)
+    for f in fields(RatesPayload)
+}
+# Field order of the provider's JSON, used when a payload is written back out
+_API_ORDER = (
+    "result",
+    "documentation",
+    "terms_of_use",
+    "time_last_update_unix",
+    "time_last_update_utc",
+    "time_next_update_unix",
+    "time_next_update_utc",
+    "base_code",
+    "conversion_rates",
+)
+
+
+def _select_backend() -> str:
+    forced = os.environ.get("EXCHANGE_RATES_JSON_BACKEND", "").strip().lower()
+    if forced:
+        if forced not in BACKENDS:
+            raise ValueError(f"Unknown JSON backend {forced!r}; expected one of {BACKENDS}")
+        return forced
+    for name in BACKENDS[:-1]:
+        if importlib.util.find_spec(name) is not None:
+            return name
+    return "stdlib"
+
+
+BACKEND = _select_backend()
+
+if BACKEND == "orjson":
+    import orjson
+
+    def loads(data: bytes | str) -> Any:
+        """Parse JSON text or bytes."""
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError as e:
+            raise PayloadError(str(e)) from e
+
+    def dumps(obj: Any, indent: bool = False) -> bytes:
+        """Serialise obj to UTF-8 JSON bytes."""
+        option = orjson.OPT_INDENT_2 if indent else 0
+        return orjson.dumps(obj.to_dict() if isinstance(obj, RatesPayload) else obj, option=option)
+
+    def _decode_payload(data: bytes | str) -> RatesPayload:
+        return RatesPayload.from_mapping(loads(data))
+
+elif BACKEND == "msgspec":
+    import msgspec
+
+    _decoder = msgspec.json.Decoder()
+    _payload_decoder = msgspec.json.Decoder(RatesPayload)
+    _encoder = msgspec.json.Encoder()
+
+    def loads(data: bytes | str) -> Any:
+        """Parse JSON text or bytes."""
+        try:
+            return _decoder.decode(data)
+        except msgspec.DecodeError as e:
+            raise PayloadError(str(e)) from e
+
+    def dumps(obj: Any, indent: bool = False) -> bytes:
+        """Serialise obj to UTF-8 JSON bytes."""
+        encoded = _encoder.encode(obj.to_dict() if isinstance(obj, RatesPayload) else obj)
+        return msgspec.json.format(encoded, indent=2) if indent else encoded
+
+    def _decode_payload(data: bytes | str) -> RatesPayload:
+        # Parse and type-check in one pass
+        try:
+            return _payload_decoder.decode(data)
+        except msgspec.DecodeError as e:
+            raise PayloadError(str(e)) from e
+
+else:
+
+    def loads(data: bytes | str) -> Any:
+        """Parse JSON text or bytes."""
+        try:
+            return json.loads(data)
+        except json.JSONDecodeError as e:
+            raise PayloadError(str(e)) from e
+
+    def dumps(obj: Any, indent: bool = False) -> bytes:
+        """Serialise obj to UTF-8 JSON bytes."""
+        obj = obj.to_dict() if isinstance(obj, RatesPayload) else obj
+        return json.dumps(obj, indent=2 if indent else None, ensure_ascii=False).encode("utf-8")
+
+    def _decode_payload(data: bytes | str) -> RatesPayload:
+        return RatesPayload.from_mapping(loads(data))
+
+
+def project_rates(rates: dict[str, float], currencies: Sequence[str]) -> dict[str, float]:
+    """Keep only the given codes (in that order); codes the payload lacks are left out."""
+    return {code: rates[code] for code in currencies if code in rates}
+
+
+def decode_payload(data: bytes | str, currencies: Sequence[str] | None = None) -> RatesPayload:
+    """Parse a rates payload from JSON bytes.
+
+    With currencies, conversion_rates is cut down to those codes right after
+    decoding, so nothing downstream handles the rest.
+    """
+    payload = _decode_payload(data)
+    if currencies is not None:
+        payload.conversion_rates = project_rates(payload.conversion_rates, currencies)
+    return payload
+
+
+logger.debug(f"Using {BACKEND} JSON backend")
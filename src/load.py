@@ -1,56 +1,164 @@
 # load.py
 """Load module for exchange rates ETL pipeline."""
 
+import contextlib
 import csv
+import gzip
 import logging
+import os
+import shutil
+import tempfile
+from collections.abc import Iterator
+from datetime import date, datetime, timedelta
 from pathlib import Path
 from typing import Any
 
+from data_utilities import CsvManifest, open_csv_for_read
 from db_utilities import connect_to_mysql, load_sql_template
+from profiling_utilities import timed
 
 logger = logging.getLogger(__name__)
 
 
+class LoadReconciliationError(RuntimeError):
+    """Raised when the table doesn't hold every row the CSV manifest promised."""
+
+
+@timed("load.load_csv_to_mysql", rows=lambda affected: affected)
 def load_csv_to_mysql(
     csv_path: Path,
     table_name: str,
     db_config: dict[str, Any],
-) -> None:
-    """Read CSV and load data into MySQL table."""
+    replace: bool = False,
+) -> int:
+    """Read CSV and load data into MySQL table, returning the number of rows loaded.
+
+    When the writer left a manifest (see data_utilities.CsvManifest) the file
+    is validated from it without being re-read, and the load is reconciled
+    against it before commit.
+
+    Rows whose key is already in the table are skipped, or overwritten with
+    replace (LOAD DATA ... REPLACE; MySQL then counts a replaced row twice).
+    """
     if not csv_path.exists():
         raise FileNotFoundError(f"CSV file {csv_path} does not exist")
 
     # 1) Validate CSV file and count rows
     logger.info(f"Analyzing CSV file: {csv_path}")
 
-    with csv_path.open("r", encoding="utf-8") as f:
-        reader = csv.reader(f)
-        try:
-            header = next(reader)
-            if not header:
-                logger.warning(f"CSV file {csv_path} has no header row")
-                return
+    manifest = CsvManifest.load(csv_path)
+    if manifest is not None:
+        if not manifest.matches(csv_path):
+            raise ValueError(
+                f"CSV file {csv_path} does not match its manifest ({csv_path.stat().st_size} bytes on disk, "
+                f"{manifest.file_bytes} written); it was changed or only partly written"
+            )
+        header, row_count = manifest.header, manifest.rows
+    else:
+        with open_csv_for_read(csv_path) as f:
+            reader = csv.reader(f)
+            try:
+                header = next(reader)
+                if not header:
+                    logger.warning(f"CSV file {csv_path} has no header row")
+                    return 0
 
-            # Count data rows (excluding header)
-            row_count = sum(1 for row in reader if row)  # Non-empty rows only
+                # Count data rows (excluding header)
+                row_count = sum(1 for row in reader if row)  # Non-empty rows only
 
-        except StopIteration:
-            logger.warning(f"CSV file {csv_path} is empty")
-            return
+            except StopIteration:
+                logger.warning(f"CSV file {csv_path} is empty")
+                return 0
 
     if row_count == 0:
         logger.warning(f"CSV file {csv_path} has no data rows")
-        return
+        return 0
 
-    logger.info(f"Successfully validated CSV file: {csv_path}")
+    logger.info(f"Successfully validated CSV file: {csv_path}{' (from manifest)' if manifest else ''}")
     logger.info(f"Header columns: {len(header)} ({', '.join(header[:5])}{'...' if len(header) > 5 else ''})")
     logger.info(f"Data rows to load: {row_count}")
     logger.info(f"Target table: {table_name}")
 
+    with _plain_csv(csv_path) as plain_path:
+        return _load_data(plain_path, table_name, db_config, row_count, manifest, replace)
+
+
+def loaded_days(
+    table_name: str, db_config: dict[str, Any], base_code: str, first_day: date, last_day: date
+) -> set[date]:
+    """Return the days (UTC) from first_day to last_day that already have rows for base_code."""
+    start = datetime(first_day.year, first_day.month, first_day.day)
+    end = start + timedelta(days=(last_day - first_day).days + 1)
+    conn = connect_to_mysql(db_config)
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            f"SELECT DISTINCT DATE(time_last_update_utc) FROM {table_name} "
+            "WHERE base_code = %s AND time_last_update_utc >= %s AND time_last_update_utc < %s",
+            (base_code, start, end),
+        )
+        return {row[0] for row in cursor.fetchall()}
+    finally:
+        cursor.close()
+        conn.close()
+
+
+@contextlib.contextmanager
+def _plain_csv(csv_path: Path) -> Iterator[Path]:
+    """Yield an uncompressed copy of a .csv.gz (removed afterwards), or csv_path itself."""
+    if csv_path.suffix != ".gz":
+        yield csv_path
+        return
+    # LOAD DATA reads plain text only; decompress next to the file so it stays on the same disk
+    fd, tmp_name = tempfile.mkstemp(dir=csv_path.parent, prefix=f".{csv_path.stem}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as out, gzip.open(csv_path, "rb") as src:
+            shutil.copyfileobj(src, out, 1 << 20)
+        logger.info(f"Decompressed {csv_path} for LOAD DATA")
+        yield Path(tmp_name)
+    finally:
+        Path(tmp_name).unlink(missing_ok=True)
+
+
+def _reconcile(cursor, table_name: str, manifest: CsvManifest, affected_rows: int) -> None:
+    """Check, inside the load transaction, that every manifest row is now in the table.
+
+    LOAD DATA LOCAL skips rows that are already present, so rowcount alone can't
+    tell a re-run from a partial load. Counting the rows in the manifest's
+    time_last_update_utc range (an index range scan) can. It can only
+    over-count, when other bases share the window, so a shortfall is always real.
+    """
+    if "time_last_update_utc" not in manifest.min:
+        return
+    low = datetime.fromisoformat(manifest.min["time_last_update_utc"])
+    high = datetime.fromisoformat(manifest.max["time_last_update_utc"])
+    cursor.execute(
+        f"SELECT COUNT(*) FROM {table_name} WHERE time_last_update_utc BETWEEN %s AND %s",
+        (low, high),
+    )
+    (present,) = cursor.fetchone()
+    if present < manifest.rows:
+        raise LoadReconciliationError(
+            f"Partial load into `{table_name}`: {manifest.file} has {manifest.rows} rows for {low} .. {high} "
+            f"but the table holds {present} (LOAD DATA reported {affected_rows})"
+        )
+    if affected_rows < manifest.rows:
+        logger.info(f"{manifest.rows - affected_rows} of {manifest.rows} rows were already in `{table_name}`")
+
+
+def _load_data(
+    csv_path: Path,
+    table_name: str,
+    db_config: dict[str, Any],
+    row_count: int,
+    manifest: CsvManifest | None = None,
+    replace: bool = False,
+) -> int:
     # 2) Build SQL via template
     template = load_sql_template("insert_rates.sql")
     sql = template.format(
         csv_file_path=csv_path.as_posix(),
+        duplicates="REPLACE" if replace else "IGNORE",
         table=table_name,
     )
     logger.info(f"Generated SQL: {sql}")
@@ -62,9 +170,12 @@ def load_csv_to_mysql(
         logger.info(f"Executing SQL to load data into MySQL table: {table_name}")
         cursor.execute(sql)
         affected_rows = cursor.rowcount
+        if manifest is not None:
+            _reconcile(cursor, table_name, manifest, affected_rows)
         conn.commit()
         logger.info(f"Successfully loaded {affected_rows} rows into `{table_name}` table")
         logger.info(f"Expected: {row_count} rows, Loaded: {affected_rows} rows")
+        return affected_rows
     except Exception as e:
         logger.info(f"Error loading data into `{table_name}` table: {e}")
         conn.rollback()
@@ -1,37 +1,114 @@
 # logging_utilities.py
 """Logging utilities for exchange rates ETL pipeline."""
 
+import atexit
+import json
 import logging
+import logging.handlers
+import queue
 import sys
 from pathlib import Path
 from utilities import get_current_date
 
+DEFAULT_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Background writer used when setup_logging(use_queue=True); None otherwise
+_listener: logging.handlers.QueueListener | None = None
+
+
+class JsonFormatter(logging.Formatter):
+    """Format each record as a single-line JSON object."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record, DATE_FORMAT),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def setup_logging(
+    log_name: str,
+    level: str | int = logging.INFO,
+    fmt: str | None = None,
+    use_queue: bool = False,
+    json_format: bool = False,
+) -> None:
+    """Configure logging to write messages to stdout and log files.
+
+    With use_queue=True the root logger only gets a QueueHandler; the stdout and
+    file handlers run on a QueueListener thread so log calls never block on disk
+    I/O. Call flush_logging() before reading the log file and shutdown_logging()
+    at exit (also registered with atexit).
+    """
+    global _listener
 
-def setup_logging(log_name: str) -> None:
-    """Configure logging to write messages to stdout and log files."""
     project_root = Path(__file__).resolve().parent.parent
     log_dir = project_root / "logs"
     log_dir.mkdir(exist_ok=True)
     current_date = get_current_date()
     log_path = log_dir / f"{log_name}_{current_date}.log"
 
-    handlers = [
+    formatter = JsonFormatter() if json_format else logging.Formatter(fmt or DEFAULT_FORMAT, datefmt=DATE_FORMAT)
+    handlers: list[logging.Handler] = [
         logging.StreamHandler(sys.stdout),
         logging.FileHandler(log_path, encoding="utf-8"),
     ]
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s %(levelname)s %(name)s: %(message)s",
-        datefmt="%Y-%m-%d %H:%M:%S",
-        handlers=handlers,
-    )
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    if use_queue:
+        shutdown_logging()
+        log_queue: queue.SimpleQueue = queue.SimpleQueue()
+        _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logging)
+        queue_handler = logging.handlers.QueueHandler(log_queue)
+        # prepare() merges args (and any traceback) into the message; the real
+        # formatting happens once on the listener's handlers
+        queue_handler.setFormatter(logging.Formatter("%(message)s"))
+        handlers = [queue_handler]
+
+    if isinstance(level, str):
+        level = logging.getLevelName(level.upper())
+    logging.basicConfig(level=level, handlers=handlers, force=True)
+
+
+def flush_logging() -> None:
+    """Block until every queued record has been written, then keep logging."""
+    if _listener is not None:
+        # stop() drains the queue and joins the writer thread; start() resumes it
+        _listener.stop()
+        _listener.start()
+    for handler in logging.getLogger().handlers:
+        handler.flush()
+
+
+def shutdown_logging() -> None:
+    """Drain the queue, stop the background writer and close its handlers."""
+    global _listener
+
+    if _listener is None:
+        return
+    listener, _listener = _listener, None
+    listener.stop()
+    for handler in listener.handlers:
+        handler.flush()
+        handler.close()
 
 
 def get_log_file_path(log_name: str) -> Path:
     """Get the path to the log file for the given log name."""
     try:
         today = get_current_date()
-        log_path = Path(__file__).parent / "logs" / f"{log_name}_{today}.log"
+        log_path = Path(__file__).resolve().parent.parent / "logs" / f"{log_name}_{today}.log"
         return log_path
     except Exception as e:
         logging.error(f"Failed to get log file path: {e}")
@@ -0,0 +1,182 @@
+# metrics.py
+"""In-process metrics collection and Prometheus textfile export for the ETL pipeline.
+
+Metrics are plain counters and gauges held in a module-level registry, so
+recording one is a dict update with no I/O. At the end of a run the registry is
+rendered once in the Prometheus text exposition format and written atomically
+for node_exporter's textfile collector to pick up.
+"""
+
+import json
+import logging
+import os
+import tempfile
+import time
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+PREFIX = "exchange_rates_etl_"
+
+LabelKey = tuple[tuple[str, str], ...]
+
+
+class MetricsRegistry:
+    """Counters and gauges keyed by metric name and label set."""
+
+    def __init__(self) -> None:
+        self._types: dict[str, str] = {}
+        self._help: dict[str, str] = {}
+        self._values: dict[str, dict[LabelKey, float]] = {}
+
+    def _series(self, name: str, kind: str, help_text: str) -> dict[LabelKey, float]:
+        if name not in self._types:
+            self._types[name] = kind
+            self._help[name] = help_text
+            self._values[name] = {}
+        elif self._types[name] != kind:
+            raise ValueError(f"Metric {name} already registered as {self._types[name]}")
+        return self._values[name]
+
+    def inc(self, name: str, value: float = 1.0, help_text: str = "", **labels: str) -> None:
+        """Increase a counter by value."""
+        series = self._series(name, "counter", help_text)
+        key = tuple(sorted(labels.items()))
+        series[key] = series.get(key, 0.0) + value
+
+    def set(self, name: str, value: float, help_text: str = "", **labels: str) -> None:
+        """Set a gauge to value."""
+        series = self._series(name, "gauge", help_text)
+        series[tuple(sorted(labels.items()))] = float(value)
+
+    def get(self, name: str, **labels: str) -> float | None:
+        """Return the current value of a series, or None if it was never recorded."""
+        return self._values.get(name, {}).get(tuple(sorted(labels.items())))
+
+    def clear(self) -> None:
+        """Drop every recorded metric."""
+        self._types.clear()
+        self._help.clear()
+        self._values.clear()
+
+    def render_prometheus(self) -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        lines: list[str] = []
+        for name in sorted(self._types):
+            full_name = PREFIX + name
+            if self._help[name]:
+                lines.append(f"# HELP {full_name} {self._help[name]}")
+            lines.append(f"# TYPE {full_name} {self._types[name]}")
+            for labels, value in sorted(self._values[name].items()):
+                label_str = ",".join(f'{k}="{_escape(v)}"' for k, v in labels)
+                series = f"{full_name}{{{label_str}}}" if label_str else full_name
+                lines.append(f"{series} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def to_dict(self) -> dict[str, list[dict]]:
+        """Return all metrics as a JSON-serialisable dict."""
+        return {
+            PREFIX + name: [{"labels": dict(labels), "value": value} for labels, value in sorted(series.items())]
+            for name, series in sorted(self._values.items())
+        }
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(value)
+
+
+registry = MetricsRegistry()
+
+
+def inc(name: str, value: float = 1.0, help_text: str = "", **labels: str) -> None:
+    """Increase a counter in the default registry."""
+    registry.inc(name, value, help_text, **labels)
+
+
+def set_gauge(name: str, value: float, help_text: str = "", **labels: str) -> None:
+    """Set a gauge in the default registry."""
+    registry.set(name, value, help_text, **labels)
+
+
+def record_freshness(time_last_update_unix: int, now: float | None = None) -> float:
+    """Record how old the provider's data is and return the age in seconds."""
+    now = time.time() if now is None else now
+    age = max(0.0, now - time_last_update_unix)
+    set_gauge("data_age_seconds", age, "Seconds since the provider's time_last_update_unix")
+    set_gauge("data_last_update_timestamp_seconds", time_last_update_unix, "Provider time_last_update_unix")
+    return age
+
+
+def record_stage_timings(timings: dict) -> None:
+    """Copy per-stage wall times recorded by profiling_utilities into stage gauges."""
+    for name, timing in timings.items():
+        if name.startswith("stage."):
+            set_gauge(
+                "stage_duration_seconds",
+                timing.wall_seconds,
+                "Wall time per pipeline stage",
+                stage=name.removeprefix("stage."),
+            )
+
+
+def record_api_retries() -> None:
+    """Derive the number of API retries in this run from the attempt counter."""
+    attempts = sum(registry.get("api_requests_total", outcome=o) or 0 for o in ("success", "error"))
+    if attempts:
+        set_gauge("api_retries", attempts - 1, "API retries in the most recent run")
+
+
+def _atomic_write(path: Path, content: str) -> None:
+    """Write content to path via a temp file in the same directory and os.replace."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(content)
+        # The textfile collector ignores unreadable files, so match the usual 0644
+        os.chmod(tmp_name, 0o644)
+        os.replace(tmp_name, path)
+    except Exception:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+
+
+def write_textfile(path: Path, metrics_registry: MetricsRegistry | None = None) -> Path:
+    """Atomically write the registry as a Prometheus textfile-collector file."""
+    metrics_registry = metrics_registry or registry
+    _atomic_write(path, metrics_registry.render_prometheus())
+    logger.info(f"Metrics written to {path}")
+    return path
+
+
+def write_json(path: Path, metrics_registry: MetricsRegistry | None = None) -> Path:
+    """Atomically write the registry as JSON."""
+    metrics_registry = metrics_registry or registry
+    _atomic_write(path, json.dumps(metrics_registry.to_dict(), indent=2))
+    logger.info(f"Metrics JSON written to {path}")
+    return path
+
+
+def export_metrics(config: dict | None, project_root: Path) -> None:
+    """Write the default registry to the paths configured under ``metrics``.
+
+    Relative paths are resolved against project_root. Export failures are logged
+    and swallowed so they never fail an otherwise successful run.
+    """
+    metrics_cfg = (config or {}).get("metrics", {}) or {}
+    if not metrics_cfg.get("enabled", True):
+        return
+
+    textfile = Path(metrics_cfg.get("textfile_path", "metrics/exchange_rates_etl.prom"))
+    json_path = metrics_cfg.get("json_path")
+    try:
+        write_textfile(textfile if textfile.is_absolute() else project_root / textfile)
+        if json_path:
+            json_path = Path(json_path)
+            write_json(json_path if json_path.is_absolute() else project_root / json_path)
+    except OSError as e:
+        logger.error(f"Failed to export metrics: {e}")
@@ -0,0 +1,276 @@
+# partition_maintenance.py
+"""Monthly partition maintenance for the rates table.
+
+The partitioned schema (sql/create_rates_table_partitioned.sql) starts with a
+single catch-all ``p_future`` partition. Maintenance keeps ``months_ahead``
+monthly partitions (``pYYYYMM``) split off ``p_future`` ahead of time, rolls
+partitions older than the retention window up into the daily summary table and
+then either archives them (EXCHANGE PARTITION into ``<table>_archive_pYYYYMM``)
+or drops them.
+"""
+
+import logging
+import re
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Any
+
+from db_utilities import connect_to_mysql, load_sql_template
+
+logger = logging.getLogger(__name__)
+
+FUTURE_PARTITION = "p_future"
+_MONTH_PARTITION = re.compile(r"^p(\d{4})(\d{2})$")
+
+
+@dataclass
+class MaintenanceReport:
+    """What a maintenance run did (or would do, for a dry run)."""
+
+    created: list[str] = field(default_factory=list)
+    rolled_up: list[str] = field(default_factory=list)
+    archived: list[str] = field(default_factory=list)
+    dropped: list[str] = field(default_factory=list)
+    statements: list[str] = field(default_factory=list)
+
+
+def month_start(d: date) -> date:
+    """Return the first day of d's month."""
+    return d.replace(day=1)
+
+
+def add_months(d: date, months: int) -> date:
+    """Return the first day of the month `months` after d's month."""
+    index = d.year * 12 + (d.month - 1) + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    """Return the partition name for a month, e.g. p202507."""
+    return f"p{month.year:04d}{month.month:02d}"
+
+
+def partition_month(name: str) -> date | None:
+    """Return the month a pYYYYMM partition holds, or None for other partitions."""
+    match = _MONTH_PARTITION.match(name)
+    return date(int(match[1]), int(match[2]), 1) if match else None
+
+
+def list_partitions(cursor, table: str) -> list[str]:
+    """Return the table's partition names in order."""
+    cursor.execute(
+        "SELECT PARTITION_NAME FROM information_schema.PARTITIONS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL "
+        "ORDER BY PARTITION_ORDINAL_POSITION",
+        (table,),
+    )
+    return [row[0] for row in cursor.fetchall()]
+
+
+def missing_future_months(
+    existing: list[str],
+    today: date,
+    months_ahead: int,
+    oldest: date | None = None,
+) -> list[date]:
+    """Return the months through today + months_ahead that have no partition yet.
+
+    Only months after the newest existing monthly partition are returned, since
+    REORGANIZE can only split p_future at its lower end. When there are no
+    monthly partitions yet (a freshly converted table), ``oldest`` is the month
+    of the oldest row so existing history is split by month too.
+    """
+    months = [m for m in (partition_month(n) for n in existing) if m is not None]
+    newest = max(months) if months else None
+    first = month_start(min(oldest, today)) if newest is None and oldest is not None else month_start(today)
+    last = add_months(month_start(today), months_ahead)
+    wanted = []
+    while first <= last:
+        wanted.append(first)
+        first = add_months(first, 1)
+    return [m for m in wanted if newest is None or m > newest]
+
+
+def build_reorganize_sql(table: str, months: list[date]) -> str:
+    """Return the ALTER TABLE that splits the given months off p_future."""
+    parts = [
+        f"PARTITION {partition_name(m)} VALUES LESS THAN ('{add_months(m, 1).isoformat()}')" for m in sorted(months)
+    ]
+    parts.append(f"PARTITION {FUTURE_PARTITION} VALUES LESS THAN (MAXVALUE)")
+    return f"ALTER TABLE {table} REORGANIZE PARTITION {FUTURE_PARTITION} INTO (\n    " + ",\n    ".join(parts) + "\n)"
+
+
+def expired_partitions(existing: list[str], today: date, retention_months: int) -> list[str]:
+    """Return monthly partitions that lie entirely before the retention window."""
+    cutoff = add_months(month_start(today), -retention_months)
+    return [n for n in existing if (m := partition_month(n)) is not None and m < cutoff]
+
+
+def ensure_future_partitions(conn, table: str, months_ahead: int, today: date, dry_run: bool = False) -> list[str]:
+    """Create monthly partitions through today + months_ahead; return the names created."""
+    cursor = conn.cursor()
+    try:
+        existing = list_partitions(cursor, table)
+        if FUTURE_PARTITION not in existing:
+            raise RuntimeError(f"Table {table} is not partitioned with a {FUTURE_PARTITION} partition")
+        oldest = None
+        if not any(partition_month(n) for n in existing):
+            cursor.execute(f"SELECT MIN(time_last_update_utc) FROM {table}")
+            row = cursor.fetchone()
+            oldest = row[0].date() if row and row[0] else None
+        months = missing_future_months(existing, today, months_ahead, oldest)
+        if not months:
+            logger.info(f"Partitions for {table} already cover {months_ahead} months ahead")
+            return []
+        sql = build_reorganize_sql(table, months)
+        logger.info(f"Creating partitions: {', '.join(partition_name(m) for m in months)}")
+        if not dry_run:
+            # p_future is empty in steady state, so the reorganize is a metadata-only change
+            cursor.execute(sql)
+        return [partition_name(m) for m in months]
+    finally:
+        cursor.close()
+
+
+def rollup_partition(conn, table: str, daily_table: str, partition: str, dry_run: bool = False) -> str:
+    """Aggregate one partition into the daily summary table and return the SQL used."""
+    sql = load_sql_template("rollup_rates_partition.sql").format(
+        table=table,
+        daily_table=daily_table,
+        partition=partition,
+    )
+    if not dry_run:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(sql)
+            conn.commit()
+            logger.info(f"Rolled up partition {partition} into {daily_table} ({cursor.rowcount} rows affected)")
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+    return sql
+
+
+def _has_rows(cursor, source: str) -> bool:
+    cursor.execute(f"SELECT 1 FROM {source} LIMIT 1")
+    return cursor.fetchone() is not None
+
+
+def _archive_statements(cursor, table: str, partition: str, archive_table: str) -> list[str]:
+    """The statements that move partition into archive_table, given what an earlier run left behind.
+
+    Safe to re-run: a run that stopped after EXCHANGE PARTITION leaves the rows
+    in the archive table and the partition empty. Exchanging again would swap
+    them back into the partition that is about to be dropped, so that case
+    only needs the DROP.
+    """
+    cursor.execute(
+        "SELECT CREATE_OPTIONS FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+        (archive_table,),
+    )
+    row = cursor.fetchone()
+    if row is None:
+        return [
+            f"CREATE TABLE {archive_table} LIKE {table}",
+            f"ALTER TABLE {archive_table} REMOVE PARTITIONING",
+            f"ALTER TABLE {table} EXCHANGE PARTITION {partition} WITH TABLE {archive_table}",
+        ]
+    statements = []
+    if "partitioned" in (row[0] or "").lower():
+        # Stopped between CREATE and REMOVE PARTITIONING
+        statements.append(f"ALTER TABLE {archive_table} REMOVE PARTITIONING")
+    if _has_rows(cursor, archive_table):
+        if _has_rows(cursor, f"{table} PARTITION ({partition})"):
+            raise RuntimeError(
+                f"Both {archive_table} and partition {partition} of {table} hold rows; "
+                "resolve by hand before retiring the partition"
+            )
+        logger.warning(f"{archive_table} already holds the rows of {partition}; resuming with the DROP")
+        return statements
+    return statements + [f"ALTER TABLE {table} EXCHANGE PARTITION {partition} WITH TABLE {archive_table}"]
+
+
+def retire_partition(conn, table: str, partition: str, archive: bool, dry_run: bool = False) -> list[str]:
+    """Archive (EXCHANGE into a standalone table) and/or drop one partition; return the SQL used.
+
+    With archive, the state an interrupted earlier run left behind is checked
+    first (see _archive_statements), so retiring a partition can be retried.
+    """
+    cursor = conn.cursor()
+    try:
+        statements = []
+        if archive:
+            statements += _archive_statements(cursor, table, partition, f"{table}_archive_{partition}")
+        statements.append(f"ALTER TABLE {table} DROP PARTITION {partition}")
+
+        if not dry_run:
+            for sql in statements:
+                logger.info(f"Executing: {sql}")
+                cursor.execute(sql)
+    finally:
+        cursor.close()
+    return statements
+
+
+def run_maintenance(
+    db_config: dict[str, Any],
+    table: str,
+    months_ahead: int = 3,
+    retention_months: int | None = None,
+    daily_table: str = "rates_daily",
+    archive: bool = True,
+    today: date | None = None,
+    dry_run: bool = False,
+) -> MaintenanceReport:
+    """Create future partitions and retire expired ones.
+
+    Args:
+        db_config: Connection parameters for connect_to_mysql
+        table: Partitioned rates table
+        months_ahead: How many months beyond the current one must have partitions
+        retention_months: Keep this many whole months before the current one; None keeps everything
+        daily_table: Summary table that expired partitions are rolled up into
+        archive: Exchange expired partitions into archive tables instead of discarding the rows
+        today: Reference date (defaults to today)
+        dry_run: Log and return the planned SQL without executing it
+
+    Returns:
+        MaintenanceReport: Partitions created, rolled up, archived and dropped
+    """
+    today = today or date.today()
+    report = MaintenanceReport()
+    conn = connect_to_mysql(db_config)
+    try:
+        report.created = ensure_future_partitions(conn, table, months_ahead, today, dry_run)
+        if report.created:
+            report.statements.append(build_reorganize_sql(table, [partition_month(n) for n in report.created]))
+
+        if retention_months is not None:
+            if not dry_run:
+                cursor = conn.cursor()
+                try:
+                    cursor.execute(load_sql_template("create_rates_daily_table.sql").format(daily_table=daily_table))
+                finally:
+                    cursor.close()
+
+            cursor = conn.cursor()
+            try:
+                existing = list_partitions(cursor, table)
+            finally:
+                cursor.close()
+
+            for partition in expired_partitions(existing, today, retention_months):
+                report.statements.append(rollup_partition(conn, table, daily_table, partition, dry_run))
+                report.rolled_up.append(partition)
+                report.statements += retire_partition(conn, table, partition, archive, dry_run)
+                (report.archived if archive else report.dropped).append(partition)
+    finally:
+        conn.close()
+
+    logger.info(
+        f"Partition maintenance for {table}{' (dry run)' if dry_run else ''}: created={report.created} "
+        f"rolled_up={report.rolled_up} archived={report.archived} dropped={report.dropped}"
+    )
+    return report
@@ -0,0 +1,176 @@
+# profiling_utilities.py
+"""Timing and profiling utilities for exchange rates ETL pipeline."""
+
+import functools
+import io
+import json
+import logging
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any
+
+from utilities import get_current_date
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Timing:
+    """Accumulated wall/CPU time and row count for a stage or function."""
+
+    name: str
+    wall_seconds: float = 0.0
+    cpu_seconds: float = 0.0
+    rows: int | None = None
+    calls: int = 0
+
+    def add(self, wall: float, cpu: float, rows: int | None) -> None:
+        """Fold one measured call into the running totals."""
+        self.wall_seconds += wall
+        self.cpu_seconds += cpu
+        self.calls += 1
+        if rows is not None:
+            self.rows = (self.rows or 0) + rows
+
+
+# Keyed by name so repeated calls (retries, backfills) aggregate instead of growing a list
+_timings: dict[str, Timing] = {}
+
+
+def _record(name: str, wall: float, cpu: float, rows: int | None) -> Timing:
+    timing = _timings.setdefault(name, Timing(name))
+    timing.add(wall, cpu, rows)
+    return timing
+
+
+def get_timings() -> dict[str, Timing]:
+    """Return the timings recorded so far, keyed by stage/function name."""
+    return dict(_timings)
+
+
+def reset_timings() -> None:
+    """Discard all recorded timings."""
+    _timings.clear()
+
+
+class StageRecord:
+    """Mutable handle yielded by timed_stage so the caller can attach a row count."""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.rows: int | None = None
+        self.wall_seconds = 0.0
+        self.cpu_seconds = 0.0
+
+
+@contextmanager
+def timed_stage(name: str) -> Iterator[StageRecord]:
+    """Measure wall and CPU time of a pipeline stage and log the result."""
+    record = StageRecord(name)
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    try:
+        yield record
+    finally:
+        record.wall_seconds = time.perf_counter() - wall_start
+        record.cpu_seconds = time.process_time() - cpu_start
+        _record(f"stage.{name}", record.wall_seconds, record.cpu_seconds, record.rows)
+        rows = f" rows={record.rows}" if record.rows is not None else ""
+        logger.info(f"[timing] {name}: wall={record.wall_seconds:.3f}s cpu={record.cpu_seconds:.3f}s{rows}")
+
+
+def timed(name: str, rows: Callable[[Any], int | None] | None = None) -> Callable:
+    """Decorate a function so every call is timed under ``name``.
+
+    Args:
+        name: Key under which the timing is aggregated
+        rows: Optional callable computing a row count from the return value
+
+    Returns:
+        Callable: Decorator preserving the wrapped function's signature
+    """
+
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            wall_start = time.perf_counter()
+            cpu_start = time.process_time()
+            result = None
+            try:
+                result = func(*args, **kwargs)
+                return result
+            finally:
+                row_count = None
+                if rows is not None and result is not None:
+                    try:
+                        row_count = rows(result)
+                    except (TypeError, AttributeError, ValueError):
+                        row_count = None
+                _record(name, time.perf_counter() - wall_start, time.process_time() - cpu_start, row_count)
+
+        return wrapper
+
+    return decorator
+
+
+def write_timing_summary(output_dir: Path, run_name: str, extra: dict[str, Any] | None = None) -> Path:
+    """Write the recorded timings as JSON to output_dir/timings_<run_name>_<date>.json."""
+    output_dir.mkdir(parents=True, exist_ok=True)
+    path = output_dir / f"timings_{run_name}_{get_current_date()}.json"
+    summary = {
+        "run": run_name,
+        "written_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "timings": [asdict(t) for t in _timings.values()],
+        **(extra or {}),
+    }
+    path.write_text(json.dumps(summary, indent=2), encoding="utf-8")
+
+    logger.info(f"Timing summary written to {path}")
+    for t in _timings.values():
+        rows = f" rows={t.rows}" if t.rows is not None else ""
+        logger.info(f"  {t.name}: calls={t.calls} wall={t.wall_seconds:.3f}s cpu={t.cpu_seconds:.3f}s{rows}")
+    return path
+
+
+@contextmanager
+def profile_run(output_dir: Path, run_name: str, top: int = 30) -> Iterator[None]:
+    """Run the enclosed block under cProfile and tracemalloc and dump both to output_dir.
+
+    Produces ``<run_name>_<date>.prof`` (loadable with pstats/snakeviz), a text
+    report of the top cumulative-time functions and a tracemalloc report of the
+    top allocation sites.
+    """
+    # Imported here so normal runs don't pay for the profiler modules at startup
+    import cProfile
+    import pstats
+    import tracemalloc
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    stem = output_dir / f"{run_name}_{get_current_date()}"
+
+    profiler = cProfile.Profile()
+    tracemalloc.start()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        prof_path = stem.with_suffix(".prof")
+        profiler.dump_stats(str(prof_path))
+
+        buffer = io.StringIO()
+        pstats.Stats(profiler, stream=buffer).sort_stats("cumulative").print_stats(top)
+        stem.with_name(stem.name + "_cpu.txt").write_text(buffer.getvalue(), encoding="utf-8")
+
+        lines = [f"current={current / 1024:.1f} KiB peak={peak / 1024:.1f} KiB", ""]
+        lines += [str(stat) for stat in snapshot.statistics("lineno")[:top]]
+        stem.with_name(stem.name + "_memory.txt").write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+        logger.info(f"Profile written to {prof_path} (peak traced memory {peak / 1024:.1f} KiB)")
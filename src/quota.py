@@ -0,0 +1,198 @@
+# quota.py
+"""Persisted ledger of API requests checked against the plan's monthly quota.
+
+Every request attempt the pipeline makes (retries included) goes through
+spend(), which records it in a small SQLite ledger and refuses it with
+QuotaExceededError when the budget doesn't allow it. The check and the
+record happen in one transaction, so concurrent processes sharing the ledger
+can't overspend between them.
+
+Work is prioritised by reserves: a priority may only spend while more than
+reserve[priority] requests are left in the period. The scheduled daily run
+normally has no reserve, while backfills keep some back, so a long backfill
+stops (and can be resumed next period) before it eats the requests the
+daily runs need. Priorities, highest first, are PRIORITIES.
+
+The module keeps one active ledger, set up from the `quota` config section
+with configure(); without one, spend() does nothing. Remaining budget is
+logged on every request and exported as the api_quota_* metrics.
+"""
+
+import logging
+import sqlite3
+import time
+from collections.abc import Iterator, Mapping
+from contextlib import closing, contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+PRIORITIES = ("scheduled", "backfill")
+DEFAULT_LEDGER = Path("data/state/api_quota.sqlite")
+# Log a warning once less than this share of the budget is left
+LOW_BUDGET_FRACTION = 0.1
+# Ledger rows older than this many seconds are pruned
+KEEP_SECONDS = 400 * 86400
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS requests (ts REAL NOT NULL, priority TEXT NOT NULL, caller TEXT)",
+    "CREATE INDEX IF NOT EXISTS idx_requests_ts ON requests (ts)",
+)
+
+
+class QuotaExceededError(RuntimeError):
+    """Raised when a request would go over the budget left for its priority."""
+
+
+@dataclass(frozen=True)
+class QuotaStatus:
+    """Requests used and left in the current quota period."""
+
+    period_start: datetime
+    used: int
+    budget: int | None
+
+    @property
+    def remaining(self) -> int | None:
+        return None if self.budget is None else max(self.budget - self.used, 0)
+
+    def summary(self) -> str:
+        if self.budget is None:
+            return f"{self.used} API requests since {self.period_start:%Y-%m-%d} (no budget set)"
+        return f"{self.used}/{self.budget} API requests used since {self.period_start:%Y-%m-%d}, {self.remaining} left"
+
+
+def period_start(now: float, reset_day: int = 1) -> datetime:
+    """Start (UTC midnight) of the quota period containing now; periods begin on reset_day."""
+    today = datetime.fromtimestamp(now, timezone.utc)
+    year, month = today.year, today.month
+    if today.day < reset_day:
+        year, month = (year, month - 1) if month > 1 else (year - 1, 12)
+    return datetime(year, month, reset_day, tzinfo=timezone.utc)
+
+
+class QuotaLedger:
+    """The ledger file and the budget it is checked against."""
+
+    def __init__(
+        self,
+        path: Path = DEFAULT_LEDGER,
+        monthly_budget: int | None = None,
+        reset_day: int = 1,
+        reserve: Mapping[str, int] | None = None,
+    ) -> None:
+        if not 1 <= reset_day <= 28:
+            raise ValueError(f"quota reset_day must be between 1 and 28, got {reset_day}")
+        unknown = set(reserve or {}) - set(PRIORITIES)
+        if unknown:
+            raise ValueError(f"Unknown quota priorities {sorted(unknown)}; expected {PRIORITIES}")
+        self.path = path
+        self.monthly_budget = monthly_budget or None
+        self.reset_day = reset_day
+        self.reserve = dict(reserve or {})
+        self._ready = False
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        # Created on first use, so merely configuring a ledger writes nothing
+        if not self._ready:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(sqlite3.connect(self.path, timeout=30.0, isolation_level=None)) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if not self._ready:
+                    for statement in SCHEMA:
+                        conn.execute(statement)
+                    conn.execute("DELETE FROM requests WHERE ts < ?", (time.time() - KEEP_SECONDS,))
+                yield conn
+                conn.execute("COMMIT")
+                self._ready = True
+            except BaseException:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                raise
+
+    def _status(self, conn: sqlite3.Connection, now: float) -> QuotaStatus:
+        start = period_start(now, self.reset_day)
+        (used,) = conn.execute("SELECT COUNT(*) FROM requests WHERE ts >= ?", (start.timestamp(),)).fetchone()
+        return QuotaStatus(start, used, self.monthly_budget)
+
+    def status(self, now: float | None = None) -> QuotaStatus:
+        with self._transaction() as conn:
+            return self._status(conn, time.time() if now is None else now)
+
+    def _allows(self, status: QuotaStatus, priority: str, requests: int) -> bool:
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown quota priority {priority!r}; expected one of {PRIORITIES}")
+        return status.remaining is None or status.remaining - requests >= self.reserve.get(priority, 0)
+
+    def allows(self, priority: str, requests: int = 1) -> bool:
+        """Whether priority may make `requests` more requests now."""
+        return self._allows(self.status(), priority, requests)
+
+    def spend(self, priority: str, caller: str = "") -> QuotaStatus:
+        """Record one request for priority, or raise QuotaExceededError if it isn't allowed."""
+        now = time.time()
+        with self._transaction() as conn:
+            status = self._status(conn, now)
+            allowed = self._allows(status, priority, 1)
+            if allowed:
+                conn.execute("INSERT INTO requests (ts, priority, caller) VALUES (?, ?, ?)", (now, priority, caller))
+                status = QuotaStatus(status.period_start, status.used + 1, status.budget)
+        record_status(status)
+        if not allowed:
+            metrics.inc("api_quota_refused_total", help_text="API requests refused by the quota", priority=priority)
+            raise QuotaExceededError(
+                f"API quota: refusing {priority} request ({status.summary()}, "
+                f"{self.reserve.get(priority, 0)} held back from {priority} work)"
+            )
+        if status.budget and status.remaining < status.budget * LOW_BUDGET_FRACTION:
+            logger.warning(status.summary())
+        else:
+            logger.info(status.summary())
+        return status
+
+
+def record_status(status: QuotaStatus) -> None:
+    """Export the quota status as metrics."""
+    metrics.set_gauge("api_quota_used", status.used, "API requests recorded in the current quota period")
+    if status.budget is not None:
+        metrics.set_gauge("api_quota_remaining", status.remaining, "API requests left in the current quota period")
+        metrics.set_gauge("api_quota_budget", status.budget, "API request budget of the quota period")
+
+
+_ledger: QuotaLedger | None = None
+
+
+def configure(config: dict | None, project_root: Path) -> QuotaLedger | None:
+    """Make the ledger described by config's `quota` section the active one (None if disabled)."""
+    global _ledger
+    quota_cfg = (config or {}).get("quota", {}) or {}
+    if not quota_cfg.get("enabled", True):
+        _ledger = None
+        return None
+    _ledger = QuotaLedger(
+        project_root / quota_cfg.get("ledger", DEFAULT_LEDGER),
+        quota_cfg.get("monthly_requests"),
+        quota_cfg.get("reset_day", 1),
+        quota_cfg.get("reserve"),
+    )
+    return _ledger
+
+
+def active() -> QuotaLedger | None:
+    return _ledger
+
+
+def spend(priority: str, caller: str = "") -> QuotaStatus | None:
+    """Record a request on the active ledger (no-op without one); see QuotaLedger.spend."""
+    return _ledger.spend(priority, caller) if _ledger is not None else None
+
+
+def allows(priority: str, requests: int = 1) -> bool:
+    """Whether the active ledger lets priority make `requests` more requests (True without one)."""
+    return _ledger.allows(priority, requests) if _ledger is not None else True
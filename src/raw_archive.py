@@ -0,0 +1,236 @@
+# raw_archive.py
+"""Compressed, content-addressed archive of raw API payloads.
+
+Each response body is stored once under the SHA-256 of its bytes:
+
+    <archive_dir>/objects/ab/abcdef....json.zst   (or .json.gz)
+
+index.jsonl, next to objects/, has one line per stored payload with its hash,
+base_code and time_last_update_unix. Storing a body that is already present
+only costs a hash and a stat, so archiving identical payloads on every run
+(e.g. when the provider hasn't updated) is cheap.
+
+zstd is used when the `zstandard` package is installed, gzip otherwise. Objects
+of either kind can be read back as long as the matching codec is available.
+"""
+
+import gzip
+import hashlib
+import logging
+import os
+import tempfile
+import time
+from collections.abc import Callable, Iterator, Sequence
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any
+
+import json_backend
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ARCHIVE_DIR = Path(__file__).parent.parent / "data" / "raw" / "archive"
+INDEX_NAME = "index.jsonl"
+ZSTD_LEVEL = 10
+GZIP_LEVEL = 6
+
+
+@dataclass
+class ArchiveEntry:
+    """One index line: where a payload lives and what it contains."""
+
+    sha256: str
+    base_code: str
+    time_last_update_unix: int
+    codec: str
+    size: int
+    stored_bytes: int
+    archived_at: int
+
+    def object_path(self, archive_dir: Path) -> Path:
+        return object_path(archive_dir, self.sha256, self.codec)
+
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError:
+        return None
+    return zstandard
+
+
+def default_codec() -> str:
+    """Return "zstd" if the zstandard package is installed, otherwise "gzip"."""
+    return "zstd" if _zstd() is not None else "gzip"
+
+
+def compress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        return _zstd().ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    if codec == "gzip":
+        # mtime=0 keeps the compressed bytes deterministic for identical input
+        return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+    raise ValueError(f"Unknown archive codec {codec!r}")
+
+
+def decompress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        zstandard = _zstd()
+        if zstandard is None:
+            raise RuntimeError("This archive object is zstd-compressed; install `zstandard` to read it")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if codec == "gzip":
+        return gzip.decompress(data)
+    raise ValueError(f"Unknown archive codec {codec!r}")
+
+
+def object_path(archive_dir: Path, sha256: str, codec: str) -> Path:
+    suffix = ".json.zst" if codec == "zstd" else ".json.gz"
+    return archive_dir / "objects" / sha256[:2] / f"{sha256}{suffix}"
+
+
+def _atomic_write_bytes(path: Path, data: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_name, path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+
+
+def archive_payload(
+    body: bytes,
+    payload: json_backend.RatesPayload,
+    archive_dir: Path = DEFAULT_ARCHIVE_DIR,
+    codec: str | None = None,
+) -> tuple[ArchiveEntry, bool]:
+    """Store a raw response body unless an identical one is already archived.
+
+    Args:
+        body: The response bytes exactly as received
+        payload: The decoded body (used for the index fields)
+        archive_dir: Archive root
+        codec: "zstd" or "gzip"; defaults to default_codec()
+
+    Returns:
+        tuple[ArchiveEntry, bool]: The entry and whether a new object was written
+    """
+    sha256 = hashlib.sha256(body).hexdigest()
+    for existing_codec in ("zstd", "gzip"):
+        path = object_path(archive_dir, sha256, existing_codec)
+        if path.exists():
+            entry = ArchiveEntry(
+                sha256,
+                payload.base_code,
+                payload.time_last_update_unix,
+                existing_codec,
+                len(body),
+                path.stat().st_size,
+                int(path.stat().st_mtime),
+            )
+            logger.info(f"Payload {sha256[:12]} already archived; skipping")
+            return entry, False
+
+    codec = codec or default_codec()
+    compressed = compress(body, codec)
+    entry = ArchiveEntry(
+        sha256,
+        payload.base_code,
+        payload.time_last_update_unix,
+        codec,
+        len(body),
+        len(compressed),
+        int(time.time()),
+    )
+    _atomic_write_bytes(entry.object_path(archive_dir), compressed)
+    # The index line is written after the object, so every indexed hash is readable
+    with (archive_dir / INDEX_NAME).open("ab") as f:
+        f.write(json_backend.dumps(asdict(entry)) + b"\n")
+    logger.info(f"Archived {payload.base_code} payload {sha256[:12]} ({len(body)} -> {len(compressed)} bytes, {codec})")
+    return entry, True
+
+
+def read_index(archive_dir: Path = DEFAULT_ARCHIVE_DIR) -> list[ArchiveEntry]:
+    """Return every index entry in the order they were archived."""
+    index_path = archive_dir / INDEX_NAME
+    if not index_path.exists():
+        return []
+    entries = []
+    with index_path.open("rb") as f:
+        for line in f:
+            if line.strip():
+                entries.append(ArchiveEntry(**json_backend.loads(line)))
+    return entries
+
+
+def select_entries(
+    entries: list[ArchiveEntry],
+    base_code: str | None = None,
+    since_unix: int | None = None,
+    until_unix: int | None = None,
+) -> list[ArchiveEntry]:
+    """Filter entries and keep the most recently archived one per (base, time_last_update_unix)."""
+    latest: dict[tuple[str, int], ArchiveEntry] = {}
+    for entry in entries:
+        if base_code is not None and entry.base_code != base_code:
+            continue
+        if since_unix is not None and entry.time_last_update_unix < since_unix:
+            continue
+        if until_unix is not None and entry.time_last_update_unix > until_unix:
+            continue
+        latest[(entry.base_code, entry.time_last_update_unix)] = entry
+    return sorted(latest.values(), key=lambda e: (e.time_last_update_unix, e.base_code))
+
+
+def read_body(entry: ArchiveEntry, archive_dir: Path = DEFAULT_ARCHIVE_DIR) -> bytes:
+    """Return the original response bytes for entry, checking them against the hash."""
+    body = decompress(entry.object_path(archive_dir).read_bytes(), entry.codec)
+    if hashlib.sha256(body).hexdigest() != entry.sha256:
+        raise ValueError(f"Archive object {entry.sha256} is corrupt (hash mismatch)")
+    return body
+
+
+def iter_payloads(
+    entries: list[ArchiveEntry],
+    archive_dir: Path = DEFAULT_ARCHIVE_DIR,
+    currencies: Sequence[str] | None = None,
+) -> Iterator[tuple[ArchiveEntry, json_backend.RatesPayload]]:
+    """Yield (entry, decoded payload) for each entry, projected to currencies if given."""
+    for entry in entries:
+        yield entry, json_backend.decode_payload(read_body(entry, archive_dir), currencies)
+
+
+def replay(
+    entries: list[ArchiveEntry],
+    load_rows: Callable[[list[dict[str, Any]]], int],
+    archive_dir: Path = DEFAULT_ARCHIVE_DIR,
+    batch_payloads: int = 200,
+    currencies: Sequence[str] | None = None,
+) -> tuple[int, int]:
+    """Transform archived payloads and hand the rows to load_rows in bulk.
+
+    Rows from up to batch_payloads payloads are accumulated and loaded with one
+    load_rows call, so a long replay does a handful of bulk loads rather than
+    one per day. currencies restricts the replayed rows like etl.target_currencies.
+
+    Returns:
+        tuple[int, int]: (payloads replayed, rows loaded as reported by load_rows)
+    """
+    from transform import transform_rates
+
+    payloads = loaded = 0
+    batch: list[dict[str, Any]] = []
+    for _, payload in iter_payloads(entries, archive_dir, currencies):
+        batch.extend(transform_rates(payload, currencies))
+        payloads += 1
+        if payloads % batch_payloads == 0:
+            loaded += load_rows(batch)
+            batch = []
+            logger.info(f"Replayed {payloads}/{len(entries)} payloads")
+    if batch:
+        loaded += load_rows(batch)
+    logger.info(f"Replay complete: {payloads} payloads, {loaded} rows loaded")
+    return payloads, loaded
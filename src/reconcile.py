@@ -0,0 +1,298 @@
+# reconcile.py
+"""Find and repair drift between the processed CSVs and the rates table.
+
+Instead of comparing every row, both sides are summarised as hash digests and
+only the parts that disagree are looked at more closely, like walking a
+Merkle tree:
+
+1. one digest per UTC day of time_last_update_utc (a single GROUP BY query),
+2. for each day that differs, one digest per base currency,
+3. for each (day, base) that differs, the rows themselves, compared by key.
+
+A digest is the row count plus the sum of a 48-bit hash of every row. Sums
+don't depend on row order, so the database computes them with one aggregate
+query (ROW_HASH_SQL) and Python computes the same numbers from the files
+(row_hash). Only buckets with drift are ever fetched row by row.
+
+The files are the reference. A row is keyed by (base_code, target_code,
+time_last_update_utc) like uq_rate; when several files hold the same key the
+first one (by file name) wins, as it does for LOAD DATA. repair() rewrites
+missing and changed rows in the table, and deletes rows the files don't have
+only when asked to.
+"""
+
+import csv
+import hashlib
+import logging
+from collections.abc import Iterable, Mapping, Sequence
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+from decimal import ROUND_HALF_UP, Decimal
+from pathlib import Path
+from typing import Any
+
+from data_utilities import open_csv_for_read
+from profiling_utilities import timed
+
+logger = logging.getLogger(__name__)
+
+# Hashed in this order; the key is the first, second and fourth column
+HASH_COLUMNS = (
+    "base_code",
+    "target_code",
+    "rate",
+    "time_last_update_utc",
+    "time_next_update_utc",
+    "time_last_update_unix",
+    "time_next_update_unix",
+)
+HASH_HEX_DIGITS = 12
+RATE_QUANTUM = Decimal("0.00000001")  # DECIMAL(20,8)
+
+# CONCAT_WS renders DECIMAL(20,8) and DATETIME exactly as canonical_row() does.
+# The CAST keeps SUM exact (a SUM of CONV's strings would be a DOUBLE).
+ROW_HASH_SQL = (
+    f"CAST(CONV(SUBSTR(MD5(CONCAT_WS('|', {', '.join(HASH_COLUMNS)})), 1, {HASH_HEX_DIGITS}), 16, 10) AS UNSIGNED)"
+)
+
+Row = tuple[str, ...]
+Key = tuple[str, str, str]
+
+
+def _canonical_time(value: Any) -> str:
+    if not isinstance(value, datetime):
+        value = datetime.fromisoformat(str(value))
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def canonical_row(values: Mapping[str, Any]) -> Row:
+    """The HASH_COLUMNS of a CSV or table row as the strings MySQL would show for them."""
+    rate = Decimal(str(values["rate"])).quantize(RATE_QUANTUM, rounding=ROUND_HALF_UP)
+    return (
+        str(values["base_code"]),
+        str(values["target_code"]),
+        format(rate, "f"),
+        _canonical_time(values["time_last_update_utc"]),
+        _canonical_time(values["time_next_update_utc"]),
+        str(int(values["time_last_update_unix"])),
+        str(int(values["time_next_update_unix"])),
+    )
+
+
+def row_key(row: Row) -> Key:
+    return row[0], row[1], row[3]
+
+
+def row_hash(row: Row) -> int:
+    """Python twin of ROW_HASH_SQL."""
+    return int(hashlib.md5("|".join(row).encode("utf-8")).hexdigest()[:HASH_HEX_DIGITS], 16)
+
+
+@dataclass(frozen=True)
+class Digest:
+    """Row count and sum of row hashes for one bucket."""
+
+    rows: int = 0
+    total: int = 0
+
+
+def _digests(rows: Iterable[Row], bucket) -> dict[Any, Digest]:
+    sums: dict[Any, list[int]] = {}
+    for row in rows:
+        entry = sums.setdefault(bucket(row), [0, 0])
+        entry[0] += 1
+        entry[1] += row_hash(row)
+    return {key: Digest(*entry) for key, entry in sums.items()}
+
+
+class FileRows:
+    """The rows of the processed CSVs, de-duplicated by key and grouped by day and base."""
+
+    def __init__(self, rows_by_key: dict[Key, Row], conflicts: int = 0) -> None:
+        self.rows_by_key = rows_by_key
+        self.conflicts = conflicts
+        self.by_day: dict[str, list[Row]] = {}
+        for key, row in rows_by_key.items():
+            self.by_day.setdefault(key[2][:10], []).append(row)
+
+    @classmethod
+    def read(cls, paths: Iterable[Path]) -> "FileRows":
+        rows_by_key: dict[Key, Row] = {}
+        conflicts = 0
+        for path in sorted(paths, key=lambda p: p.name):
+            with open_csv_for_read(path) as f:
+                for values in csv.DictReader(f):
+                    row = canonical_row(values)
+                    kept = rows_by_key.setdefault(row_key(row), row)
+                    if kept != row:
+                        conflicts += 1
+        if conflicts:
+            logger.warning(f"{conflicts} rows repeat an earlier file's key with other values; the first file wins")
+        return cls(rows_by_key, conflicts)
+
+    @classmethod
+    def from_directory(cls, directory: Path) -> "FileRows":
+        paths = [*directory.glob("rates_*.csv"), *directory.glob("rates_*.csv.gz")]
+        logger.info(f"Reading {len(paths)} processed CSV files from {directory}")
+        return cls.read(paths)
+
+    def days(self) -> list[str]:
+        return sorted(self.by_day)
+
+    def select(self, day: str, base_code: str | None = None) -> list[Row]:
+        rows = self.by_day.get(day, [])
+        return rows if base_code is None else [row for row in rows if row[0] == base_code]
+
+
+def _day_range(day: str) -> tuple[str, str]:
+    start = date.fromisoformat(day)
+    return f"{start} 00:00:00", f"{start + timedelta(days=1)} 00:00:00"
+
+
+class TableRows:
+    """The same digests and rows, computed in the database."""
+
+    def __init__(self, connection, table: str) -> None:
+        self.connection = connection
+        self.table = table
+        self.queries = 0
+
+    def _fetch(self, sql: str, params: Sequence[Any]) -> list[tuple]:
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(sql, tuple(params))
+            self.queries += 1
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+
+    def day_digests(self, first_day: str, last_day: str) -> dict[str, Digest]:
+        start, end = _day_range(first_day)[0], _day_range(last_day)[1]
+        sql = (
+            f"SELECT DATE(time_last_update_utc), COUNT(*), SUM({ROW_HASH_SQL}) FROM {self.table} "
+            "WHERE time_last_update_utc >= %s AND time_last_update_utc < %s GROUP BY 1"
+        )
+        return {str(day): Digest(int(n), int(total)) for day, n, total in self._fetch(sql, (start, end))}
+
+    def base_digests(self, day: str) -> dict[str, Digest]:
+        sql = (
+            f"SELECT base_code, COUNT(*), SUM({ROW_HASH_SQL}) FROM {self.table} "
+            "WHERE time_last_update_utc >= %s AND time_last_update_utc < %s GROUP BY 1"
+        )
+        return {base: Digest(int(n), int(total)) for base, n, total in self._fetch(sql, _day_range(day))}
+
+    def select(self, day: str, base_code: str) -> list[Row]:
+        sql = (
+            f"SELECT {', '.join(HASH_COLUMNS)} FROM {self.table} "
+            "WHERE base_code = %s AND time_last_update_utc >= %s AND time_last_update_utc < %s"
+        )
+        return [
+            canonical_row(dict(zip(HASH_COLUMNS, values))) for values in self._fetch(sql, (base_code, *_day_range(day)))
+        ]
+
+
+@dataclass
+class ReconcileReport:
+    """Where the table drifted from the files, down to the rows."""
+
+    days_checked: int = 0
+    mismatched_days: list[str] = field(default_factory=list)
+    mismatched_buckets: list[tuple[str, str]] = field(default_factory=list)
+    missing: list[Row] = field(default_factory=list)  # in the files, not in the table
+    extra: list[Row] = field(default_factory=list)  # in the table, not in the files
+    changed: list[tuple[Row, Row]] = field(default_factory=list)  # (file row, table row)
+    queries: int = 0
+
+    @property
+    def clean(self) -> bool:
+        return not (self.missing or self.extra or self.changed)
+
+
+@timed("reconcile.compare")
+def compare(
+    files: FileRows,
+    table: TableRows,
+    since: date | None = None,
+    until: date | None = None,
+) -> ReconcileReport:
+    """Compare the files with the table over the days the files cover (narrowed by since/until)."""
+    days = [
+        day for day in files.days() if (since is None or day >= str(since)) and (until is None or day <= str(until))
+    ]
+    report = ReconcileReport()
+    if not days:
+        logger.warning("No processed rows in the requested range; nothing to reconcile")
+        return report
+    first, last = str(since or days[0]), str(until or days[-1])
+
+    # Level 1: one digest per day
+    table_days = table.day_digests(first, last)
+    file_days = _digests((row for day in days for row in files.select(day)), lambda row: row[3][:10])
+    all_days = sorted(set(file_days) | set(table_days))
+    report.days_checked = len(all_days)
+    report.mismatched_days = [day for day in all_days if file_days.get(day) != table_days.get(day)]
+
+    for day in report.mismatched_days:
+        # Level 2: one digest per base currency within the day
+        table_bases = table.base_digests(day)
+        file_bases = _digests(files.select(day), lambda row: row[0])
+        for base_code in sorted(set(file_bases) | set(table_bases)):
+            if file_bases.get(base_code) == table_bases.get(base_code):
+                continue
+            report.mismatched_buckets.append((day, base_code))
+            # Level 3: the rows of the bucket
+            file_rows = {row_key(row): row for row in files.select(day, base_code)}
+            table_rows = {row_key(row): row for row in table.select(day, base_code)}
+            for key, row in file_rows.items():
+                if key not in table_rows:
+                    report.missing.append(row)
+                elif table_rows[key] != row:
+                    report.changed.append((row, table_rows[key]))
+            report.extra.extend(row for key, row in table_rows.items() if key not in file_rows)
+
+    report.queries = table.queries
+    logger.info(
+        f"Reconciled {report.days_checked} days with {report.queries} queries: "
+        f"{len(report.mismatched_days)} days and {len(report.mismatched_buckets)} (day, base) buckets differ; "
+        f"{len(report.missing)} rows missing, {len(report.changed)} changed, {len(report.extra)} extra"
+    )
+    return report
+
+
+@timed("reconcile.repair")
+def repair(table: TableRows, report: ReconcileReport, delete_extra: bool = False) -> int:
+    """Make the table match the files for the rows in report, in one transaction.
+
+    Missing rows are inserted and changed rows replaced by the file's version.
+    Extra rows are deleted only with delete_extra. Returns the rows written or deleted.
+    """
+    key_where = "base_code = %s AND target_code = %s AND time_last_update_utc = %s"
+    delete = [row_key(file_row) for file_row, _ in report.changed]
+    if delete_extra:
+        delete += [row_key(row) for row in report.extra]
+    insert = report.missing + [file_row for file_row, _ in report.changed]
+
+    conn = table.connection
+    cursor = conn.cursor()
+    try:
+        if delete:
+            cursor.executemany(f"DELETE FROM {table.table} WHERE {key_where}", delete)
+        if insert:
+            cursor.executemany(
+                f"INSERT INTO {table.table} ({', '.join(HASH_COLUMNS)}) VALUES ({', '.join(['%s'] * len(HASH_COLUMNS))})",
+                insert,
+            )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    repaired = len(report.missing) + len(report.changed) + (len(report.extra) if delete_extra else 0)
+    logger.info(
+        f"Repaired `{table.table}`: {len(report.missing)} inserted, {len(report.changed)} replaced, "
+        f"{len(report.extra) if delete_extra else 0} deleted"
+    )
+    return repaired
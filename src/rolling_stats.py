@@ -0,0 +1,424 @@
+# rolling_stats.py
+"""Incrementally maintained rolling statistics per currency pair.
+
+For every (base, target) pair we keep the last N observed rates and log
+returns in a ring buffer together with running sums and sums of squares per
+window, so adding a new observation updates every window's moving average,
+standard deviation and volatility in O(1). The buffers are persisted to a JSON
+state file between runs; sums are rebuilt from the buffers on load.
+
+Windows count observations (one per provider update, i.e. daily), not
+calendar days. bootstrap_state() builds the same state from history in one
+vectorized pass with NumPy.
+
+Readings that validation quarantines are not observations, but they are held
+per pair. Once rebaseline_after consecutive held readings agree with each other
+(a real level shift such as a devaluation, not a glitch), they replace the
+pair's history, so validation stops flagging the new level. An accepted reading
+drops what was held. rebaseline_pairs() does the same by hand.
+"""
+
+import csv
+import json
+import logging
+import math
+import os
+import tempfile
+from collections.abc import Iterable, Sequence
+from pathlib import Path
+from typing import Any
+
+from data_utilities import open_csv_for_read
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WINDOWS = (7, 30, 90)
+DEFAULT_STATE_FILE = Path(__file__).parent.parent / "data" / "state" / "rolling_stats.json"
+# Volatility is reported per observation and annualised with this many observations per year
+PERIODS_PER_YEAR = 365
+# Rebuild running sums from the buffer this often to stop floating-point drift accumulating
+RESYNC_EVERY = 1000
+# Held readings count as consistent while their highest and lowest are within this log distance
+DEFAULT_REBASELINE_TOLERANCE = 0.05
+
+
+class RingBuffer:
+    """Fixed-capacity buffer of floats with O(1) append and lookback."""
+
+    def __init__(self, capacity: int, values: Iterable[float] = ()) -> None:
+        self.capacity = capacity
+        self._data = [0.0] * capacity
+        self._pos = 0
+        self.count = 0
+        for value in values:
+            self.append(value)
+
+    def append(self, value: float) -> None:
+        self._data[self._pos] = value
+        self._pos = (self._pos + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def back(self, offset: int) -> float:
+        """Return the value appended `offset` appends ago (1 = most recent)."""
+        return self._data[(self._pos - offset) % self.capacity]
+
+    def values(self) -> list[float]:
+        """Return the buffered values, oldest first."""
+        return [self.back(i) for i in range(self.count, 0, -1)]
+
+
+class WindowedSeries:
+    """Running sum / sum of squares of the last w values for several windows at once."""
+
+    def __init__(self, windows: Sequence[int], values: Iterable[float] = ()) -> None:
+        self.windows = tuple(sorted(windows))
+        self.buffer = RingBuffer(self.windows[-1] + 1)
+        self.sums = dict.fromkeys(self.windows, 0.0)
+        self.sumsqs = dict.fromkeys(self.windows, 0.0)
+        self._since_resync = 0
+        for value in values:
+            self.append(value)
+
+    def append(self, value: float) -> None:
+        self.buffer.append(value)
+        for w in self.windows:
+            self.sums[w] += value
+            self.sumsqs[w] += value * value
+            if self.buffer.count > w:
+                leaving = self.buffer.back(w + 1)
+                self.sums[w] -= leaving
+                self.sumsqs[w] -= leaving * leaving
+        self._since_resync += 1
+        if self._since_resync >= RESYNC_EVERY:
+            self.resync()
+
+    def resync(self) -> None:
+        """Recompute every window's sums exactly from the buffer."""
+        values = self.buffer.values()
+        for w in self.windows:
+            tail = values[-w:]
+            self.sums[w] = math.fsum(tail)
+            self.sumsqs[w] = math.fsum(v * v for v in tail)
+        self._since_resync = 0
+
+    def n(self, w: int) -> int:
+        return min(self.buffer.count, w)
+
+    def mean(self, w: int) -> float | None:
+        n = self.n(w)
+        return self.sums[w] / n if n else None
+
+    def std(self, w: int) -> float | None:
+        """Sample standard deviation over the window (None with fewer than two values)."""
+        n = self.n(w)
+        if n < 2:
+            return None
+        variance = (self.sumsqs[w] - self.sums[w] * self.sums[w] / n) / (n - 1)
+        return math.sqrt(max(variance, 0.0))
+
+
+class PairStats:
+    """Rolling state for one currency pair."""
+
+    def __init__(
+        self,
+        windows: Sequence[int],
+        rates: Iterable[float] = (),
+        last_ts: int | None = None,
+        held: Iterable[Sequence[float]] = (),
+    ) -> None:
+        rates = list(rates)
+        self.windows = tuple(sorted(windows))
+        self.last_ts = last_ts
+        self.rates = WindowedSeries(self.windows, rates)
+        returns = [math.log(b / a) for a, b in zip(rates, rates[1:]) if a > 0 and b > 0]
+        self.returns = WindowedSeries(self.windows, returns)
+        # Quarantined readings since the last accepted one, as (ts, rate), oldest first
+        self.held: list[tuple[int, float]] = [(int(ts), float(rate)) for ts, rate in held]
+
+    def update(self, rate: float, ts: int) -> bool:
+        """Add an observation; returns False (and changes nothing) if ts is not newer than the last one."""
+        if self.last_ts is not None and ts <= self.last_ts:
+            return False
+        if self.rates.buffer.count:
+            previous = self.rates.buffer.back(1)
+            if previous > 0 and rate > 0:
+                self.returns.append(math.log(rate / previous))
+        self.rates.append(rate)
+        self.last_ts = ts
+        self.held = []
+        return True
+
+    def hold(self, rate: float, ts: int, tolerance: float = DEFAULT_REBASELINE_TOLERANCE) -> int:
+        """Hold a quarantined reading; returns how many consistent readings are held now.
+
+        A reading that disagrees with the ones held (by more than tolerance in log
+        terms) starts a new run; non-positive rates and stale timestamps are ignored.
+        """
+        newest = self.held[-1][0] if self.held else self.last_ts
+        if not (math.isfinite(rate) and rate > 0) or (newest is not None and ts <= newest):
+            return len(self.held)
+        logs = [math.log(held_rate) for _, held_rate in self.held] + [math.log(rate)]
+        if max(logs) - min(logs) > tolerance:
+            self.held = []
+        self.held.append((ts, rate))
+        return len(self.held)
+
+    def snapshot(self) -> dict[str, Any]:
+        """Return the current statistics for every window."""
+        stats: dict[str, Any] = {}
+        for w in self.windows:
+            vol = self.returns.std(w)
+            stats[f"ma_{w}"] = self.rates.mean(w)
+            stats[f"std_{w}"] = self.rates.std(w)
+            stats[f"vol_{w}"] = vol
+            stats[f"vol_{w}_annualized"] = vol * math.sqrt(PERIODS_PER_YEAR) if vol is not None else None
+            stats[f"n_{w}"] = self.rates.n(w)
+        return stats
+
+    def to_state(self) -> dict[str, Any]:
+        state: dict[str, Any] = {"last_ts": self.last_ts, "rates": self.rates.buffer.values()}
+        if self.held:
+            state["held"] = [list(reading) for reading in self.held]
+        return state
+
+
+class RollingStats:
+    """Rolling statistics for all pairs, keyed by (base_code, target_code)."""
+
+    def __init__(self, windows: Sequence[int] = DEFAULT_WINDOWS) -> None:
+        self.windows = tuple(sorted(windows))
+        self.pairs: dict[tuple[str, str], PairStats] = {}
+
+    def update_rows(self, rows: Iterable[dict[str, Any]]) -> int:
+        """Fold transformed rows into the state; return how many were new observations."""
+        updated = 0
+        for row in rows:
+            key = (row["base_code"], row["target_code"])
+            pair = self.pairs.get(key)
+            if pair is None:
+                pair = self.pairs[key] = PairStats(self.windows)
+            updated += pair.update(float(row["rate"]), int(row["time_last_update_unix"]))
+        return updated
+
+    def hold_back(
+        self,
+        rows: Iterable[dict[str, Any]],
+        rebaseline_after: int = 0,
+        tolerance: float = DEFAULT_REBASELINE_TOLERANCE,
+    ) -> list[tuple[str, str]]:
+        """Hold quarantined rows; re-baseline pairs with rebaseline_after consistent ones (0: never).
+
+        Returns the pairs that were re-baselined.
+        """
+        rebaselined = []
+        for row in rows:
+            key = (row["base_code"], row["target_code"])
+            pair = self.pairs.get(key)
+            if pair is None:
+                continue
+            held = pair.hold(float(row["rate"]), int(row["time_last_update_unix"]), tolerance)
+            if rebaseline_after and held >= rebaseline_after:
+                self.rebaseline(key)
+                rebaselined.append(key)
+        return rebaselined
+
+    def rebaseline(self, key: tuple[str, str]) -> bool:
+        """Replace a pair's history with its held readings, or forget it if none are held.
+
+        Either way validation judges the pair against its new level from now on.
+        Returns False for a pair that isn't tracked.
+        """
+        pair = self.pairs.get(key)
+        if pair is None:
+            return False
+        if pair.held:
+            logger.warning(
+                f"Re-baselining {key[0]}/{key[1]} on {len(pair.held)} held readings "
+                f"(last rate {pair.rates.buffer.back(1):.6g} -> {pair.held[-1][1]:.6g})"
+            )
+            self.pairs[key] = PairStats(self.windows, [rate for _, rate in pair.held], pair.held[-1][0])
+        else:
+            logger.warning(f"Re-baselining {key[0]}/{key[1]}: history dropped, the next reading starts it afresh")
+            del self.pairs[key]
+        return True
+
+    def snapshot_rows(self) -> list[dict[str, Any]]:
+        """Return one row of statistics per pair, suitable for save_to_csv."""
+        return [
+            {"base_code": base, "target_code": target, "time_last_update_unix": pair.last_ts, **pair.snapshot()}
+            for (base, target), pair in sorted(self.pairs.items())
+        ]
+
+    def save(self, path: Path) -> None:
+        """Persist the buffers atomically as JSON."""
+        state = {
+            "windows": list(self.windows),
+            "pairs": {f"{base}/{target}": pair.to_state() for (base, target), pair in self.pairs.items()},
+        }
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp_name, path)
+
+    @classmethod
+    def load(cls, path: Path, windows: Sequence[int] = DEFAULT_WINDOWS) -> "RollingStats":
+        """Load persisted state; a missing file gives empty state."""
+        stats = cls(windows)
+        if not path.exists():
+            return stats
+        state = json.loads(path.read_text(encoding="utf-8"))
+        if tuple(sorted(state.get("windows", ()))) != stats.windows:
+            logger.warning(f"Rolling stats windows changed {state.get('windows')} -> {list(stats.windows)}")
+        capacity = stats.windows[-1] + 1
+        for key, pair_state in state.get("pairs", {}).items():
+            base, target = key.split("/")
+            stats.pairs[(base, target)] = PairStats(
+                stats.windows, pair_state["rates"][-capacity:], pair_state["last_ts"], pair_state.get("held", ())
+            )
+        return stats
+
+
+def rolling_history(rates, windows: Sequence[int] = DEFAULT_WINDOWS) -> dict[str, Any]:
+    """Vectorized rolling statistics over a full, time-ordered rate history.
+
+    Returns NumPy arrays aligned with ``rates`` (NaN until a window has enough
+    observations): ``ma_<w>`` and ``vol_<w>`` for each window.
+    """
+    import numpy as np
+
+    rates = np.asarray(rates, dtype=float)
+    returns = np.full(rates.shape, np.nan)
+    returns[1:] = np.log(rates[1:] / rates[:-1])
+
+    def rolling_mean_std(values, w, valid_from):
+        out_mean = np.full(values.shape, np.nan)
+        out_std = np.full(values.shape, np.nan)
+        v = np.nan_to_num(values[valid_from:])
+        if len(v) < w:
+            return out_mean, out_std
+        c1 = np.concatenate(([0.0], np.cumsum(v)))
+        c2 = np.concatenate(([0.0], np.cumsum(v * v)))
+        s1 = c1[w:] - c1[:-w]
+        s2 = c2[w:] - c2[:-w]
+        out_mean[valid_from + w - 1 :] = s1 / w
+        if w > 1:
+            out_std[valid_from + w - 1 :] = np.sqrt(np.maximum((s2 - s1 * s1 / w) / (w - 1), 0.0))
+        return out_mean, out_std
+
+    result: dict[str, Any] = {}
+    for w in windows:
+        result[f"ma_{w}"], _ = rolling_mean_std(rates, w, 0)
+        _, result[f"vol_{w}"] = rolling_mean_std(returns, w, 1)
+    return result
+
+
+def bootstrap_state(history_rows: Iterable[dict[str, Any]], windows: Sequence[int] = DEFAULT_WINDOWS) -> RollingStats:
+    """Build rolling state from historical rows in one pass per pair.
+
+    Rows are grouped per pair and sorted by time with NumPy; only the tail that
+    fits the largest window is kept, so the cost is one sort rather than one
+    incremental update per historical observation.
+    """
+    import numpy as np
+
+    grouped: dict[tuple[str, str], tuple[list[int], list[float]]] = {}
+    for row in history_rows:
+        ts_list, rate_list = grouped.setdefault((row["base_code"], row["target_code"]), ([], []))
+        ts_list.append(int(row["time_last_update_unix"]))
+        rate_list.append(float(row["rate"]))
+
+    stats = RollingStats(windows)
+    capacity = stats.windows[-1] + 1
+    for key, (ts_list, rate_list) in grouped.items():
+        ts = np.asarray(ts_list, dtype=np.int64)
+        rates = np.asarray(rate_list, dtype=float)
+        order = np.argsort(ts, kind="stable")
+        ts, rates = ts[order], rates[order]
+        # keep the last observation for each timestamp (reloads of the same snapshot)
+        keep = np.append(ts[1:] != ts[:-1], True)
+        ts, rates = ts[keep], rates[keep]
+        stats.pairs[key] = PairStats(stats.windows, rates[-capacity:].tolist(), int(ts[-1]))
+    logger.info(f"Bootstrapped rolling statistics for {len(stats.pairs)} pairs")
+    return stats
+
+
+def read_history_csvs(paths: Iterable[Path]) -> Iterable[dict[str, Any]]:
+    """Yield rows from processed rates CSVs (data/processed/rates_*.csv, gzipped or not)."""
+    for path in paths:
+        with open_csv_for_read(path) as f:
+            yield from csv.DictReader(f)
+
+
+def read_history_db(db_config: dict[str, Any], table: str, batch_size: int = 10_000) -> Iterable[dict[str, Any]]:
+    """Yield (base_code, target_code, time_last_update_unix, rate) rows from the rates table."""
+    from db_utilities import connect_to_mysql
+
+    conn = connect_to_mysql(db_config)
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(f"SELECT base_code, target_code, time_last_update_unix, rate FROM {table}")
+        while batch := cursor.fetchmany(batch_size):
+            yield from batch
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def history_stats_rows(
+    history_rows: Iterable[dict[str, Any]],
+    windows: Sequence[int] = DEFAULT_WINDOWS,
+) -> list[dict[str, Any]]:
+    """Return one statistics row per historical observation, computed with rolling_history()."""
+    grouped: dict[tuple[str, str], dict[int, float]] = {}
+    for row in history_rows:
+        grouped.setdefault((row["base_code"], row["target_code"]), {})[int(row["time_last_update_unix"])] = float(
+            row["rate"]
+        )
+
+    out = []
+    for (base, target), series in sorted(grouped.items()):
+        timestamps = sorted(series)
+        stats = rolling_history([series[ts] for ts in timestamps], windows)
+        for i, ts in enumerate(timestamps):
+            row = {"base_code": base, "target_code": target, "time_last_update_unix": ts}
+            for key, values in stats.items():
+                value = float(values[i])
+                row[key] = None if math.isnan(value) else value
+            out.append(row)
+    return out
+
+
+def update_statistics(
+    rows: list[dict[str, Any]],
+    state_path: Path = DEFAULT_STATE_FILE,
+    windows: Sequence[int] = DEFAULT_WINDOWS,
+    held_back: Iterable[dict[str, Any]] = (),
+    rebaseline_after: int = 0,
+    rebaseline_tolerance: float = DEFAULT_REBASELINE_TOLERANCE,
+) -> list[dict[str, Any]]:
+    """Load state, fold in the new rows, persist, and return the per-pair statistics rows.
+
+    held_back are the rows validation quarantined; see RollingStats.hold_back.
+    """
+    stats = RollingStats.load(state_path, windows)
+    updated = stats.update_rows(rows)
+    rebaselined = stats.hold_back(held_back, rebaseline_after, rebaseline_tolerance)
+    stats.save(state_path)
+    logger.info(
+        f"Rolling statistics updated for {updated} pairs ({len(stats.pairs)} tracked, {len(rebaselined)} re-baselined)"
+    )
+    return stats.snapshot_rows()
+
+
+def rebaseline_pairs(
+    keys: Iterable[tuple[str, str]],
+    state_path: Path = DEFAULT_STATE_FILE,
+    windows: Sequence[int] = DEFAULT_WINDOWS,
+) -> list[tuple[str, str]]:
+    """Re-baseline pairs by hand (see RollingStats.rebaseline); returns the pairs that were tracked."""
+    stats = RollingStats.load(state_path, windows)
+    done = [key for key in keys if stats.rebaseline(key)]
+    stats.save(state_path)
+    return done
@@ -0,0 +1,304 @@
+# shared_rates.py
+"""Latest rates in a memory-mapped segment shared by every local process.
+
+The pipeline publishes each loaded snapshot into one file per base currency,
+normally under /dev/shm so it never touches disk:
+
+    <directory>/exchange_rates_<BASE>.rates
+
+Worker processes open it with RatesReader and read rates straight out of the
+mapping: no copy of the table, no lock and no database round trip. The file
+outlives the pipeline process (a multiprocessing.shared_memory segment would
+be unlinked by its resource tracker when a cron run exits).
+
+Layout (little-endian):
+
+    header  64 bytes   magic, layout version, flags, capacity, seq, generation,
+                       count, time_last_update_unix, published_at, base_code
+    records 16 bytes   target code (8s, NUL padded) + rate (float64), capacity times
+
+Consistency uses a seqlock. The single writer (serialised with flock) makes
+seq odd, rewrites the records and header fields, then makes seq even again.
+Readers read seq, read what they need and re-read seq; if it changed or was
+odd they retry. generation changes only when the set or order of codes does,
+so readers can keep a code -> slot index between snapshots. When a bigger
+segment is needed the writer replaces the file and sets FLAG_RETIRED in the
+old one, which tells readers to reopen.
+"""
+
+import fcntl
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import time
+from collections.abc import Iterable
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"XRATESHM"
+LAYOUT_VERSION = 1
+FLAG_RETIRED = 1
+DEFAULT_CAPACITY = 512
+
+# magic, version, flags, capacity, seq, generation, count, (pad), time_last_update_unix, published_at, base_code
+HEADER = struct.Struct("<8sHHIQQI4xqd8s")
+RECORD = struct.Struct("<8sd")
+SEQ = struct.Struct("<Q")
+FLAGS_OFFSET = 10
+SEQ_OFFSET = 16
+assert HEADER.size == 64
+
+# Reader retry policy: spin this many times, then back off with short sleeps
+SPIN_READS = 100
+READ_TIMEOUT = 1.0
+
+
+class SharedRatesError(RuntimeError):
+    """Raised when the segment is missing, malformed or stuck mid-write."""
+
+
+@dataclass
+class SharedSnapshot:
+    """A consistent copy of the published snapshot."""
+
+    base_code: str
+    time_last_update_unix: int
+    published_at: float
+    seq: int
+    rates: dict[str, float]
+
+
+def default_directory() -> Path:
+    """/dev/shm when it exists (Linux), otherwise the system temp directory."""
+    shm = Path("/dev/shm")
+    return shm if shm.is_dir() else Path(tempfile.gettempdir())
+
+
+def segment_path(base_code: str, directory: Path | None = None) -> Path:
+    return (directory or default_directory()) / f"exchange_rates_{base_code.upper()}.rates"
+
+
+def _segment_size(capacity: int) -> int:
+    return HEADER.size + capacity * RECORD.size
+
+
+def _encode_code(code: str) -> bytes:
+    encoded = code.encode("ascii")
+    if len(encoded) > 8:
+        raise ValueError(f"Currency code {code!r} is longer than 8 bytes")
+    return encoded
+
+
+class RatesPublisher:
+    """The writer side; the pipeline keeps one per base currency."""
+
+    def __init__(self, base_code: str, directory: Path | None = None, capacity: int = DEFAULT_CAPACITY) -> None:
+        self.base_code = base_code.upper()
+        self.path = segment_path(self.base_code, directory)
+        self.capacity = capacity
+
+    def _create(self, capacity: int) -> None:
+        # Build the new segment next to the old one and swap it in atomically
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=self.path.parent, prefix=f".{self.path.name}.", suffix=".tmp")
+        try:
+            os.ftruncate(fd, _segment_size(capacity))
+            os.pwrite(fd, HEADER.pack(MAGIC, LAYOUT_VERSION, 0, capacity, 0, 0, 0, 0, 0.0, b""), 0)
+            os.fchmod(fd, 0o644)
+            os.close(fd)
+            os.replace(tmp_name, self.path)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+        logger.info(f"Created shared rates segment {self.path} for {capacity} currencies")
+
+    def publish(self, rates: Iterable[tuple[str, float]], time_last_update_unix: int) -> int:
+        """Write a full snapshot and return its sequence number.
+
+        Args:
+            rates: (target_code, rate) pairs in the order readers should see them
+            time_last_update_unix: Provider timestamp of the snapshot
+
+        Returns:
+            int: The (even) seq of the published snapshot
+        """
+        records = [(_encode_code(code), float(rate)) for code, rate in rates]
+        codes = [code for code, _ in records]
+        while True:
+            if not self.path.exists():
+                self._create(max(self.capacity, len(records)))
+            with self.path.open("r+b") as f:
+                # One writer at a time; readers never take this lock
+                fcntl.flock(f, fcntl.LOCK_EX)
+                with mmap.mmap(f.fileno(), 0) as mm:
+                    magic, version, flags, capacity, seq, generation, count, *_ = HEADER.unpack_from(mm, 0)
+                    if flags & FLAG_RETIRED:
+                        # Another publisher replaced the file while we waited for the lock
+                        continue
+                    if magic != MAGIC or version != LAYOUT_VERSION or capacity < len(records):
+                        # Too small (or not ours): replace it and tell readers of the old one to reopen
+                        self._create(max(self.capacity, len(records)))
+                        if magic == MAGIC:
+                            mm[FLAGS_OFFSET] |= FLAG_RETIRED
+                        continue
+
+                    old_codes = [RECORD.unpack_from(mm, HEADER.size + i * RECORD.size)[0] for i in range(count)]
+                    if [code.rstrip(b"\0") for code in old_codes] != codes:
+                        generation += 1
+                    # seq stays odd until the final write; it already is if a writer died mid-publish
+                    seq |= 1
+                    SEQ.pack_into(mm, SEQ_OFFSET, seq)
+                    for i, record in enumerate(records):
+                        RECORD.pack_into(mm, HEADER.size + i * RECORD.size, *record)
+                    HEADER.pack_into(
+                        mm,
+                        0,
+                        MAGIC,
+                        LAYOUT_VERSION,
+                        0,
+                        capacity,
+                        seq,
+                        generation,
+                        len(records),
+                        int(time_last_update_unix),
+                        time.time(),
+                        self.base_code.encode("ascii"),
+                    )
+                    SEQ.pack_into(mm, SEQ_OFFSET, seq + 1)
+            logger.info(f"Published {len(records)} {self.base_code} rates to {self.path} (seq {seq + 1})")
+            return seq + 1
+
+
+def publish_rows(
+    rows: list[dict[str, Any]],
+    directory: Path | None = None,
+    capacity: int = DEFAULT_CAPACITY,
+) -> dict[str, int]:
+    """Publish transformed rows, one segment per base currency.
+
+    Returns:
+        dict[str, int]: seq of the published snapshot per base currency
+    """
+    by_base: dict[str, list[dict[str, Any]]] = {}
+    for row in rows:
+        by_base.setdefault(row["base_code"], []).append(row)
+    published = {}
+    for base_code, base_rows in by_base.items():
+        publisher = RatesPublisher(base_code, directory, capacity)
+        published[base_code] = publisher.publish(
+            ((row["target_code"], row["rate"]) for row in base_rows),
+            max(row["time_last_update_unix"] for row in base_rows),
+        )
+    return published
+
+
+class RatesReader:
+    """Lock-free, zero-copy access to the rates published for one base currency.
+
+    get() reads a single rate directly from the mapping. The code -> slot index
+    is rebuilt only when the publisher changes the set of codes. Safe to share
+    between threads; open one reader per process (e.g. in a post-fork hook).
+    """
+
+    def __init__(self, base_code: str, directory: Path | None = None) -> None:
+        self.base_code = base_code.upper()
+        self.path = segment_path(self.base_code, directory)
+        self._mm: mmap.mmap | None = None
+        # (generation, {code: slot}); replaced as a whole so threads never see a mix
+        self._index: tuple[int, dict[str, int]] = (-1, {})
+        self._open()
+
+    def _open(self) -> None:
+        try:
+            with self.path.open("rb") as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (FileNotFoundError, ValueError) as e:
+            raise SharedRatesError(f"No shared rates segment at {self.path}; has the pipeline published yet?") from e
+        magic, version, *_ = HEADER.unpack_from(mm, 0)
+        if magic != MAGIC or version != LAYOUT_VERSION:
+            mm.close()
+            raise SharedRatesError(f"{self.path} is not a layout {LAYOUT_VERSION} shared rates segment")
+        # A retired mapping is left to the garbage collector: other threads may still be reading it
+        self._mm = mm
+        self._index = (-1, {})
+
+    def close(self) -> None:
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+
+    def __enter__(self) -> "RatesReader":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    @property
+    def seq(self) -> int:
+        """The current sequence number; it changes whenever a new snapshot is published."""
+        return SEQ.unpack_from(self._mm, SEQ_OFFSET)[0]
+
+    def _read(self, read_fn):
+        """Run read_fn(mm, header) under the seqlock until it sees a consistent snapshot."""
+        deadline = None
+        attempts = 0
+        while True:
+            mm = self._mm
+            header = HEADER.unpack_from(mm, 0)
+            seq = header[4]
+            if header[2] & FLAG_RETIRED:
+                self._open()
+                continue
+            if not seq & 1:
+                result = read_fn(mm, header)
+                if SEQ.unpack_from(mm, SEQ_OFFSET)[0] == seq:
+                    return result
+            attempts += 1
+            if attempts > SPIN_READS:
+                # A publish takes microseconds; being stuck means the writer died mid-write
+                deadline = deadline or time.monotonic() + READ_TIMEOUT
+                if time.monotonic() > deadline:
+                    raise SharedRatesError(f"{self.path} stayed mid-update for {READ_TIMEOUT}s (seq {seq})")
+                time.sleep(0.001)
+
+    def get(self, target_code: str) -> float | None:
+        """Return the latest rate for target_code, or None if it isn't published."""
+
+        def read(mm, header):
+            generation, count = header[5], header[6]
+            index_generation, index = self._index
+            if index_generation != generation:
+                index = _read_index(mm, count)
+            slot = index.get(target_code)
+            rate = None
+            if slot is not None and slot < count:
+                rate = RECORD.unpack_from(mm, HEADER.size + slot * RECORD.size)[1]
+            return generation, index, rate
+
+        # The index is only kept once the seqlock has confirmed it was read consistently
+        generation, index, rate = self._read(read)
+        self._index = (generation, index)
+        return rate
+
+    def snapshot(self) -> SharedSnapshot:
+        """Return a consistent copy of the whole published snapshot."""
+
+        def read(mm, header):
+            count = header[6]
+            rates = {
+                code.rstrip(b"\0").decode("ascii"): rate
+                for code, rate in RECORD.iter_unpack(mm[HEADER.size : HEADER.size + count * RECORD.size])
+            }
+            return SharedSnapshot(header[9].rstrip(b"\0").decode("ascii"), header[7], header[8], header[4], rates)
+
+        return self._read(read)
+
+
+def _read_index(mm: mmap.mmap, count: int) -> dict[str, int]:
+    codes = [RECORD.unpack_from(mm, HEADER.size + i * RECORD.size)[0] for i in range(count)]
+    return {code.rstrip(b"\0").decode("ascii"): i for i, code in enumerate(codes)}
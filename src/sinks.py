@@ -0,0 +1,352 @@
+# sinks.py
+"""Output sinks for transformed rows, run concurrently after transform.
+
+Every enabled sink gets the same batch of rows. Sinks are grouped into waves
+by their ``depends_on`` lists, and the sinks in each wave run together on a
+thread pool. The standard MySQL sink depends on the CSV sink because it LOAD
+DATAs that file; every other sink runs in the first wave. Each sink is timed
+as ``stage.sink.<name>`` and fails on its own. A dependant of a failed sink is
+skipped, not run. After all waves, SinkError is raised if any *required*
+sink did not succeed.
+
+A sink may narrow the batch further with its own `currencies` list (e.g. a
+CSV of the majors next to a full database load); see Sink.rows_for.
+
+New sink types subclass Sink and register with @register_sink("<type>"), then
+appear in the `sinks.outputs` list of configs/default.yaml.
+
+Replays and backfills load outside a pipeline run through RowLoader, which
+reuses the same sinks so both paths pick the schema and options the same way.
+"""
+
+import logging
+import tempfile
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import date
+from pathlib import Path
+from typing import Any
+
+import metrics
+from data_utilities import save_to_csv
+from profiling_utilities import timed_stage
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_WORKERS = 4
+
+
+class SinkError(RuntimeError):
+    """Raised when a required sink failed or was skipped."""
+
+
+@dataclass
+class SinkBatch:
+    """What every sink receives: the rows plus run context."""
+
+    rows: list[dict[str, Any]]
+    run_date: date
+    project_root: Path
+    db_config: dict[str, Any]
+    # Return values of sinks that already finished, keyed by sink name
+    outputs: dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class SinkResult:
+    """Outcome of one sink for one batch."""
+
+    name: str
+    status: str  # "ok", "failed" or "skipped"
+    rows: int = 0
+    seconds: float = 0.0
+    output: Any = None
+    error: BaseException | None = None
+
+
+class Sink:
+    """Base class: write(batch) returns (rows written, output for dependants)."""
+
+    # True for sinks whose row count is reported as rows_loaded
+    loads_database = False
+
+    def __init__(self, name: str, required: bool = True, depends_on: list[str] | None = None, **options: Any) -> None:
+        self.name = name
+        self.required = required
+        self.depends_on = list(depends_on or [])
+        self.options = options
+        currencies = options.get("currencies")
+        self.currencies = frozenset(code.upper() for code in currencies) if currencies else None
+
+    def rows_for(self, batch: SinkBatch) -> list[dict[str, Any]]:
+        """The batch rows, restricted to this sink's `currencies` option if it has one."""
+        if self.currencies is None:
+            return batch.rows
+        return [row for row in batch.rows if row["target_code"] in self.currencies]
+
+    def write(self, batch: SinkBatch) -> tuple[int, Any]:
+        raise NotImplementedError
+
+    def loaded_days(self, db_config: dict[str, Any], base_code: str, first_day: date, last_day: date) -> set[date]:
+        """Days from first_day to last_day this sink already holds rows for base_code (none known by default)."""
+        return set()
+
+
+SINK_TYPES: dict[str, type[Sink]] = {}
+
+
+def register_sink(type_name: str) -> Callable[[type[Sink]], type[Sink]]:
+    """Class decorator that makes a Sink subclass available as `type: <type_name>` in config."""
+
+    def decorator(cls: type[Sink]) -> type[Sink]:
+        SINK_TYPES[type_name] = cls
+        return cls
+
+    return decorator
+
+
+@register_sink("csv")
+class CsvSink(Sink):
+    """Write the batch to <directory>/rates_<date>.csv (.csv.gz with `compress`); output is the file path.
+
+    A manifest sidecar is written too (unless `manifest: false`), so the mysql
+    sink can skip rescanning the file and reconcile the load against it.
+    """
+
+    def write(self, batch: SinkBatch) -> tuple[int, Any]:
+        out_dir = batch.project_root / self.options.get("directory", "data/processed")
+        rows = self.rows_for(batch)
+        path = save_to_csv(
+            rows,
+            out_dir,
+            f"rates_{batch.run_date.isoformat()}.csv",
+            compress=self.options.get("compress", False),
+            manifest=self.options.get("manifest", True),
+            # A `currencies` filter can leave nothing; the file still gets the batch's header
+            fieldnames=list(batch.rows[0]) if batch.rows else None,
+        )
+        return len(rows), path
+
+
+@register_sink("mysql")
+class MySqlSink(Sink):
+    """LOAD DATA the CSV written by the sink named in `csv_sink` (default "csv").
+
+    Rows already in the table are skipped, or overwritten with `replace: true`.
+    """
+
+    loads_database = True
+
+    def __init__(self, name: str, required: bool = True, depends_on: list[str] | None = None, **options: Any) -> None:
+        csv_sink = options.get("csv_sink", "csv")
+        super().__init__(name, required, sorted(set(depends_on or []) | {csv_sink}), **options)
+        self.csv_sink = csv_sink
+
+    def write(self, batch: SinkBatch) -> tuple[int, Any]:
+        from load import load_csv_to_mysql
+
+        table = self.options.get("table") or batch.db_config["table"]
+        replace = self.options.get("replace", False)
+        return load_csv_to_mysql(batch.outputs[self.csv_sink], table, batch.db_config, replace), None
+
+    def loaded_days(self, db_config: dict[str, Any], base_code: str, first_day: date, last_day: date) -> set[date]:
+        from load import loaded_days
+
+        return loaded_days(self.options.get("table") or db_config["table"], db_config, base_code, first_day, last_day)
+
+
+@register_sink("mysql_compact")
+class CompactMySqlSink(Sink):
+    """Upsert the rows into the compact schema (see compact_schema.py).
+
+    An `adaptive_batch` option (like load.adaptive_batch) sizes the upsert batches adaptively.
+    """
+
+    loads_database = True
+
+    def write(self, batch: SinkBatch) -> tuple[int, Any]:
+        import adaptive_batch
+        from compact_schema import DEFAULT_CURRENCY_TABLE, DEFAULT_TABLE, load_rows_compact
+
+        count = load_rows_compact(
+            self.rows_for(batch),
+            batch.db_config,
+            self.options.get("table", DEFAULT_TABLE),
+            self.options.get("currency_table", DEFAULT_CURRENCY_TABLE),
+            adaptive_batch.from_config(self.options.get("adaptive_batch"), batch.project_root, "compact_load"),
+        )
+        return count, None
+
+    def loaded_days(self, db_config: dict[str, Any], base_code: str, first_day: date, last_day: date) -> set[date]:
+        from compact_schema import DEFAULT_CURRENCY_TABLE, DEFAULT_TABLE, loaded_days
+
+        return loaded_days(
+            db_config,
+            base_code,
+            first_day,
+            last_day,
+            self.options.get("table", DEFAULT_TABLE),
+            self.options.get("currency_table", DEFAULT_CURRENCY_TABLE),
+        )
+
+
+def build_sinks(config: dict[str, Any]) -> list[Sink]:
+    """Create the enabled sinks from the config.
+
+    Uses `sinks.outputs` when present. Otherwise it keeps the old behaviour of
+    a CSV file plus the MySQL schema picked by `load.schema`.
+    """
+    outputs = (config.get("sinks", {}) or {}).get("outputs")
+    if outputs is None:
+        load_cfg = config.get("load", {}) or {}
+        outputs = [{"name": "csv", "type": "csv"}]
+        if load_cfg.get("schema", "standard") == "compact":
+            outputs.append(
+                {
+                    "name": "mysql",
+                    "type": "mysql_compact",
+                    "table": load_cfg.get("compact_table", "rates_compact"),
+                    "currency_table": load_cfg.get("currency_table", "currencies"),
+                    "adaptive_batch": load_cfg.get("adaptive_batch"),
+                }
+            )
+        else:
+            outputs.append({"name": "mysql", "type": "mysql"})
+
+    sinks = []
+    for spec in outputs:
+        spec = dict(spec)
+        if not spec.pop("enabled", True):
+            continue
+        type_name = spec.pop("type")
+        if type_name not in SINK_TYPES:
+            raise ValueError(f"Unknown sink type {type_name!r}; registered types: {sorted(SINK_TYPES)}")
+        sinks.append(SINK_TYPES[type_name](**spec))
+
+    names = [sink.name for sink in sinks]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Sink names must be unique: {names}")
+    return sinks
+
+
+class RowLoader:
+    """Load row batches into the database with the sinks the pipeline would use.
+
+    Keeps the database sinks from build_sinks(config) plus the sinks they
+    depend on; CSV files they need are written to a temporary directory for
+    each call. With replace, rows already in the table are overwritten.
+    Calling the loader returns the rows the database sinks reported.
+    """
+
+    def __init__(
+        self,
+        config: dict[str, Any],
+        db_config: dict[str, Any],
+        project_root: Path,
+        replace: bool = False,
+    ) -> None:
+        built = build_sinks(config)
+        by_name = {sink.name: sink for sink in built}
+        self.database_sinks = [sink for sink in built if sink.loads_database]
+        if not self.database_sinks:
+            raise ValueError("No database sink is enabled")
+        needed: set[str] = set()
+        pending = list(self.database_sinks)
+        while pending:
+            sink = pending.pop()
+            if sink.name not in needed:
+                needed.add(sink.name)
+                pending.extend(by_name[dep] for dep in sink.depends_on if dep in by_name)
+        self.sinks = [sink for sink in built if sink.name in needed]
+        if replace:
+            for sink in self.sinks:
+                sink.options["replace"] = True
+        self.db_config = db_config
+        self.project_root = project_root
+
+    def __call__(self, rows: list[dict[str, Any]]) -> int:
+        with tempfile.TemporaryDirectory() as tmp:
+            for sink in self.sinks:
+                if isinstance(sink, CsvSink):
+                    sink.options["directory"] = tmp
+            results = run_sinks(self.sinks, SinkBatch(rows, date.today(), self.project_root, self.db_config))
+        return sum(results[sink.name].rows for sink in self.database_sinks)
+
+    def loaded_days(self, base_code: str, first_day: date, last_day: date) -> set[date]:
+        """Days from first_day to last_day that every database sink already holds for base_code."""
+        held = [sink.loaded_days(self.db_config, base_code, first_day, last_day) for sink in self.database_sinks]
+        return set.intersection(*held)
+
+
+def plan_waves(sinks: list[Sink]) -> list[list[Sink]]:
+    """Group sinks into waves where every sink's dependencies are in earlier waves."""
+    by_name = {sink.name: sink for sink in sinks}
+    for sink in sinks:
+        unknown = [dep for dep in sink.depends_on if dep not in by_name]
+        if unknown:
+            raise ValueError(f"Sink {sink.name!r} depends on unknown or disabled sinks {unknown}")
+
+    waves: list[list[Sink]] = []
+    placed: set[str] = set()
+    remaining = list(sinks)
+    while remaining:
+        wave = [sink for sink in remaining if set(sink.depends_on) <= placed]
+        if not wave:
+            raise ValueError(f"Sink dependencies form a cycle: {[sink.name for sink in remaining]}")
+        waves.append(wave)
+        placed |= {sink.name for sink in wave}
+        remaining = [sink for sink in remaining if sink.name not in placed]
+    return waves
+
+
+def _run_one(sink: Sink, batch: SinkBatch) -> SinkResult:
+    with timed_stage(f"sink.{sink.name}") as stage:
+        try:
+            rows, output = sink.write(batch)
+            stage.rows = rows
+            result = SinkResult(sink.name, "ok", rows, output=output)
+        except Exception as e:
+            logger.error(f"Sink {sink.name} failed: {e}")
+            result = SinkResult(sink.name, "failed", error=e)
+    result.seconds = stage.wall_seconds
+    return result
+
+
+def run_sinks(sinks: list[Sink], batch: SinkBatch, max_workers: int = DEFAULT_MAX_WORKERS) -> dict[str, SinkResult]:
+    """Run every sink on batch, wave by wave, and enforce the required-sink policy.
+
+    Returns:
+        dict[str, SinkResult]: Result per sink name, in run order
+
+    Raises:
+        SinkError: If any required sink failed or was skipped
+    """
+    results: dict[str, SinkResult] = {}
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="sink") as pool:
+        for wave in plan_waves(sinks):
+            runnable = []
+            for sink in wave:
+                failed_deps = [dep for dep in sink.depends_on if results[dep].status != "ok"]
+                if failed_deps:
+                    logger.warning(f"Skipping sink {sink.name}: dependencies {failed_deps} did not succeed")
+                    results[sink.name] = SinkResult(sink.name, "skipped")
+                else:
+                    runnable.append(sink)
+            for result in pool.map(lambda sink: _run_one(sink, batch), runnable):
+                results[result.name] = result
+                if result.status == "ok":
+                    batch.outputs[result.name] = result.output
+
+    for result in results.values():
+        metrics.set_gauge("sink_success", int(result.status == "ok"), "1 if the sink succeeded", sink=result.name)
+        metrics.set_gauge("sink_duration_seconds", result.seconds, "Wall time of the sink", sink=result.name)
+        metrics.set_gauge("sink_rows", result.rows, "Rows written by the sink", sink=result.name)
+        logger.info(f"Sink {result.name}: {result.status}, {result.rows} rows in {result.seconds:.3f}s")
+
+    failed_required = [sink for sink in sinks if sink.required and results[sink.name].status != "ok"]
+    if failed_required:
+        first_error = next((results[s.name].error for s in failed_required if results[s.name].error), None)
+        summary = ", ".join(f"{s.name} ({results[s.name].status})" for s in failed_required)
+        raise SinkError(f"Required sinks did not succeed: {summary}") from first_error
+    return results
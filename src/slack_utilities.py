@@ -1,25 +1,50 @@
 # slack_utilities.py
 """Slack utilities for sending notifications and uploading files in the ETL pipeline."""
 
-from slack_sdk import WebClient
-from slack_sdk.errors import SlackApiError
 from pathlib import Path
+import functools
+import gzip
 import logging
+import threading
+import time
+from typing import TYPE_CHECKING
 from config import get_slack_token
 from retrying import retry
 from utilities import get_current_date
 
+# slack_sdk is imported lazily inside the functions below so that importing
+# this module (and starting the pipeline) doesn't pay for it until a
+# notification is actually sent.
+if TYPE_CHECKING:
+    from slack_sdk import WebClient
+
 logger = logging.getLogger(__name__)
 
 
-def _get_client() -> WebClient:
-    """Create and return a Slack WebClient instance."""
+def _is_slack_error(e: Exception) -> bool:
+    """Return True if e is a SlackApiError (retry predicate)."""
+    from slack_sdk.errors import SlackApiError
+
+    return isinstance(e, SlackApiError)
+
+
+# Seconds a single Slack API call may take before the SDK gives up
+CLIENT_TIMEOUT = 10
+
+
+@functools.cache
+def _get_client() -> "WebClient":
+    """Create the Slack WebClient once and reuse it for every call."""
+    from slack_sdk import WebClient
+
     token = get_slack_token()
-    return WebClient(token=token)
+    return WebClient(token=token, timeout=CLIENT_TIMEOUT)
 
 
 def post_message(text: str, slack_channel: str) -> None:
     """Send a simple text message to Slack."""
+    from slack_sdk.errors import SlackApiError
+
     try:
         client = _get_client()
         if not client:
@@ -32,6 +57,8 @@ def post_message(text: str, slack_channel: str) -> None:
 
 def upload_file(file_path: Path, slack_channel: str) -> None:
     """Upload the given file into Slack as a snippet."""
+    from slack_sdk.errors import SlackApiError
+
     try:
         client = _get_client()
         if not client:
@@ -45,22 +72,161 @@ def upload_file(file_path: Path, slack_channel: str) -> None:
         raise RuntimeError(f"Slack file upload failed: {e.response['error']}")
 
 
+def success_message() -> str:
+    """Return the notification text for a successful run."""
+    return f":white_check_mark: ETL completed *successfully* for {get_current_date()}!"
+
+
+def skipped_message() -> str:
+    """Return the notification text for a run that found no new data."""
+    return f":zzz: ETL for {get_current_date()} found *no new data*; transform and load were skipped."
+
+
+def failure_message(error_msg: str) -> str:
+    """Return the notification text for a failed run."""
+    return f":x: ETL *failed* for {get_current_date()} with error: {error_msg}"
+
+
 @retry(
     stop_max_attempt_number=3,
     wait_fixed=2000,
-    retry_on_exception=lambda e: isinstance(e, SlackApiError),
+    retry_on_exception=_is_slack_error,
 )
 def notify_success(log_path: Path, slack_channel: str) -> None:
     """Notify Slack about successful ETL completion and upload log file."""
-    post_message(f":white_check_mark: ETL completed *successfully* for {get_current_date()}!", slack_channel)
+    post_message(success_message(), slack_channel)
 
 
 @retry(
     stop_max_attempt_number=3,
     wait_fixed=2000,
-    retry_on_exception=lambda e: isinstance(e, SlackApiError),
+    retry_on_exception=_is_slack_error,
 )
 def notify_failure(log_path: Path, error_msg: str, slack_channel: str) -> None:
     """Notify Slack about ETL failure and upload log file."""
-    post_message(f":x: ETL *failed* for {get_current_date()} with error: {error_msg}", slack_channel)
+    post_message(failure_message(error_msg), slack_channel)
     upload_file(log_path, slack_channel)
+
+
+def read_log_tail(log_path: Path, max_bytes: int = 64 * 1024) -> bytes:
+    """Return the last max_bytes of log_path, starting at a line boundary."""
+    with log_path.open("rb") as f:
+        f.seek(0, 2)
+        size = f.tell()
+        f.seek(max(0, size - max_bytes))
+        tail = f.read()
+    if size > max_bytes and b"\n" in tail:
+        tail = tail.split(b"\n", 1)[1]
+    return tail
+
+
+def upload_log_tail(log_path: Path, slack_channel: str, max_bytes: int = 64 * 1024) -> None:
+    """Upload a gzip-compressed tail of log_path instead of the whole file."""
+    from slack_sdk.errors import SlackApiError
+
+    payload = gzip.compress(read_log_tail(log_path, max_bytes))
+    try:
+        _get_client().files_upload(
+            channels=slack_channel,
+            file=payload,
+            filename=f"{log_path.name}.tail.gz",
+            title=f"ETL log (last {max_bytes // 1024} KiB): {log_path.name}",
+        )
+    except SlackApiError as e:
+        raise RuntimeError(f"Slack file upload failed: {e.response['error']}")
+
+
+class SlackNotifier:
+    """Collect notification events for one run and send them from a background thread.
+
+    All events added during the run are coalesced into a single Slack message.
+    The worker thread starts immediately so that importing slack_sdk overlaps
+    with the pipeline; it builds the client (reading BOT_TOKEN) and posts only
+    once close() is called, after the run has loaded its environment. close()
+    waits at most ``timeout`` seconds in total (retries included) and the
+    worker is a daemon thread, so Slack can never hold up process exit for
+    longer than that.
+    """
+
+    def __init__(self, slack_channel: str, timeout: float = 15.0, retry_wait: float = 2.0) -> None:
+        self.slack_channel = slack_channel
+        self.timeout = timeout
+        self.retry_wait = retry_wait
+        self._events: list[str] = []
+        self._log_path: Path | None = None
+        self._log_tail_bytes = 64 * 1024
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._deadline = 0.0
+        self.sent = False
+        self._worker = threading.Thread(target=self._run, name="slack-notifier", daemon=True)
+        self._worker.start()
+
+    def add_event(self, text: str) -> None:
+        """Queue one line for the run's notification message."""
+        with self._lock:
+            self._events.append(text)
+
+    def attach_log_tail(self, log_path: Path, max_bytes: int = 64 * 1024) -> None:
+        """Upload a compressed tail of log_path along with the message."""
+        with self._lock:
+            self._log_path = log_path
+            self._log_tail_bytes = max_bytes
+
+    def close(self) -> bool:
+        """Release the worker to send the coalesced message and wait for it.
+
+        Returns:
+            bool: True if everything was delivered within the timeout
+        """
+        self._deadline = time.monotonic() + self.timeout
+        self._ready.set()
+        self._worker.join(self.timeout)
+        if self._worker.is_alive():
+            logger.warning(f"Slack notification did not finish within {self.timeout:.0f}s; giving up")
+        return self.sent
+
+    def _run(self) -> None:
+        try:
+            # Warm up: import slack_sdk while the pipeline runs
+            import slack_sdk  # noqa: F401
+        except ImportError as e:
+            logger.warning(f"Slack notifications disabled: {e}")
+            return
+
+        self._ready.wait()
+        with self._lock:
+            events = list(self._events)
+            log_path, tail_bytes = self._log_path, self._log_tail_bytes
+        if not events:
+            return
+        try:
+            # Only now: the token may come from the .env file the run loads after the notifier starts
+            _get_client()
+        except Exception as e:
+            logger.warning(f"Slack notifications disabled: {e}")
+            return
+
+        text = "\n".join(events)
+        if not self._attempt(lambda: post_message(text, self.slack_channel)):
+            return
+        if (
+            log_path is not None
+            and log_path.exists()
+            and not self._attempt(lambda: upload_log_tail(log_path, self.slack_channel, tail_bytes))
+        ):
+            return
+        self.sent = True
+
+    def _attempt(self, send) -> bool:
+        """Call send, retrying until it succeeds or the overall deadline passes."""
+        while True:
+            try:
+                send()
+                return True
+            except Exception as e:
+                if time.monotonic() + self.retry_wait >= self._deadline:
+                    logger.error(f"Slack notification failed: {e}")
+                    return False
+                logger.warning(f"Slack notification attempt failed, retrying: {e}")
+                time.sleep(self.retry_wait)
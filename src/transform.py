@@ -2,14 +2,21 @@
 """Transform module for exchange rates ETL pipeline."""
 
 import logging
+from collections.abc import Sequence
 from datetime import datetime
 from typing import Any
 
+from profiling_utilities import timed
+
 logger = logging.getLogger(__name__)
 
 
-def transform_rates(raw: dict[str, Any]) -> list[dict[str, Any]]:
-    """Flatten the API JSON into a list of dicts matching database schema."""
+@timed("transform.transform_rates", rows=len)
+def transform_rates(raw: dict[str, Any], currencies: Sequence[str] | None = None) -> list[dict[str, Any]]:
+    """Flatten the API JSON into a list of dicts matching database schema.
+
+    With currencies, only those target codes are emitted (in that order).
+    """
     rows: list[dict[str, Any]] = []
 
     # parse the UTC strings into Python datetimes
@@ -30,7 +37,14 @@ def transform_rates(raw: dict[str, Any]) -> list[dict[str, Any]]:
         "time_last_update_unix": raw["time_last_update_unix"],
     }
 
-    for target_code, rate in raw.get("conversion_rates", {}).items():
+    conversion_rates = raw.get("conversion_rates", {})
+    if currencies is not None:
+        missing = [code for code in currencies if code not in conversion_rates]
+        if missing:
+            logger.warning(f"Target currencies missing from the payload: {missing}")
+        conversion_rates = {code: conversion_rates[code] for code in currencies if code in conversion_rates}
+
+    for target_code, rate in conversion_rates.items():
         row = {
             "base_code": common["base_code"],
             "target_code": target_code,
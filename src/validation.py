@@ -0,0 +1,203 @@
+# validation.py
+"""Anomaly checks for a transformed snapshot before it is loaded.
+
+Each new snapshot is compared with recent history per (base, target) pair:
+
+- rates that are not finite and positive
+- z-score of the log rate against the history window's mean/std
+- ratio to the last observed rate outside [1 / max_ratio, max_ratio]
+- codes with no history (new) and codes in history but absent from the snapshot (missing)
+
+History is held as one (pairs x observations) NumPy matrix, so every check is a
+handful of array operations no matter how long the comparison window is. By
+default the history is the rolling statistics state (see rolling_stats.py).
+"""
+
+import logging
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from data_utilities import save_to_csv
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUARANTINE_DIR = Path(__file__).parent.parent / "data" / "quarantine"
+ACTIONS = ("quarantine", "flag", "fail")
+# Floor for the log-rate standard deviation so pegged currencies don't flag on tiny moves
+MIN_LOG_STD = 1e-3
+
+
+class ValidationError(ValueError):
+    """Raised when a snapshot fails validation and the configured action is to stop."""
+
+
+@dataclass
+class ValidationReport:
+    """Outcome of validating one snapshot."""
+
+    accepted: list[dict[str, Any]] = field(default_factory=list)
+    flagged: list[dict[str, Any]] = field(default_factory=list)
+    new_codes: list[str] = field(default_factory=list)
+    missing_codes: list[str] = field(default_factory=list)
+    quarantine_path: Path | None = None
+
+
+class History:
+    """Recent rates per pair as a NaN-padded (pairs x observations) matrix, oldest first."""
+
+    def __init__(self, series: dict[tuple[str, str], Sequence[float]]) -> None:
+        self.keys = list(series)
+        self.index = {key: i for i, key in enumerate(self.keys)}
+        width = max((len(values) for values in series.values()), default=0)
+        self.rates = np.full((len(self.keys), width), np.nan)
+        for i, values in enumerate(series.values()):
+            if len(values):
+                self.rates[i, width - len(values) :] = values
+
+    @classmethod
+    def from_rolling_stats(cls, state_path: Path, windows: Sequence[int]) -> "History":
+        """Use the buffers kept by the rolling statistics stage as history."""
+        import rolling_stats
+
+        stats = rolling_stats.RollingStats.load(state_path, windows)
+        return cls({key: pair.rates.buffer.values() for key, pair in stats.pairs.items()})
+
+
+def validate_snapshot(
+    rows: list[dict[str, Any]],
+    history: History,
+    z_threshold: float = 6.0,
+    max_ratio: float = 10.0,
+    min_history: int = 5,
+    currencies: Sequence[str] | None = None,
+) -> ValidationReport:
+    """Check rows against history and split them into accepted and flagged.
+
+    Flagged rows get a ``reasons`` entry (semicolon-separated). z-scores are only
+    computed for pairs with at least min_history observations; pairs with no
+    history at all are reported as new codes but accepted. With currencies
+    (the target-currency projection), only those codes can be reported missing.
+    """
+    report = ValidationReport()
+    if not rows:
+        return report
+
+    rate = np.array([float(row["rate"]) for row in rows])
+    idx = np.array([history.index.get((row["base_code"], row["target_code"]), -1) for row in rows])
+    known = idx >= 0
+
+    hist = history.rates[np.where(known, idx, 0)] if history.rates.size else np.full((len(rows), 1), np.nan)
+    hist[~known] = np.nan
+    counts = np.sum(~np.isnan(hist), axis=1)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        valid = np.isfinite(rate) & (rate > 0)
+        log_hist = np.log(hist)
+        present = ~np.isnan(log_hist)
+        n = np.maximum(counts, 1)
+        mean = np.where(present, log_hist, 0.0).sum(axis=1) / n
+        std = np.sqrt(np.where(present, (log_hist - mean[:, None]) ** 2, 0.0).sum(axis=1) / n)
+        z = (np.log(rate) - mean) / np.maximum(std, MIN_LOG_STD)
+
+        # last observed rate per pair: the right-most non-NaN column
+        last_col = hist.shape[1] - 1 - np.argmax(present[:, ::-1], axis=1)
+        last = hist[np.arange(len(rows)), last_col]
+        ratio = rate / last
+
+    bad_rate = ~valid
+    bad_z = valid & (counts >= min_history) & (np.abs(z) > z_threshold)
+    bad_ratio = valid & (counts > 0) & ((ratio > max_ratio) | (ratio < 1.0 / max_ratio))
+
+    for i, row in enumerate(rows):
+        reasons = []
+        if bad_rate[i]:
+            reasons.append("rate not a positive number")
+        if bad_z[i]:
+            reasons.append(f"z-score {z[i]:.1f} over {counts[i]} observations")
+        if bad_ratio[i]:
+            reasons.append(f"{ratio[i]:.4g}x the last rate {last[i]:.6g}")
+        if reasons:
+            report.flagged.append({**row, "reasons": "; ".join(reasons)})
+        else:
+            report.accepted.append(row)
+
+    snapshot_keys = {(row["base_code"], row["target_code"]) for row in rows}
+    report.new_codes = sorted(row["target_code"] for row, k in zip(rows, known) if not k)
+    bases = {base for base, _ in snapshot_keys}
+    wanted = set(currencies) if currencies is not None else None
+    report.missing_codes = sorted(
+        target
+        for base, target in history.keys
+        if base in bases and (base, target) not in snapshot_keys and (wanted is None or target in wanted)
+    )
+    return report
+
+
+def write_quarantine(flagged: Iterable[dict[str, Any]], quarantine_dir: Path, filename: str) -> Path | None:
+    """Write flagged rows (with their reasons) to quarantine_dir/filename."""
+    flagged = list(flagged)
+    if not flagged:
+        return None
+    return save_to_csv(flagged, quarantine_dir, filename)
+
+
+def apply_validation(
+    rows: list[dict[str, Any]],
+    history: History,
+    action: str = "quarantine",
+    quarantine_dir: Path = DEFAULT_QUARANTINE_DIR,
+    quarantine_name: str = "quarantine.csv",
+    max_missing_fraction: float = 0.2,
+    currencies: Sequence[str] | None = None,
+    **thresholds: Any,
+) -> ValidationReport:
+    """Validate rows and act on the result according to the configured policy.
+
+    Args:
+        action: "quarantine" drops flagged rows from the load and writes them to
+            quarantine_dir; "flag" writes them there but loads everything;
+            "fail" raises ValidationError if anything is flagged
+        max_missing_fraction: Raise ValidationError when more than this share of
+            the known codes for the snapshot's base is missing
+        currencies: Target-currency projection; other codes are never "missing"
+        **thresholds: Passed to validate_snapshot (z_threshold, max_ratio, min_history)
+
+    Returns:
+        ValidationReport: report.accepted holds the rows to load
+    """
+    if action not in ACTIONS:
+        raise ValueError(f"Unknown validation action {action!r}; expected one of {ACTIONS}")
+
+    report = validate_snapshot(rows, history, currencies=currencies, **thresholds)
+    known = len(report.missing_codes) + len(rows) - len(report.new_codes)
+    if not history.keys:
+        logger.info("No validation history yet; only checking that rates are positive numbers")
+    else:
+        if report.new_codes:
+            logger.warning(f"New currency codes with no history: {report.new_codes}")
+        if report.missing_codes:
+            logger.warning(f"Currency codes missing from the snapshot: {report.missing_codes}")
+        if known and len(report.missing_codes) / known > max_missing_fraction:
+            raise ValidationError(
+                f"{len(report.missing_codes)} of {known} known currency codes are missing from the snapshot"
+            )
+
+    if report.flagged:
+        report.quarantine_path = write_quarantine(report.flagged, quarantine_dir, quarantine_name)
+        for row in report.flagged:
+            logger.warning(f"Suspicious rate {row['base_code']}/{row['target_code']}={row['rate']}: {row['reasons']}")
+        if action == "fail":
+            raise ValidationError(f"{len(report.flagged)} rows failed validation (see {report.quarantine_path})")
+        if action == "flag":
+            report.accepted = list(rows)
+        elif not report.accepted:
+            raise ValidationError(f"All {len(rows)} rows failed validation (see {report.quarantine_path})")
+    logger.info(
+        f"Validation: {len(report.accepted)} rows accepted, {len(report.flagged)} flagged "
+        f"({action}), {len(report.new_codes)} new codes, {len(report.missing_codes)} missing codes"
+    )
+    return report
@@ -0,0 +1,182 @@
+# watermark.py
+"""Freshness watermark for exchange rates ETL pipeline.
+
+The watermark is the provider's ``time_last_update_unix`` of the last snapshot
+that was successfully loaded, per base currency. It is stored in MySQL (the
+source of truth) and mirrored to a local JSON state file so that the common
+"nothing new yet" case can be decided without opening a DB connection. The
+table is created on the first write, so existing databases need no migration.
+"""
+
+import json
+import logging
+import os
+import tempfile
+from collections.abc import Mapping
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STATE_FILE = Path(__file__).parent.parent / "data" / "state" / "watermarks.json"
+DEFAULT_TABLE = "etl_watermarks"
+# MySQL ER_NO_SUCH_TABLE
+NO_SUCH_TABLE = 1146
+
+
+def read_local_watermarks(state_path: Path = DEFAULT_STATE_FILE) -> dict[str, dict[str, Any]]:
+    """Return the mirrored watermarks as {base: {"time_last_update_unix": ..., "loaded_at": ...}}."""
+    try:
+        return json.loads(state_path.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return {}
+    except (OSError, json.JSONDecodeError) as e:
+        logger.warning(f"Ignoring unreadable watermark state file {state_path}: {e}")
+        return {}
+
+
+def write_local_watermark(base_code: str, time_last_update_unix: int, state_path: Path = DEFAULT_STATE_FILE) -> None:
+    """Update one base in the local state file (atomic replace; never moves it backwards, like the DB)."""
+    state = read_local_watermarks(state_path)
+    previous = state.get(base_code, {}).get("time_last_update_unix", 0)
+    state[base_code] = {
+        "time_last_update_unix": max(int(previous), int(time_last_update_unix)),
+        "loaded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    }
+    state_path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=state_path.parent, prefix=f".{state_path.name}.", suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(tmp_name, state_path)
+
+
+def read_db_watermark(base_code: str, db_config: dict[str, Any], table: str = DEFAULT_TABLE) -> int | None:
+    """Return the watermark stored in MySQL for base_code, or None if there is none.
+
+    Only one connection attempt is made: callers fall back to the local mirror,
+    so retrying would just delay every run while the DB is down.
+    """
+    from db_utilities import connect_to_mysql_once, load_sql_template
+
+    sql = load_sql_template("select_watermark.sql").format(table=table)
+    conn = connect_to_mysql_once(db_config)
+    cursor = conn.cursor()
+    try:
+        try:
+            cursor.execute(sql, (base_code,))
+        except Exception as e:
+            if getattr(e, "errno", None) == NO_SUCH_TABLE:
+                return None
+            raise
+        row = cursor.fetchone()
+        return int(row[0]) if row else None
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def write_db_watermark(
+    base_code: str,
+    time_last_update_unix: int,
+    db_config: dict[str, Any],
+    table: str = DEFAULT_TABLE,
+) -> None:
+    """Upsert the watermark for base_code in MySQL (never moves it backwards).
+
+    The table is created if it doesn't exist yet.
+    """
+    from db_utilities import connect_to_mysql, load_sql_template
+
+    sql = load_sql_template("upsert_watermark.sql").format(table=table)
+    params = (base_code, int(time_last_update_unix))
+    conn = connect_to_mysql(db_config)
+    cursor = conn.cursor()
+    try:
+        try:
+            cursor.execute(sql, params)
+        except Exception as e:
+            if getattr(e, "errno", None) != NO_SUCH_TABLE:
+                raise
+            logger.info(f"Creating watermark table {table}")
+            cursor.execute(load_sql_template("create_watermark_table.sql").format(table=table))
+            cursor.execute(sql, params)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def get_watermark(
+    base_code: str,
+    db_config: dict[str, Any] | None = None,
+    state_path: Path = DEFAULT_STATE_FILE,
+    table: str = DEFAULT_TABLE,
+    minimum: int | None = None,
+) -> int | None:
+    """Return the last loaded time_last_update_unix for base_code.
+
+    The local mirror is consulted first; the DB is only queried when the mirror
+    cannot already prove the snapshot is stale (i.e. it is missing or older than
+    ``minimum``). A DB value newer than the mirror refreshes the mirror.
+    """
+    local = read_local_watermarks(state_path).get(base_code, {}).get("time_last_update_unix")
+    if local is not None and minimum is not None and local >= minimum:
+        return local
+    if db_config is None:
+        return local
+
+    try:
+        remote = read_db_watermark(base_code, db_config, table)
+    except Exception as e:
+        logger.warning(f"Could not read watermark for {base_code} from the database, using local state: {e}")
+        return local
+
+    if remote is not None and (local is None or remote > local):
+        write_local_watermark(base_code, remote, state_path)
+        return remote
+    return local if local is not None else remote
+
+
+def has_new_data(
+    raw: Mapping[str, Any],
+    db_config: dict[str, Any] | None = None,
+    state_path: Path = DEFAULT_STATE_FILE,
+    table: str = DEFAULT_TABLE,
+) -> bool:
+    """Return True if raw is newer than the last loaded snapshot for its base."""
+    base_code = raw["base_code"]
+    current = int(raw["time_last_update_unix"])
+    watermark = get_watermark(base_code, db_config, state_path, table, minimum=current)
+    if watermark is None:
+        logger.info(f"No watermark for {base_code} yet; treating payload as new")
+        return True
+    if current > watermark:
+        logger.info(f"New data for {base_code}: time_last_update_unix {current} > watermark {watermark}")
+        return True
+    logger.info(f"No new data for {base_code}: time_last_update_unix {current} <= watermark {watermark}")
+    return False
+
+
+def record_watermark(
+    base_code: str,
+    time_last_update_unix: int,
+    db_config: dict[str, Any] | None = None,
+    state_path: Path = DEFAULT_STATE_FILE,
+    table: str = DEFAULT_TABLE,
+) -> None:
+    """Persist a successful load in the DB (if configured) and in the local mirror.
+
+    The rows are already loaded, so a DB failure here only logs a warning; the
+    mirror still advances and the DB catches up on the next successful run.
+    """
+    if db_config is not None:
+        try:
+            write_db_watermark(base_code, time_last_update_unix, db_config, table)
+        except Exception as e:
+            logger.warning(f"Could not store watermark for {base_code} in the database, keeping local state only: {e}")
+    write_local_watermark(base_code, time_last_update_unix, state_path)
+    logger.info(f"Watermark for {base_code} advanced to {time_last_update_unix}")
@@ -0,0 +1,87 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+# Ensure we import the version under src/
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root / "src"))
+
+import adaptive_batch
+import metrics
+
+
+@pytest.fixture(autouse=True)
+def clean_state():
+    metrics.registry.clear()
+    adaptive_batch._batchers.clear()
+    yield
+    metrics.registry.clear()
+    adaptive_batch._batchers.clear()
+
+
+class FakeClock:
+    """perf_counter stand-in; send() advances it by a simulated batch latency."""
+
+    def __init__(self, seconds_per_row, overhead=0.05):
+        self.now = 0.0
+        self.seconds_per_row = seconds_per_row
+        self.overhead = overhead
+        self.sizes = []
+
+    def perf_counter(self):
+        return self.now
+
+    def send(self, chunk):
+        self.sizes.append(len(chunk))
+        self.now += self.overhead + len(chunk) * self.seconds_per_row
+
+
+def test_aimd_steps_within_bounds():
+    batcher = adaptive_batch.AdaptiveBatcher("t", initial_size=1000, min_size=300, max_size=1250, increase=200)
+    assert batcher.record(1000, 0.1).action == "increase" and batcher.size == 1200
+    assert batcher.record(1200, 0.1).next_size == 1250  # capped at max_size
+    assert batcher.record(600, 0.1).action == "hold"  # a short tail batch proves nothing
+    assert batcher.record(1250, 2.0).next_size == 625  # halved when slow
+    assert batcher.record(625, 2.0).next_size == 312
+    assert batcher.record(312, 2.0).next_size == 300  # floored at min_size
+    assert batcher.record(300, 2.0).action == "hold"
+
+    with pytest.raises(ValueError):
+        adaptive_batch.AdaptiveBatcher("t", min_size=10, max_size=5)
+
+
+def test_run_converges_towards_target_latency(monkeypatch):
+    # 0.05s per batch plus 0.1ms per row: the target of 0.5s fits 4500 rows
+    clock = FakeClock(seconds_per_row=0.0001)
+    monkeypatch.setattr(adaptive_batch.time, "perf_counter", clock.perf_counter)
+    batcher = adaptive_batch.AdaptiveBatcher("t", initial_size=1000, min_size=100, max_size=100_000, target_seconds=0.5)
+
+    assert batcher.run(list(range(400_000)), clock.send) == 400_000
+    assert sum(clock.sizes) == 400_000
+    # AIMD saws around the sweet spot: climbs past 4500, halves, climbs again
+    steady = clock.sizes[len(clock.sizes) // 2 :]
+    assert 2000 <= min(steady) and max(steady) <= 5000
+    assert any(d.action == "decrease" for d in batcher.decisions)
+    assert "batches, 400000 rows" in batcher.summary()
+
+
+def test_decisions_are_recorded(tmp_path):
+    batcher = adaptive_batch.from_config(
+        {"enabled": True, "initial_size": 100, "min_size": 10, "decisions_file": "state/decisions.jsonl"},
+        tmp_path,
+        "compact_load",
+    )
+    batcher.record(100, 0.2)
+    batcher.record(110, 0.9)
+
+    lines = [json.loads(line) for line in (tmp_path / "state" / "decisions.jsonl").read_text().splitlines()]
+    assert [(d["size"], d["action"], d["next_size"]) for d in lines] == [(100, "increase", 110), (110, "decrease", 55)]
+    assert lines[0]["path"] == "compact_load" and lines[0]["rows_per_second"] == 500.0
+    assert metrics.registry.get("load_batch_size", path="compact_load") == 55
+    assert metrics.registry.get("load_batch_decisions_total", path="compact_load", action="decrease") == 1
+
+    # The controller is shared by later loads in the process, and off unless enabled
+    assert adaptive_batch.from_config({"enabled": True}, tmp_path, "compact_load") is batcher
+    assert adaptive_batch.from_config(None, tmp_path, "other") is None
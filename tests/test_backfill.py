@@ -0,0 +1,164 @@
+import json
+import sys
+import threading
+import time
+from datetime import date, datetime, timezone
+from pathlib import Path
+
+import pytest
+
+# Ensure we import the version under src/
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root / "src"))
+
+import backfill
+from json_backend import PayloadError
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return backfill.BackfillQueue(tmp_path / "queue.sqlite", lease_seconds=60, max_attempts=2)
+
+
+def history_body(base_code, day, rates=None):
+    return json.dumps(
+        {
+            "result": "success",
+            "documentation": "https://www.exchangerate-api.com/docs",
+            "terms_of_use": "https://www.exchangerate-api.com/terms",
+            "year": day.year,
+            "month": day.month,
+            "day": day.day,
+            "base_code": base_code,
+            "conversion_rates": rates or {base_code: 1, "EUR": 0.9, "JPY": 150.0},
+        }
+    ).encode()
+
+
+def test_enqueue_splits_ranges_and_is_idempotent(queue):
+    assert queue.enqueue(["usd", "EUR"], date(2024, 1, 1), date(2024, 1, 10), days_per_unit=4) == 6
+    assert queue.enqueue(["USD"], date(2024, 1, 1), date(2024, 1, 10), days_per_unit=4) == 0
+    progress = queue.progress()
+    assert progress.units == {"pending": 6, "leased": 0, "done": 0, "failed": 0}
+    assert progress.days_total == 20
+
+    unit = queue.claim("a")
+    assert (unit.base_code, unit.first_day, unit.last_day) == ("USD", date(2024, 1, 1), date(2024, 1, 4))
+    assert list(unit.days()) == [date(2024, 1, d) for d in range(1, 5)]
+
+
+def test_concurrent_workers_never_share_a_unit(queue):
+    queue.enqueue(["USD", "EUR", "GBP"], date(2024, 1, 1), date(2024, 3, 31), days_per_unit=3)
+    seen, lock = [], threading.Lock()
+
+    def work(unit):
+        with lock:
+            seen.append(unit.id)
+        return 1
+
+    workers = [threading.Thread(target=backfill.run_worker, args=(queue, work, f"w{i}")) for i in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    progress = queue.progress()
+    assert sorted(seen) == list(range(1, progress.units["done"] + 1))
+    assert progress.finished and progress.rows_loaded == len(seen) == 93
+    assert progress.days_done == progress.days_total
+
+
+def test_expired_lease_is_reclaimed(tmp_path):
+    queue = backfill.BackfillQueue(tmp_path / "queue.sqlite", lease_seconds=0.05)
+    queue.enqueue(["USD"], date(2024, 1, 1), date(2024, 1, 1))
+    stale = queue.claim("crashed")
+    assert queue.claim("other") is None
+    time.sleep(0.1)
+
+    unit = queue.claim("other")
+    assert unit.id == stale.id and unit.attempts == 2
+    # The first worker lost the unit and can't finish it any more
+    assert not queue.heartbeat(stale, "crashed")
+    assert not queue.complete(stale, "crashed", 10)
+    assert queue.complete(unit, "other", 10)
+    assert queue.progress().units["done"] == 1
+
+
+def test_heartbeat_keeps_long_unit_leased(tmp_path):
+    queue = backfill.BackfillQueue(tmp_path / "queue.sqlite", lease_seconds=0.15)
+    queue.enqueue(["USD"], date(2024, 1, 1), date(2024, 1, 1))
+    stolen = []
+
+    def slow(unit):
+        time.sleep(0.4)
+        stolen.append(queue.claim("thief"))
+        return 5
+
+    assert backfill.run_worker(queue, slow, "slow") == 1
+    assert stolen == [None]
+    assert queue.progress().rows_loaded == 5
+
+
+def test_failures_retry_then_give_up(queue):
+    queue.enqueue(["USD"], date(2024, 1, 1), date(2024, 1, 1))
+    calls = []
+
+    def broken(unit):
+        calls.append(unit.attempts)
+        raise RuntimeError("API down")
+
+    assert backfill.run_worker(queue, broken, "w") == 0
+    assert calls == [1, 2]
+    [(_, base_code, _, _, error)] = queue.failures()
+    assert base_code == "USD" and error == "RuntimeError: API down"
+
+    assert queue.retry_failed() == 1
+    assert backfill.run_worker(queue, lambda unit: 3, "w") == 1
+    assert queue.progress().units["done"] == 1
+
+
+def test_history_to_payload_dates_snapshot_at_midnight():
+    payload = backfill.history_to_payload(history_body("USD", date(2024, 2, 29)), ["JPY", "EUR"])
+    assert payload.time_last_update_unix == int(datetime(2024, 2, 29, tzinfo=timezone.utc).timestamp())
+    assert payload.time_next_update_unix - payload.time_last_update_unix == 86400
+    assert payload.time_last_update_utc == "Thu, 29 Feb 2024 00:00:00 +0000"
+    assert payload.conversion_rates == {"JPY": 150.0, "EUR": 0.9}
+
+    with pytest.raises(PayloadError, match="invalid-key"):
+        backfill.history_to_payload(json.dumps({"result": "error", "error-type": "invalid-key"}).encode())
+
+
+def test_backfill_unit_loads_every_day_at_once():
+    unit = backfill.WorkUnit(1, "EUR", date(2024, 1, 30), date(2024, 2, 2), 1)
+    fetched, loads = [], []
+
+    def fetch(base_code, day):
+        fetched.append((base_code, day))
+        return history_body(base_code, day)
+
+    def load_rows(rows):
+        loads.append(rows)
+        return len(rows)
+
+    assert backfill.backfill_unit(unit, fetch, load_rows, ["JPY"]) == 4
+    assert [day for _, day in fetched] == list(unit.days())
+    [rows] = loads
+    assert {row["time_last_update_utc"].day for row in rows} == {30, 31, 1, 2}
+    assert all(row["base_code"] == "EUR" and row["target_code"] == "JPY" for row in rows)
+
+
+def test_backfill_unit_skips_days_already_loaded():
+    unit = backfill.WorkUnit(1, "USD", date(2025, 6, 21), date(2025, 6, 23), 1)
+    fetched = []
+
+    def fetch(base_code, day):
+        fetched.append(day)
+        return history_body(base_code, day)
+
+    def loaded_days(base_code, first_day, last_day):
+        assert (base_code, first_day, last_day) == ("USD", unit.first_day, unit.last_day)
+        return {date(2025, 6, 22)}
+
+    assert backfill.backfill_unit(unit, fetch, len, ["JPY"], loaded_days) == 2
+    assert fetched == [date(2025, 6, 21), date(2025, 6, 23)]
+    assert backfill.backfill_unit(unit, fetch, len, ["JPY"], lambda *args: set(unit.days())) == 0
@@ -0,0 +1,93 @@
+import asyncio
+import sys
+from pathlib import Path
+
+# Ensure we import the version under src/
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root / "src"))
+
+import change_feed as cf
+
+
+def rows(rates, base="USD", ts=1_750_000_000):
+    return [
+        {"base_code": base, "target_code": code, "rate": rate, "time_last_update_unix": ts}
+        for code, rate in rates.items()
+    ]
+
+
+def paths(tmp_path):
+    return tmp_path / "feed.jsonl", tmp_path / "last.json", tmp_path / "feed.sock"
+
+
+def test_diff_rates():
+    changed, removed = cf.diff_rates({"EUR": 0.9, "JPY": 150.0, "XYZ": 1.0}, {"EUR": 0.9, "JPY": 151.0, "CHF": 0.8})
+    assert changed == {"JPY": 151.0, "CHF": 0.8}
+    assert removed == ["XYZ"]
+
+
+def test_publish_changes_journals_compact_diffs(tmp_path):
+    journal, state, _ = paths(tmp_path)
+    first = cf.publish_changes(rows({"EUR": 0.9, "JPY": 150.0}), journal, state, None)
+    second = cf.publish_changes(rows({"EUR": 0.9, "JPY": 151.0}, ts=1_750_086_400), journal, state, None)
+    assert [e["seq"] for e in first + second] == [1, 2]
+    assert first[0]["changed"] == {"EUR": 0.9, "JPY": 150.0}
+    assert second[0]["changed"] == {"JPY": 151.0}
+    assert cf.read_journal(journal) == first + second
+
+
+def test_backlog_replays_or_snapshots(tmp_path):
+    journal, state, sock = paths(tmp_path)
+    for i in range(5):
+        cf.publish_changes(rows({"EUR": 0.9 + i}, ts=i), journal, state, None)
+    server = cf.ChangeFeedServer(sock, journal, retain=3)
+    assert server.seq == 5
+    assert [e["seq"] for e in server.backlog(2)] == [3, 4, 5]
+    assert server.backlog(5) == []
+    for since in (1, 9):
+        (snapshot,) = server.backlog(since)
+        assert snapshot["type"] == "snapshot"
+        assert snapshot["bases"]["USD"] == {"time_last_update_unix": 4, "rates": {"EUR": 4.9}}
+
+
+def test_subscribers_get_live_events_and_resume_after_reconnect(tmp_path):
+    journal, state, sock = paths(tmp_path)
+    cf.publish_changes(rows({"EUR": 0.9}), journal, state, None)
+
+    async def scenario():
+        server = cf.ChangeFeedServer(sock, journal)
+        await server.start()
+
+        async def take(since, n):
+            feed = cf.subscribe(sock, since, reconnect_delay=None)
+            messages = [await anext(feed) for _ in range(n)]
+            await feed.aclose()
+            return messages
+
+        # Many subscribers at once, each getting the backlog and then the live event
+        tasks = [asyncio.create_task(take(0, 2)) for _ in range(20)]
+        while len(server.subscribers) < 20:
+            await asyncio.sleep(0.01)
+        await asyncio.to_thread(cf.publish_changes, rows({"EUR": 0.91, "GBP": 0.8}), journal, state, sock)
+        results = await asyncio.gather(*tasks)
+        # A reconnecting subscriber only gets what it missed
+        resumed = await take(1, 1)
+        await server.close()
+        return results, resumed
+
+    results, resumed = asyncio.run(scenario())
+    for messages in results:
+        assert [m["seq"] for m in messages] == [1, 2]
+        assert messages[1]["changed"] == {"EUR": 0.91, "GBP": 0.8}
+    assert resumed[0]["seq"] == 2
+
+
+def test_events_journaled_while_server_was_down_are_picked_up(tmp_path):
+    journal, state, sock = paths(tmp_path)
+    server = cf.ChangeFeedServer(sock, journal)
+    cf.publish_changes(rows({"EUR": 0.9}), journal, state, None)
+    events = cf.publish_changes(rows({"EUR": 0.91}), journal, state, None)
+    # The server missed seq 1, so it re-reads the journal instead of applying seq 2 blindly
+    server.publish(events)
+    assert server.seq == 2
+    assert server.state["USD"]["rates"] == {"EUR": 0.91}
@@ -0,0 +1,162 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# Ensure we import the version under src/
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root / "src"))
+
+import compact_schema as cs
+from adaptive_batch import AdaptiveBatcher
+
+
+class FakeCursor:
+    """Understands just the statements compact_schema issues."""
+
+    def __init__(self, db):
+        self.db = db
+        self._result = []
+
+    def execute(self, sql, params=None):
+        self.db.executed.append(sql)
+        if sql.startswith("SELECT code, currency_id"):
+            self._result = list(self.db.currencies.items())
+        elif sql.startswith("SELECT id, base_code"):
+            last_id, limit = params
+            self._result = [r for r in self.db.source if r[0] > last_id][:limit]
+        elif sql.startswith("SELECT DISTINCT r.updated_at DIV 86400"):
+            code, start, end = params
+            base_id = self.db.currencies.get(code)
+            days = {ts // 86400 for (b, _, ts) in self.db.facts if b == base_id and start <= ts < end}
+            self._result = [(day,) for day in days]
+
+    def executemany(self, sql, rows):
+        self.db.executed.append(sql)
+        if sql.startswith("INSERT IGNORE INTO"):
+            for (code,) in rows:
+                self.db.currencies.setdefault(code, len(self.db.currencies) + 1)
+        else:
+            for base_id, target_id, ts, rate in rows:
+                self.db.facts[(base_id, target_id, ts)] = rate
+
+    def fetchall(self):
+        return self._result
+
+    def close(self):
+        pass
+
+
+class FakeDB:
+    def __init__(self, source=None):
+        self.currencies = {}
+        self.facts = {}
+        self.source = source or []
+        self.executed = []
+        self.commits = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def db(monkeypatch):
+    fake = FakeDB()
+    monkeypatch.setattr(cs, "connect_to_mysql", lambda cfg: fake)
+    cs._caches.clear()
+    yield fake
+    cs._caches.clear()
+
+
+ROWS = [
+    {"base_code": "USD", "target_code": "EUR", "rate": 0.85, "time_last_update_unix": 100},
+    {"base_code": "USD", "target_code": "GBP", "rate": 0.73, "time_last_update_unix": 100},
+]
+
+
+def test_load_rows_compact_registers_codes_and_upserts(db):
+    assert cs.load_rows_compact(ROWS, {"database": "d"}) == 2
+
+    assert set(db.currencies) == {"USD", "EUR", "GBP"}
+    usd, eur = db.currencies["USD"], db.currencies["EUR"]
+    assert db.facts[(usd, eur, 100)] == 0.85
+    assert any("ON DUPLICATE KEY UPDATE" in sql for sql in db.executed)
+
+
+def test_currency_cache_avoids_repeat_lookups(db):
+    cs.load_rows_compact(ROWS, {"database": "d"})
+    lookups = sum(sql.startswith("SELECT code") for sql in db.executed)
+
+    cs.load_rows_compact(ROWS, {"database": "d"})
+
+    assert sum(sql.startswith("SELECT code") for sql in db.executed) == lookups
+
+
+def test_loaded_days_are_utc_days_with_rows(db):
+    from datetime import date
+
+    june_22 = 1750550402  # Sun, 22 Jun 2025 00:00:02 UTC
+    rows = [{**row, "time_last_update_unix": june_22} for row in ROWS]
+    cs.load_rows_compact(rows + [{**ROWS[0], "base_code": "EUR", "time_last_update_unix": june_22 + 86400}], {})
+
+    assert cs.loaded_days({}, "USD", date(2025, 6, 21), date(2025, 6, 23)) == {date(2025, 6, 22)}
+    assert cs.loaded_days({}, "USD", date(2025, 6, 23), date(2025, 6, 24)) == set()
+
+
+def test_load_rows_compact_empty(db):
+    assert cs.load_rows_compact([], {}) == 0
+    assert db.executed == []
+
+
+def test_migrate_to_compact_in_batches(db):
+    db.source = [(i, "USD", code, 100 + i, 1.0 + i) for i, code in enumerate(["EUR", "GBP", "JPY", "CAD", "AUD"], 1)]
+
+    migrated = cs.migrate_to_compact({}, "rates", batch_size=2)
+
+    assert migrated == 5
+    assert len(db.facts) == 5
+    # schema creation + one commit per batch of two
+    assert db.commits == 1 + 3
+
+
+def test_migrate_to_compact_resumes_after_id(db):
+    db.source = [(i, "USD", "EUR", 100 + i, 1.0) for i in range(1, 6)]
+    assert cs.migrate_to_compact({}, "rates", start_after_id=3) == 2
+
+
+def test_migrate_to_compact_with_adaptive_batches(db):
+    db.source = [(i, "USD", "EUR", 100 + i, 1.0) for i in range(1, 21)]
+    batcher = AdaptiveBatcher("migrate", initial_size=2, min_size=1, max_size=10, increase=2)
+
+    assert cs.migrate_to_compact({}, "rates", batcher=batcher) == 20
+    assert len(db.facts) == 20
+    # Every batch was fast, so each one was bigger than the last
+    assert [d.size for d in batcher.decisions] == [2, 4, 6, 8]
+
+
+def test_adaptive_load_commits_and_times_every_batch(db, monkeypatch):
+    import time
+
+    def slow_commit():
+        time.sleep(0.02)
+        db.commits += 1
+
+    monkeypatch.setattr(db, "commit", slow_commit)
+    rows = [{**ROWS[0], "time_last_update_unix": ts} for ts in range(10)]
+    batcher = AdaptiveBatcher("load", initial_size=4, min_size=1, max_size=10, target_seconds=0.01)
+
+    assert cs.load_rows_compact(rows, {"database": "d"}, batcher=batcher) == 10
+    assert len(db.facts) == 10
+    # One commit per batch (plus the final one), each inside the batch's timing
+    assert db.commits == len(batcher.decisions) + 1
+    assert all(d.seconds >= 0.02 for d in batcher.decisions)
+    assert [d.size for d in batcher.decisions] == [4, 2, 1, 1, 1, 1]
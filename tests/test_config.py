@@ -14,6 +14,7 @@ from config import (
     load_database_config,
     load_environment,
     get_slack_token,
+    get_target_currencies,
 )
 
 
@@ -103,3 +104,27 @@ def test_get_slack_token_missing(monkeypatch):
     # Act & Assert: calling without the var raises the right error
     with pytest.raises(ValueError, match="BOT_TOKEN environment variable is not set"):
         get_slack_token()
+
+
+def test_get_target_currencies_from_list(monkeypatch):
+    monkeypatch.delenv("ETL_CURRENCY_SET", raising=False)
+    assert get_target_currencies({}) is None
+    cfg = {"etl": {"target_currencies": ["eur", "GBP", "EUR"]}}
+    assert get_target_currencies(cfg) == ("EUR", "GBP")
+
+
+def test_get_target_currencies_from_named_set(monkeypatch):
+    cfg = {
+        "etl": {
+            "target_currencies": ["EUR"],
+            "currency_sets": {"majors": ["JPY", "CHF"], "nordics": ["SEK", "NOK"]},
+            "currency_set": "majors",
+        }
+    }
+    monkeypatch.delenv("ETL_CURRENCY_SET", raising=False)
+    assert get_target_currencies(cfg) == ("JPY", "CHF")
+    monkeypatch.setenv("ETL_CURRENCY_SET", "nordics")
+    assert get_target_currencies(cfg) == ("SEK", "NOK")
+    monkeypatch.setenv("ETL_CURRENCY_SET", "asia")
+    with pytest.raises(ValueError, match="Unknown currency set 'asia'"):
+        get_target_currencies(cfg)
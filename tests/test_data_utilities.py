@@ -1,12 +1,16 @@
 import csv
+import gzip
 import sys
+from datetime import datetime, timedelta
 from pathlib import Path
 
+import pytest
+
 # Add src directory to Python path - go up one level from tests/ to project root
 project_root = Path(__file__).parent.parent
 sys.path.append(str(project_root / "src"))
 
-from data_utilities import save_to_csv
+from data_utilities import CsvManifest, open_csv_for_read, save_columns_to_csv, save_to_csv
 
 
 def test_save_to_csv(tmp_path):
@@ -23,3 +27,80 @@ def test_save_to_csv(tmp_path):
         reader = csv.DictReader(f)
         data = list(reader)
     assert data == [{"a": "1", "b": "x"}, {"a": "2", "b": "y"}]
+
+
+def make_rate_rows():
+    last, following = datetime(2025, 6, 22, 0, 0, 1), datetime(2025, 6, 23, 0, 0, 1)
+    return [
+        {
+            "base_code": "USD",
+            "target_code": code,
+            "rate": rate,
+            "time_last_update_utc": last,
+            "time_next_update_utc": following,
+            "time_next_update_unix": 1750636801,
+            "time_last_update_unix": 1750550401,
+        }
+        for code, rate in [("EUR", 0.8712), ("JPY", 146.1234), ("X,Y", 1e-07), ('Q"Z', None)]
+    ]
+
+
+def dictwriter_bytes(rows, tmp_path):
+    path = tmp_path / "reference.csv"
+    with path.open("w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=rows[0].keys())
+        writer.writeheader()
+        writer.writerows(rows)
+    return path.read_bytes()
+
+
+def test_save_to_csv_is_byte_identical_to_dictwriter(tmp_path):
+    rows = make_rate_rows()
+    # A row with keys in another order and one with a missing key
+    rows.append(dict(reversed(list(rows[0].items()))))
+    rows.append({k: v for k, v in rows[0].items() if k != "rate"})
+    fp = save_to_csv(rows, tmp_path / "out", "rates.csv")
+    assert fp.read_bytes() == dictwriter_bytes(rows, tmp_path)
+
+
+def test_save_to_csv_with_many_distinct_timestamps(tmp_path):
+    # More distinct timestamps than the formatting cache holds, out of order
+    template = make_rate_rows()[0]
+    start = datetime(2025, 6, 22)
+    rows = [{**template, "time_last_update_utc": start + timedelta(minutes=(i * 37) % 500)} for i in range(500)]
+    fp = save_to_csv(rows, tmp_path / "out", "rates.csv", manifest=True)
+    assert fp.read_bytes() == dictwriter_bytes(rows, tmp_path)
+    manifest = CsvManifest.load(fp)
+    assert manifest.rows == 500
+    assert manifest.min["time_last_update_utc"] == "2025-06-22 00:00:00"
+    assert manifest.max["time_last_update_utc"] == "2025-06-22 08:19:00"
+    assert manifest.min["time_next_update_utc"] == manifest.max["time_next_update_utc"] == "2025-06-23 00:00:01"
+
+
+def test_save_to_csv_compressed(tmp_path):
+    rows = make_rate_rows()
+    fp = save_to_csv(rows, tmp_path, "rates.csv", compress=True)
+    assert fp.name == "rates.csv.gz"
+    assert gzip.decompress(fp.read_bytes()) == dictwriter_bytes(rows, tmp_path)
+    with open_csv_for_read(fp) as f:
+        assert next(csv.reader(f))[0] == "base_code"
+
+
+def test_save_to_csv_empty_batch_writes_header_only(tmp_path):
+    fp = save_to_csv([], tmp_path, "rates.csv", manifest=True, fieldnames=["base_code", "rate"])
+    assert fp.read_bytes() == b"base_code,rate\r\n"
+    assert CsvManifest.load(fp).rows == 0
+
+
+def test_save_to_csv_rejects_unknown_keys(tmp_path):
+    rows = make_rate_rows()
+    rows.append({**rows[0], "extra": 1})
+    with pytest.raises(ValueError, match="extra"):
+        save_to_csv(rows, tmp_path, "rates.csv")
+
+
+def test_save_columns_to_csv(tmp_path):
+    rows = make_rate_rows()
+    columns = {key: [row[key] for row in rows] for key in rows[0]}
+    fp = save_columns_to_csv(columns, tmp_path, "rates.csv")
+    assert fp.read_bytes() == dictwriter_bytes(rows, tmp_path)
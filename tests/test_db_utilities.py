@@ -79,3 +79,20 @@ def test_connect_to_mysql_missing_key():
     }
     with pytest.raises(KeyError):
         connect_to_mysql(incomplete_cfg)
+
+
+def test_split_sql_statements():
+    from db_utilities import split_sql_statements
+
+    script = "-- header\nCREATE TABLE a (x INT);\n\n-- second\nCREATE TABLE b (y INT);\n"
+    assert split_sql_statements(script) == ["CREATE TABLE a (x INT)", "CREATE TABLE b (y INT)"]
+
+
+def test_compact_schema_template_splits_into_two_tables():
+    from db_utilities import split_sql_statements
+
+    sql = load_sql_template("create_compact_schema.sql").format(table="rates_compact", currency_table="currencies")
+    statements = split_sql_statements(sql)
+    assert len(statements) == 2
+    assert "SMALLINT" in statements[0]
+    assert "PRIMARY KEY (base_id, target_id, updated_at)" in statements[1]
@@ -0,0 +1,118 @@
+import csv
+import gzip
+import sys
+from datetime import date, datetime
+from decimal import Decimal
+from pathlib import Path
+
+import pytest
+
+# Ensure we import the version under src/
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root / "src"))
+
+import export
+
+
+def make_rows(n):
+    ts = datetime(2025, 1, 1)
+    return [
+        ("USD", f"C{i % 100:02d}", Decimal("1.50000000") + i, ts, ts, 1_735_689_600, 1_735_776_000) for i in range(n)
+    ]
+
+
+class StreamingCursor:
+    def __init__(self, db):
+        self.db = db
+        self.column_names = list(export.DEFAULT_COLUMNS)
+
+    def execute(self, sql, params):
+        self.db.executed.append((sql, params))
+        self.pos = 0
+
+    def fetchmany(self, size):
+        self.db.fetch_sizes.append(size)
+        chunk = self.db.rows[self.pos : self.pos + size]
+        self.pos += size
+        return chunk
+
+    def fetchall(self):
+        raise AssertionError("export must not buffer the whole result")
+
+    def close(self):
+        self.db.cursor_closed = True
+
+
+class FakeConnection:
+    def __init__(self, rows):
+        self.rows = rows
+        self.executed, self.fetch_sizes = [], []
+        self.cursor_closed = self.closed = False
+
+    def cursor(self, buffered=True):
+        assert buffered is False
+        return StreamingCursor(self)
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def db(monkeypatch):
+    conn = FakeConnection(make_rows(2500))
+    monkeypatch.setattr(export, "connect_to_mysql", lambda cfg: conn)
+    return conn
+
+
+def test_build_export_query():
+    sql, params = export.build_export_query(
+        "rates", date(2024, 1, 1), date(2024, 12, 31), ["usd"], ["EUR", "JPY"], ["base_code", "rate"]
+    )
+    assert sql == (
+        "SELECT base_code, rate FROM rates WHERE time_last_update_utc >= %s AND time_last_update_utc < %s "
+        "AND base_code IN (%s) AND target_code IN (%s, %s) ORDER BY time_last_update_utc"
+    )
+    assert params == [datetime(2024, 1, 1), datetime(2025, 1, 1), "USD", "EUR", "JPY"]
+    with pytest.raises(ValueError, match="Unknown export columns"):
+        export.build_export_query("rates", columns=["password"])
+
+
+@pytest.mark.parametrize("name", ["out.csv", "out.csv.gz"])
+def test_csv_export_streams_in_chunks(tmp_path, db, name):
+    report = export.export_rates({"table": "rates"}, tmp_path / name, chunk_size=1000)
+    assert (report.rows, report.chunks, report.format) == (2500, 3, name[4:])
+    assert db.fetch_sizes == [1000] * 4
+    assert db.cursor_closed and db.closed
+    opener = gzip.open if name.endswith(".gz") else open
+    with opener(tmp_path / name, "rt", newline="") as f:
+        written = list(csv.reader(f))
+    assert written[0] == list(export.DEFAULT_COLUMNS)
+    assert written[1][:3] == ["USD", "C00", "1.50000000"]
+    assert len(written) == 2501
+    assert report.bytes == (tmp_path / name).stat().st_size
+    assert list(tmp_path.glob(".*.tmp")) == []
+
+
+def test_parquet_export(tmp_path, db):
+    pq = pytest.importorskip("pyarrow.parquet")
+    report = export.export_rates({"table": "rates"}, tmp_path / "out.parquet", chunk_size=1000)
+    parquet = pq.ParquetFile(tmp_path / "out.parquet")
+    assert parquet.metadata.num_rows == report.rows == 2500
+    assert parquet.metadata.num_row_groups == 3
+    assert parquet.read(columns=["rate"]).column(0)[1].as_py() == Decimal("2.50000000")
+
+
+def test_failed_export_leaves_no_file(tmp_path, db, monkeypatch):
+    def broken(*args, **kwargs):
+        raise RuntimeError("disk full")
+
+    monkeypatch.setattr(export, "write_chunks", broken)
+    with pytest.raises(RuntimeError):
+        export.export_rates({"table": "rates"}, tmp_path / "out.csv")
+    assert list(tmp_path.iterdir()) == []
+    assert db.closed
+
+
+def test_unknown_format_is_rejected(tmp_path):
+    with pytest.raises(ValueError, match="infer"):
+        export.export_rates({"table": "rates"}, tmp_path / "out.json")
@@ -1,3 +1,4 @@
+import json
 from unittest.mock import MagicMock
 
 import pytest
@@ -13,22 +14,33 @@ sys.path.insert(0, str(project_root))
 from extract import get_exchange_rates
 
 
+def make_payload(rates=None):
+    """Return a minimal payload in the provider's `latest/<BASE>` shape."""
+    return {
+        "result": "success",
+        "documentation": "https://www.exchangerate-api.com/docs",
+        "terms_of_use": "https://www.exchangerate-api.com/terms",
+        "time_last_update_unix": 1750550402,
+        "time_last_update_utc": "Sun, 22 Jun 2025 00:00:02 +0000",
+        "time_next_update_unix": 1750636802,
+        "time_next_update_utc": "Mon, 23 Jun 2025 00:00:02 +0000",
+        "base_code": "USD",
+        "conversion_rates": rates or {"USD": 1, "EUR": 0.85, "GBP": 0.73},
+    }
+
+
 class TestGetExchangeRates:
     """Test suite for the get_exchange_rates function."""
 
     def test_successful_request(self, monkeypatch):
         """Test successful API request returns expected data."""
         # Arrange
-        expected_data = {
-            "rates": {"USD": 1.0, "EUR": 0.85, "GBP": 0.73},
-            "base": "USD",
-            "date": "2025-06-23",
-        }
+        expected_data = make_payload()
 
         mock_response = MagicMock()
         mock_response.status_code = 200
         mock_response.raise_for_status.return_value = None
-        mock_response.json.return_value = expected_data
+        mock_response.content = json.dumps(expected_data).encode()
 
         monkeypatch.setattr(
             "extract.requests.get",
@@ -42,11 +54,13 @@ class TestGetExchangeRates:
 
         # Assert
         assert result == expected_data
+        assert result.base_code == "USD"
+        assert result["conversion_rates"]["EUR"] == 0.85
 
     def test_custom_timeout(self, monkeypatch):
         """Test that custom timeout parameter is passed correctly."""
         # Arrange
-        expected_data = {"test": "data"}
+        expected_data = make_payload()
         timeout_used = None
 
         def mock_get(*args, **kwargs):
@@ -55,7 +69,7 @@ class TestGetExchangeRates:
             return MagicMock(
                 status_code=200,
                 raise_for_status=lambda: None,
-                json=lambda: expected_data,
+                content=json.dumps(expected_data).encode(),
             )
 
         monkeypatch.setattr("extract.requests.get", mock_get)
@@ -72,7 +86,7 @@ class TestGetExchangeRates:
     def test_default_timeout(self, monkeypatch):
         """Test that default timeout is used when not specified."""
         # Arrange
-        expected_data = {"test": "data"}
+        expected_data = make_payload()
         timeout_used = None
 
         def mock_get(*args, **kwargs):
@@ -81,7 +95,7 @@ class TestGetExchangeRates:
             return MagicMock(
                 status_code=200,
                 raise_for_status=lambda: None,
-                json=lambda: expected_data,
+                content=json.dumps(expected_data).encode(),
             )
 
         monkeypatch.setattr("extract.requests.get", mock_get)
@@ -185,14 +199,12 @@ class TestGetExchangeRates:
         mock_response.json.assert_not_called()
 
     def test_empty_response_data(self, monkeypatch):
-        """Test handling of empty but valid JSON response."""
+        """Test that a valid but empty JSON object is rejected as a payload."""
         # Arrange
-        empty_data = {}
-
         mock_response = MagicMock()
         mock_response.status_code = 200
         mock_response.raise_for_status.return_value = None
-        mock_response.json.return_value = empty_data
+        mock_response.content = b"{}"
 
         monkeypatch.setattr(
             "extract.requests.get",
@@ -201,11 +213,9 @@ class TestGetExchangeRates:
 
         url = "https://api.example.com/rates"
 
-        # Act
-        result = get_exchange_rates(url)
-
-        # Assert
-        assert result == empty_data
+        # Act & Assert
+        with pytest.raises(ValueError, match="missing required field"):
+            get_exchange_rates(url)
 
     def test_json_decode_error(self, monkeypatch):
         """Test handling of invalid JSON in response."""
@@ -213,7 +223,7 @@ class TestGetExchangeRates:
         mock_response = MagicMock()
         mock_response.status_code = 200
         mock_response.raise_for_status.return_value = None
-        mock_response.json.side_effect = ValueError("Invalid JSON")
+        mock_response.content = b"Invalid JSON"
 
         monkeypatch.setattr(
             "extract.requests.get",
@@ -229,12 +239,12 @@ class TestGetExchangeRates:
     def test_logging_success(self, monkeypatch, caplog):
         """Test that successful requests are logged correctly."""
         # Arrange
-        expected_data = {"test": "data"}
+        expected_data = make_payload()
 
         mock_response = MagicMock()
         mock_response.status_code = 200
         mock_response.raise_for_status.return_value = None
-        mock_response.json.return_value = expected_data
+        mock_response.content = json.dumps(expected_data).encode()
 
         monkeypatch.setattr(
             "extract.requests.get",
@@ -303,7 +313,7 @@ class TestGetExchangeRates:
     def test_url_parameter_passed_correctly(self, monkeypatch):
         """Test that the URL parameter is passed correctly to requests.get."""
         # Arrange
-        expected_data = {"test": "data"}
+        expected_data = make_payload()
         url_used = None
 
         def mock_get(url, **kwargs):
@@ -312,7 +322,7 @@ class TestGetExchangeRates:
             return MagicMock(
                 status_code=200,
                 raise_for_status=lambda: None,
-                json=lambda: expected_data,
+                content=json.dumps(expected_data).encode(),
             )
 
         monkeypatch.setattr("extract.requests.get", mock_get)
@@ -328,27 +338,21 @@ class TestGetExchangeRates:
     def test_complex_response_data(self, monkeypatch):
         """Test handling of complex nested response data."""
         # Arrange
-        complex_data = {
-            "success": True,
-            "timestamp": 1687526400,
-            "base": "USD",
-            "date": "2025-06-23",
-            "rates": {
+        complex_data = make_payload(
+            {
                 "EUR": 0.8454,
                 "GBP": 0.7312,
                 "JPY": 149.56,
                 "CAD": 1.3421,
                 "AUD": 1.4852,
                 "CHF": 0.9023,
-            },
-            "historical": False,
-            "source": "https://exchangerate-api.com",
-        }
+            }
+        )
 
         mock_response = MagicMock()
         mock_response.status_code = 200
         mock_response.raise_for_status.return_value = None
-        mock_response.json.return_value = complex_data
+        mock_response.content = json.dumps(complex_data).encode()
 
         monkeypatch.setattr(
             "extract.requests.get",
@@ -362,8 +366,8 @@ class TestGetExchangeRates:
 
         # Assert
         assert result == complex_data
-        assert result["rates"]["EUR"] == 0.8454
-        assert len(result["rates"]) == 6
+        assert result["conversion_rates"]["EUR"] == 0.8454
+        assert len(result["conversion_rates"]) == 6
 
 
 # Integration-style tests (commented out by default)
@@ -0,0 +1,108 @@
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+# Ensure we import the version under src/
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root / "src"))
+
+import json_backend as jb
+from transform import transform_rates
+
+SAMPLE_PATH = project_root / "data" / "raw" / "sample_rates.json"
+
+
+def test_decode_sample_payload():
+    payload = jb.decode_payload(SAMPLE_PATH.read_bytes())
+    expected = json.loads(SAMPLE_PATH.read_text(encoding="utf-8"))
+    assert isinstance(payload, jb.RatesPayload)
+    assert payload == expected
+    assert payload.base_code == payload["base_code"] == "USD"
+    assert payload.get("missing") is None
+    assert set(payload) == set(expected)
+
+
+def test_payload_works_with_transform():
+    payload = jb.decode_payload(SAMPLE_PATH.read_bytes())
+    rows = transform_rates(payload)
+    assert len(rows) == len(payload.conversion_rates)
+
+
+def test_decode_projects_to_target_currencies():
+    payload = jb.decode_payload(SAMPLE_PATH.read_bytes(), ["JPY", "EUR", "XXX"])
+    assert list(payload.conversion_rates) == ["JPY", "EUR"]
+    assert payload.base_code == "USD"
+
+
+def test_dumps_round_trips_in_api_field_order():
+    payload = jb.decode_payload(SAMPLE_PATH.read_bytes())
+    data = jb.loads(jb.dumps(payload))
+    assert data == payload
+    assert list(data) == list(json.loads(SAMPLE_PATH.read_text(encoding="utf-8")))
+    assert jb.loads(jb.dumps({"a": [1, 2]}, indent=True)) == {"a": [1, 2]}
+
+
+@pytest.mark.parametrize(
+    "blob",
+    [b"not json", b"[1, 2]", b"{}", json.dumps({**json.loads(SAMPLE_PATH.read_text()), "base_code": 5}).encode()],
+)
+def test_invalid_payloads_raise_payload_error(blob):
+    with pytest.raises(jb.PayloadError):
+        jb.decode_payload(blob)
+
+
+def test_from_mapping_rejects_non_numeric_rates():
+    data = json.loads(SAMPLE_PATH.read_text(encoding="utf-8"))
+    data["conversion_rates"]["EUR"] = "0.9"
+    with pytest.raises(jb.PayloadError, match="numbers"):
+        jb.RatesPayload.from_mapping(data)
+
+
+@pytest.mark.parametrize("backend", jb.BACKENDS)
+def test_each_backend_decodes_the_sample(backend):
+    if backend != "stdlib" and importlib.util.find_spec(backend) is None:
+        pytest.skip(f"{backend} is not installed")
+    code = (
+        "import json_backend as jb, pathlib; "
+        f"p = jb.decode_payload(pathlib.Path({str(SAMPLE_PATH)!r}).read_bytes()); "
+        "print(jb.BACKEND, p.base_code, len(p.conversion_rates))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=project_root / "src",
+        env={**os.environ, "EXCHANGE_RATES_JSON_BACKEND": backend},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    n_rates = len(json.loads(SAMPLE_PATH.read_text(encoding="utf-8"))["conversion_rates"])
+    assert result.stdout.split() == [backend, "USD", str(n_rates)]
+
+
+def test_backends_write_identical_csvs(tmp_path):
+    # The sample's USD rate is the integer 1; it must not become 1.0 on any backend
+    code = (
+        "import json_backend as jb, pathlib, sys; "
+        "from transform import transform_rates; "
+        "from data_utilities import save_to_csv; "
+        f"p = jb.decode_payload(pathlib.Path({str(SAMPLE_PATH)!r}).read_bytes()); "
+        "save_to_csv(transform_rates(p), pathlib.Path(sys.argv[1]), 'rates.csv')"
+    )
+    outputs = {}
+    for backend in jb.BACKENDS:
+        if backend != "stdlib" and importlib.util.find_spec(backend) is None:
+            continue
+        subprocess.run(
+            [sys.executable, "-c", code, str(tmp_path / backend)],
+            cwd=project_root / "src",
+            env={**os.environ, "EXCHANGE_RATES_JSON_BACKEND": backend},
+            check=True,
+        )
+        outputs[backend] = (tmp_path / backend / "rates.csv").read_bytes()
+    assert b"\nUSD,USD,1," in outputs["stdlib"]
+    assert all(out == outputs["stdlib"] for out in outputs.values()), list(outputs)
@@ -0,0 +1,160 @@
+import csv
+import re
+import sys
+from datetime import date, datetime, timezone
+from pathlib import Path
+
+import pytest
+
+# Add src directory to Python path - go up one level from tests/ to project root
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root / "src"))
+
+import load
+from data_utilities import CsvManifest, save_to_csv
+
+ROWS = [{"base_code": "USD", "target_code": code, "rate": rate} for code, rate in [("EUR", 0.9), ("JPY", 150.0)]]
+
+
+class LoadDataConnection:
+    """Records the file LOAD DATA points at and what it contained at that moment."""
+
+    def __init__(self, table_rows=None, inserted=None):
+        self.loaded = None
+        self.inserted = inserted
+        # What COUNT(*) over the manifest's time range returns; None means "everything loaded"
+        self.table_rows = table_rows
+        self.queries = []
+        self.committed = self.rolled_back = False
+
+    def cursor(self):
+        return self
+
+    def execute(self, sql, params=None):
+        match = re.search(r"INFILE '([^']+)'", sql)
+        if not match:
+            self.queries.append((sql, params))
+            return
+        path = Path(match[1])
+        self.load_sql = sql
+        self.loaded = (path, path.read_bytes())
+        self.rowcount = path.read_bytes().count(b"\n") - 1 if self.inserted is None else self.inserted
+
+    def fetchone(self):
+        return (self.rowcount if self.table_rows is None else self.table_rows,)
+
+    def commit(self):
+        self.committed = True
+
+    def rollback(self):
+        self.rolled_back = True
+
+    def close(self):
+        pass
+
+
+def test_load_gzipped_csv_decompresses_first(tmp_path, monkeypatch):
+    conn = LoadDataConnection()
+    monkeypatch.setattr(load, "connect_to_mysql", lambda cfg: conn)
+    plain = save_to_csv(ROWS, tmp_path / "plain", "rates.csv")
+    gz = save_to_csv(ROWS, tmp_path, "rates.csv", compress=True)
+
+    assert load.load_csv_to_mysql(gz, "rates", {}) == 2
+    loaded_path, loaded_bytes = conn.loaded
+    assert loaded_path != gz
+    assert loaded_bytes == plain.read_bytes()
+    # The decompressed copy is cleaned up
+    assert not loaded_path.exists()
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["plain", "rates.csv.gz"]
+
+
+def test_loaded_days_queries_the_utc_day_range(monkeypatch):
+    conn = LoadDataConnection()
+    conn.fetchall = lambda: [(date(2025, 6, 22),)]
+    monkeypatch.setattr(load, "connect_to_mysql", lambda cfg: conn)
+
+    assert load.loaded_days("rates", {}, "USD", date(2025, 6, 21), date(2025, 6, 23)) == {date(2025, 6, 22)}
+    [(sql, params)] = conn.queries
+    assert "DATE(time_last_update_utc)" in sql
+    assert params == ("USD", datetime(2025, 6, 21), datetime(2025, 6, 24))
+
+
+def test_load_skips_or_replaces_existing_rows(tmp_path, monkeypatch):
+    conn = LoadDataConnection()
+    monkeypatch.setattr(load, "connect_to_mysql", lambda cfg: conn)
+    path = save_to_csv(ROWS, tmp_path, "rates.csv")
+
+    load.load_csv_to_mysql(path, "rates", {})
+    assert "IGNORE INTO TABLE rates" in conn.load_sql
+    load.load_csv_to_mysql(path, "rates", {}, replace=True)
+    assert "REPLACE INTO TABLE rates" in conn.load_sql
+
+
+TIMED_ROWS = [
+    {
+        "base_code": "USD",
+        "target_code": code,
+        "rate": rate,
+        "time_last_update_utc": datetime(2025, 6, day, tzinfo=timezone.utc),
+    }
+    for day, (code, rate) in enumerate([("EUR", 0.9), ("JPY", 150.0), ("GBP", 0.8)], start=20)
+]
+
+
+def test_manifest_describes_written_csv(tmp_path):
+    path = save_to_csv(TIMED_ROWS, tmp_path, "rates.csv", compress=True, manifest=True)
+    manifest = CsvManifest.load(path)
+
+    assert manifest.rows == 3
+    assert manifest.header == list(TIMED_ROWS[0])
+    assert manifest.min == {"time_last_update_utc": "2025-06-20 00:00:00+00:00"}
+    assert manifest.max == {"time_last_update_utc": "2025-06-22 00:00:00+00:00"}
+    assert manifest.matches(path)
+    assert manifest.verify_content(path)
+
+
+def test_load_trusts_manifest_without_rescanning(tmp_path, monkeypatch):
+    conn = LoadDataConnection()
+    monkeypatch.setattr(load, "connect_to_mysql", lambda cfg: conn)
+    path = save_to_csv(TIMED_ROWS, tmp_path, "rates.csv", manifest=True)
+
+    def no_scan(*args, **kwargs):
+        raise AssertionError("CSV was rescanned")
+
+    monkeypatch.setattr(csv, "reader", no_scan)
+    assert load.load_csv_to_mysql(path, "rates", {}) == 3
+    # Reconciled against the manifest's time range before commit
+    ((sql, params),) = conn.queries
+    assert "COUNT(*)" in sql
+    assert params == (TIMED_ROWS[0]["time_last_update_utc"], TIMED_ROWS[-1]["time_last_update_utc"])
+    assert conn.committed
+
+
+def test_load_rejects_csv_that_no_longer_matches_manifest(tmp_path, monkeypatch):
+    monkeypatch.setattr(load, "connect_to_mysql", lambda cfg: pytest.fail("should not connect"))
+    path = save_to_csv(TIMED_ROWS, tmp_path, "rates.csv", manifest=True)
+    with path.open("rb+") as f:
+        f.truncate(path.stat().st_size - 10)
+
+    with pytest.raises(ValueError, match="does not match its manifest"):
+        load.load_csv_to_mysql(path, "rates", {})
+
+
+def test_load_rolls_back_partial_load(tmp_path, monkeypatch):
+    conn = LoadDataConnection(table_rows=2)
+    monkeypatch.setattr(load, "connect_to_mysql", lambda cfg: conn)
+    path = save_to_csv(TIMED_ROWS, tmp_path, "rates.csv", manifest=True)
+
+    with pytest.raises(load.LoadReconciliationError, match="has 3 rows"):
+        load.load_csv_to_mysql(path, "rates", {})
+    assert conn.rolled_back and not conn.committed
+
+
+def test_rerun_with_rows_already_present_is_not_partial(tmp_path, monkeypatch):
+    # LOAD DATA skipped every row as a duplicate, but they are all in the table
+    conn = LoadDataConnection(table_rows=3, inserted=0)
+    monkeypatch.setattr(load, "connect_to_mysql", lambda cfg: conn)
+    path = save_to_csv(TIMED_ROWS, tmp_path, "rates.csv", manifest=True)
+
+    assert load.load_csv_to_mysql(path, "rates", {}) == 0
+    assert conn.committed
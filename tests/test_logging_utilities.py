@@ -74,3 +74,51 @@ def test_setup_logging_creates_file(tmp_path):
     assert len(files) == 1
     log_file = files[0]
     assert log_file.name.startswith("mylog_") and log_file.suffix == ".log"
+
+
+@pytest.fixture
+def stop_listener():
+    yield
+    lu.shutdown_logging()
+    root = logging.getLogger()
+    for h in list(root.handlers):
+        root.removeHandler(h)
+
+
+def test_setup_logging_with_queue_writes_file(tmp_path, stop_listener):
+    lu.setup_logging("queued", level="DEBUG", fmt="%(levelname)s|%(message)s", use_queue=True)
+
+    root = logging.getLogger()
+    assert root.level == logging.DEBUG
+    assert [type(h) for h in root.handlers] == [logging.handlers.QueueHandler]
+
+    logging.getLogger("test").debug("hello from the queue")
+    lu.flush_logging()
+
+    log_file = next((tmp_path / "logs").iterdir())
+    assert "DEBUG|hello from the queue" in log_file.read_text()
+
+    # logging keeps working after a flush
+    logging.getLogger("test").info("after flush")
+    lu.shutdown_logging()
+    assert "INFO|after flush" in log_file.read_text()
+
+
+def test_setup_logging_json_format(tmp_path, stop_listener):
+    import json
+
+    lu.setup_logging("jsonlog", use_queue=True, json_format=True)
+    logging.getLogger("etl").warning("careful")
+    lu.shutdown_logging()
+
+    log_file = next((tmp_path / "logs").iterdir())
+    entry = json.loads(log_file.read_text().splitlines()[-1])
+    assert entry["level"] == "WARNING"
+    assert entry["logger"] == "etl"
+    assert entry["message"] == "careful"
+
+
+def test_get_log_file_path_matches_setup_logging(tmp_path):
+    lu.setup_logging("same")
+    files = list((tmp_path / "logs").iterdir())
+    assert lu.get_log_file_path("same") == files[0]
@@ -0,0 +1,117 @@
+import subprocess
+import sys
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+
+
+def test_import_main_does_not_load_heavy_dependencies():
+    """slack_sdk, mysql.connector and requests must only load on the code path that needs them."""
+    code = (
+        "import sys, main; print(','.join(m for m in ('slack_sdk', 'mysql.connector', 'requests') if m in sys.modules))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=project_root,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert result.stdout.strip() == ""
+
+
+def test_main_skips_transform_and_load_when_watermark_is_current(tmp_path, monkeypatch):
+    sys.path.insert(0, str(project_root))
+    import main
+    import watermark
+
+    state = tmp_path / "watermarks.json"
+    watermark.write_local_watermark("USD", 1750550402, state)  # sample_rates.json timestamp
+
+    cfg = {"watermark": {"state_file": str(state)}, "metrics": {"enabled": False}}
+    monkeypatch.setattr(main, "load_environment", lambda: None)
+    monkeypatch.setattr(main, "load_configuration", lambda: cfg)
+    monkeypatch.setattr(main, "load_database_config", lambda: {"table": "rates"})
+
+    def fail_transform(raw):
+        raise AssertionError("transform should be skipped")
+
+    monkeypatch.setattr(main, "transform_rates", fail_transform)
+
+    assert main.main(use_sample=True) == "skipped"
+
+
+def test_live_run_archives_raw_payload_even_when_skipped(tmp_path, monkeypatch):
+    sys.path.insert(0, str(project_root))
+    import extract
+    import main
+    import raw_archive
+    import watermark
+
+    body = (project_root / "data" / "raw" / "sample_rates.json").read_bytes()
+    state = tmp_path / "watermarks.json"
+    watermark.write_local_watermark("USD", 1750550402, state)
+
+    cfg = {
+        "watermark": {"state_file": str(state)},
+        "archive": {"directory": str(tmp_path / "archive"), "codec": "gzip"},
+        "metrics": {"enabled": False},
+    }
+    monkeypatch.setattr(main, "load_environment", lambda: None)
+    monkeypatch.setattr(main, "load_configuration", lambda: cfg)
+    monkeypatch.setattr(main, "load_database_config", lambda: {"table": "rates"})
+    monkeypatch.setattr(main, "construct_api_url", lambda cfg: "http://api.invalid/latest/USD")
+    monkeypatch.setattr(extract, "fetch_exchange_rates", lambda url: body)
+
+    assert main.main(use_sample=False) == "skipped"
+    assert main.main(use_sample=False) == "skipped"
+    entries = raw_archive.read_index(tmp_path / "archive")
+    assert len(entries) == 1
+    assert raw_archive.read_body(entries[0], tmp_path / "archive") == body
+
+
+def test_sample_run_writes_every_sink_and_statistics(tmp_path, monkeypatch):
+    sys.path.insert(0, str(project_root))
+    import main
+    import metrics
+
+    cfg = {
+        "watermark": {"enabled": False},
+        "sinks": {"outputs": [{"name": "csv", "type": "csv", "directory": str(tmp_path / "processed")}]},
+        "validation": {"quarantine_dir": str(tmp_path / "quarantine")},
+        "statistics": {"state_file": str(tmp_path / "rolling.json"), "output_dir": str(tmp_path / "stats")},
+        "metrics": {"enabled": False},
+    }
+    monkeypatch.setattr(main, "load_environment", lambda: None)
+    monkeypatch.setattr(main, "load_configuration", lambda: cfg)
+    monkeypatch.setattr(main, "load_database_config", lambda: {"table": "rates"})
+    metrics.registry.clear()
+
+    assert main.main(use_sample=True) == "loaded"
+    assert len(list((tmp_path / "processed").glob("rates_*.csv"))) == 1
+    assert len(list((tmp_path / "stats").glob("stats_*.csv"))) == 1
+    assert (tmp_path / "rolling.json").exists()
+    assert not (tmp_path / "quarantine").exists()
+    assert metrics.registry.get("last_run_success") == 1
+
+
+def test_successful_runs_export_success_gauges(tmp_path, monkeypatch):
+    sys.path.insert(0, str(project_root))
+    import main
+    import metrics
+    import watermark
+
+    state = tmp_path / "watermarks.json"
+    watermark.write_local_watermark("USD", 1750550402, state)
+    textfile = tmp_path / "etl.prom"
+    cfg = {"watermark": {"state_file": str(state)}, "metrics": {"textfile_path": str(textfile)}}
+    monkeypatch.setattr(main, "load_environment", lambda: None)
+    monkeypatch.setattr(main, "load_configuration", lambda: cfg)
+    monkeypatch.setattr(main, "load_database_config", lambda: {"table": "rates"})
+    metrics.registry.clear()
+
+    assert main.main(use_sample=True) == "skipped"
+    exported = textfile.read_text()
+    assert "\nexchange_rates_etl_last_run_success 1\n" in exported
+    assert "\nexchange_rates_etl_last_success_timestamp_seconds " in exported
+    metrics.registry.clear()
@@ -0,0 +1,69 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+# Ensure we import the version under src/
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root / "src"))
+
+import metrics
+
+
+@pytest.fixture(autouse=True)
+def clean_registry():
+    metrics.registry.clear()
+    yield
+    metrics.registry.clear()
+
+
+def test_render_counters_and_gauges():
+    metrics.inc("api_requests_total", help_text="Attempts", outcome="error")
+    metrics.inc("api_requests_total", help_text="Attempts", outcome="error")
+    metrics.set_gauge("rows_loaded", 162, "Rows loaded")
+
+    text = metrics.registry.render_prometheus()
+
+    assert "# TYPE exchange_rates_etl_api_requests_total counter" in text
+    assert 'exchange_rates_etl_api_requests_total{outcome="error"} 2' in text
+    assert "# HELP exchange_rates_etl_rows_loaded Rows loaded" in text
+    assert "exchange_rates_etl_rows_loaded 162" in text
+    assert text.endswith("\n")
+
+
+def test_type_conflict_raises():
+    metrics.inc("x")
+    with pytest.raises(ValueError, match="already registered"):
+        metrics.set_gauge("x", 1)
+
+
+def test_record_freshness():
+    age = metrics.record_freshness(1000, now=1600.0)
+    assert age == 600.0
+    assert metrics.registry.get("data_age_seconds") == 600.0
+
+
+def test_record_api_retries():
+    metrics.inc("api_requests_total", outcome="error")
+    metrics.inc("api_requests_total", outcome="success")
+    metrics.record_api_retries()
+    assert metrics.registry.get("api_retries") == 1
+
+
+def test_export_metrics_writes_textfile_and_json(tmp_path):
+    metrics.set_gauge("last_run_success", 1)
+    cfg = {"metrics": {"textfile_path": "out/etl.prom", "json_path": str(tmp_path / "etl.json")}}
+
+    metrics.export_metrics(cfg, tmp_path)
+
+    assert "exchange_rates_etl_last_run_success 1" in (tmp_path / "out" / "etl.prom").read_text()
+    data = json.loads((tmp_path / "etl.json").read_text())
+    assert data["exchange_rates_etl_last_run_success"][0]["value"] == 1
+    # no temp files left behind by the atomic write
+    assert [p.name for p in (tmp_path / "out").iterdir()] == ["etl.prom"]
+
+
+def test_export_metrics_disabled(tmp_path):
+    metrics.export_metrics({"metrics": {"enabled": False}}, tmp_path)
+    assert not (tmp_path / "metrics").exists()
@@ -0,0 +1,165 @@
+import sys
+from datetime import date
+from pathlib import Path
+
+import pytest
+
+# Ensure we import the version under src/
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root / "src"))
+
+import partition_maintenance as pm
+
+
+class FakeCursor:
+    def __init__(self, db):
+        self.db = db
+        self.rowcount = 0
+
+    def execute(self, sql, params=None):
+        self.db.executed.append(sql)
+        self.sql = sql
+
+    def fetchone(self):
+        if "information_schema.TABLES" in self.sql:
+            return None if self.db.archive_options is None else (self.db.archive_options,)
+        if self.sql.startswith("SELECT 1 FROM "):
+            source = self.sql.removeprefix("SELECT 1 FROM ").removesuffix(" LIMIT 1")
+            return (1,) if source in self.db.nonempty else None
+        return (self.db.oldest,)
+
+    def fetchall(self):
+        return [(name,) for name in self.db.partitions]
+
+    def close(self):
+        pass
+
+
+class FakeConn:
+    def __init__(self, partitions, oldest=None, archive_options=None, nonempty=()):
+        self.partitions = partitions
+        self.oldest = oldest
+        # CREATE_OPTIONS of the archive table (None: it doesn't exist) and the sources holding rows
+        self.archive_options = archive_options
+        self.nonempty = set(nonempty)
+        self.executed = []
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def test_add_months_and_names():
+    assert pm.add_months(date(2025, 11, 15), 3) == date(2026, 2, 1)
+    assert pm.add_months(date(2025, 1, 1), -1) == date(2024, 12, 1)
+    assert pm.partition_name(date(2025, 7, 1)) == "p202507"
+    assert pm.partition_month("p202507") == date(2025, 7, 1)
+    assert pm.partition_month("p_future") is None
+
+
+def test_missing_future_months_from_scratch():
+    months = pm.missing_future_months(["p_future"], date(2025, 6, 23), 2)
+    assert months == [date(2025, 6, 1), date(2025, 7, 1), date(2025, 8, 1)]
+
+
+def test_missing_future_months_skips_existing():
+    months = pm.missing_future_months(["p202506", "p202507", "p_future"], date(2025, 6, 23), 3)
+    assert months == [date(2025, 8, 1), date(2025, 9, 1)]
+
+
+def test_missing_future_months_splits_existing_history():
+    months = pm.missing_future_months(["p_future"], date(2025, 6, 23), 1, oldest=date(2025, 3, 9))
+    assert months == [date(2025, m, 1) for m in (3, 4, 5, 6, 7)]
+
+
+def test_ensure_future_partitions_uses_oldest_row():
+    from datetime import datetime
+
+    conn = FakeConn(["p_future"], oldest=datetime(2025, 4, 2, 0, 0, 2))
+    created = pm.ensure_future_partitions(conn, "rates", 0, date(2025, 6, 1))
+    assert created == ["p202504", "p202505", "p202506"]
+
+
+def test_build_reorganize_sql():
+    sql = pm.build_reorganize_sql("rates", [date(2025, 7, 1), date(2025, 6, 1)])
+    assert sql.startswith("ALTER TABLE rates REORGANIZE PARTITION p_future INTO (")
+    assert "PARTITION p202506 VALUES LESS THAN ('2025-07-01')" in sql
+    assert sql.index("p202506") < sql.index("p202507") < sql.index("MAXVALUE")
+
+
+def test_expired_partitions():
+    existing = ["p202401", "p202402", "p202403", "p_future"]
+    assert pm.expired_partitions(existing, date(2025, 3, 10), 12) == ["p202401", "p202402"]
+
+
+def test_ensure_future_partitions_requires_partitioned_table():
+    with pytest.raises(RuntimeError, match="not partitioned"):
+        pm.ensure_future_partitions(FakeConn([]), "rates", 3, date(2025, 6, 1))
+
+
+def test_run_maintenance_creates_rolls_up_and_archives(monkeypatch):
+    conn = FakeConn(["p202401", "p202506", "p_future"])
+    monkeypatch.setattr(pm, "connect_to_mysql", lambda cfg: conn)
+
+    report = pm.run_maintenance({}, "rates", months_ahead=1, retention_months=12, today=date(2025, 6, 15))
+
+    assert report.created == ["p202507"]
+    assert report.rolled_up == ["p202401"]
+    assert report.archived == ["p202401"]
+    executed = "\n".join(conn.executed)
+    assert "REORGANIZE PARTITION p_future" in executed
+    assert "FROM rates PARTITION (p202401)" in executed
+    assert "EXCHANGE PARTITION p202401 WITH TABLE rates_archive_p202401" in executed
+    assert "DROP PARTITION p202401" in executed
+
+
+def test_run_maintenance_dry_run_executes_nothing_but_reads(monkeypatch):
+    conn = FakeConn(["p202401", "p_future"])
+    monkeypatch.setattr(pm, "connect_to_mysql", lambda cfg: conn)
+
+    report = pm.run_maintenance({}, "rates", 0, 12, archive=False, today=date(2025, 6, 15), dry_run=True)
+
+    assert report.dropped == ["p202401"]
+    assert all("information_schema" in sql for sql in conn.executed)
+    assert any("DROP PARTITION p202401" in sql for sql in report.statements)
+
+
+def test_retire_partition_resumes_after_exchange():
+    # An earlier run exchanged the rows into the archive table and stopped before the DROP
+    conn = FakeConn(["p202401", "p_future"], archive_options="", nonempty={"rates_archive_p202401"})
+
+    statements = pm.retire_partition(conn, "rates", "p202401", archive=True)
+
+    assert statements == ["ALTER TABLE rates DROP PARTITION p202401"]
+    assert not any("EXCHANGE" in sql for sql in conn.executed)
+
+
+def test_retire_partition_resumes_before_remove_partitioning():
+    conn = FakeConn(["p202401", "p_future"], archive_options="partitioned", nonempty={"rates PARTITION (p202401)"})
+
+    statements = pm.retire_partition(conn, "rates", "p202401", archive=True)
+
+    assert statements == [
+        "ALTER TABLE rates_archive_p202401 REMOVE PARTITIONING",
+        "ALTER TABLE rates EXCHANGE PARTITION p202401 WITH TABLE rates_archive_p202401",
+        "ALTER TABLE rates DROP PARTITION p202401",
+    ]
+
+
+def test_retire_partition_refuses_when_archive_and_partition_both_hold_rows():
+    conn = FakeConn(
+        ["p202401", "p_future"],
+        archive_options="",
+        nonempty={"rates_archive_p202401", "rates PARTITION (p202401)"},
+    )
+    with pytest.raises(RuntimeError, match="resolve by hand"):
+        pm.retire_partition(conn, "rates", "p202401", archive=True)
+    assert not any(sql.startswith("ALTER") for sql in conn.executed)
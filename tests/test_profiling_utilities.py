@@ -0,0 +1,84 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+# Ensure we import the version under src/
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root / "src"))
+
+import profiling_utilities as pu
+
+
+@pytest.fixture(autouse=True)
+def clean_timings():
+    pu.reset_timings()
+    yield
+    pu.reset_timings()
+
+
+def test_timed_stage_records_rows():
+    with pu.timed_stage("transform") as stage:
+        stage.rows = 42
+
+    timing = pu.get_timings()["stage.transform"]
+    assert timing.calls == 1
+    assert timing.rows == 42
+    assert timing.wall_seconds >= 0
+    assert stage.wall_seconds == timing.wall_seconds
+
+
+def test_timed_stage_records_on_exception():
+    with pytest.raises(ValueError):
+        with pu.timed_stage("load"):
+            raise ValueError("boom")
+
+    assert pu.get_timings()["stage.load"].calls == 1
+
+
+def test_timed_decorator_aggregates_calls():
+    @pu.timed("double", rows=len)
+    def double(items):
+        return items * 2
+
+    double([1])
+    double([1, 2])
+
+    timing = pu.get_timings()["double"]
+    assert timing.calls == 2
+    assert timing.rows == 6
+
+
+def test_timed_decorator_preserves_metadata():
+    @pu.timed("noop")
+    def noop():
+        """Docstring."""
+
+    assert noop.__name__ == "noop"
+    assert noop.__doc__ == "Docstring."
+
+
+def test_write_timing_summary(tmp_path, monkeypatch):
+    monkeypatch.setattr(pu, "get_current_date", lambda: "2099-12-31")
+    with pu.timed_stage("extract") as stage:
+        stage.rows = 3
+
+    path = pu.write_timing_summary(tmp_path, "main", {"status": "success"})
+
+    assert path.name == "timings_main_2099-12-31.json"
+    summary = json.loads(path.read_text())
+    assert summary["status"] == "success"
+    assert summary["timings"][0]["name"] == "stage.extract"
+    assert summary["timings"][0]["rows"] == 3
+
+
+def test_profile_run_writes_reports(tmp_path, monkeypatch):
+    monkeypatch.setattr(pu, "get_current_date", lambda: "2099-12-31")
+
+    with pu.profile_run(tmp_path, "profile"):
+        sum(range(1000))
+
+    assert (tmp_path / "profile_2099-12-31.prof").exists()
+    assert (tmp_path / "profile_2099-12-31_cpu.txt").exists()
+    assert "peak=" in (tmp_path / "profile_2099-12-31_memory.txt").read_text()
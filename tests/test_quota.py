@@ -0,0 +1,127 @@
+import sys
+import time
+from datetime import date, datetime, timezone
+from pathlib import Path
+
+import pytest
+import requests
+
+# Ensure we import the version under src/
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root / "src"))
+
+import backfill
+import extract
+import metrics
+import quota
+
+
+@pytest.fixture(autouse=True)
+def clean_state():
+    metrics.registry.clear()
+    yield
+    metrics.registry.clear()
+    quota._ledger = None
+
+
+def utc(*args):
+    return datetime(*args, tzinfo=timezone.utc).timestamp()
+
+
+def test_period_starts_on_reset_day():
+    assert quota.period_start(utc(2025, 3, 15)) == datetime(2025, 3, 1, tzinfo=timezone.utc)
+    assert quota.period_start(utc(2025, 3, 15), reset_day=20) == datetime(2025, 2, 20, tzinfo=timezone.utc)
+    assert quota.period_start(utc(2025, 1, 5), reset_day=10) == datetime(2024, 12, 10, tzinfo=timezone.utc)
+
+
+def test_spend_refuses_once_budget_is_used(tmp_path):
+    ledger = quota.QuotaLedger(tmp_path / "quota.sqlite", monthly_budget=3)
+    for _ in range(3):
+        ledger.spend("scheduled")
+    with pytest.raises(quota.QuotaExceededError, match="3/3 API requests used"):
+        ledger.spend("scheduled")
+
+    # Another process sharing the ledger sees the same count
+    assert quota.QuotaLedger(tmp_path / "quota.sqlite", monthly_budget=3).status().used == 3
+    assert metrics.registry.get("api_quota_remaining") == 0
+    assert metrics.registry.get("api_quota_refused_total", priority="scheduled") == 1
+
+
+def test_reserve_keeps_budget_for_scheduled_runs(tmp_path):
+    ledger = quota.QuotaLedger(tmp_path / "quota.sqlite", monthly_budget=10, reserve={"backfill": 4})
+    assert ledger.allows("backfill", 6)
+    assert not ledger.allows("backfill", 7)
+    for _ in range(6):
+        ledger.spend("backfill")
+    with pytest.raises(quota.QuotaExceededError, match="4 held back from backfill"):
+        ledger.spend("backfill")
+    assert ledger.spend("scheduled").remaining == 3
+
+    with pytest.raises(ValueError, match="Unknown quota priorities"):
+        quota.QuotaLedger(tmp_path / "other.sqlite", reserve={"urgent": 1})
+
+
+def test_without_budget_requests_are_only_counted(tmp_path):
+    ledger = quota.configure({"quota": {"ledger": str(tmp_path / "quota.sqlite")}}, tmp_path)
+    for _ in range(5):
+        quota.spend("backfill")
+    assert ledger.status().used == 5 and ledger.status().remaining is None
+    assert quota.configure({"quota": {"enabled": False}}, tmp_path) is None
+    assert quota.spend("scheduled") is None
+
+
+class FlakyGet:
+    def __init__(self, failures):
+        self.failures = failures
+        self.calls = 0
+
+    def __call__(self, url, timeout):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise requests.ConnectionError("connection reset")
+        response = requests.Response()
+        response.status_code = 200
+        response._content = b"{}"
+        return response
+
+
+def test_every_attempt_including_retries_is_charged(tmp_path, monkeypatch):
+    monkeypatch.setattr(time, "sleep", lambda seconds: None)
+    get = FlakyGet(failures=2)
+    monkeypatch.setattr(extract.requests, "get", get)
+    ledger = quota.configure({"quota": {"ledger": str(tmp_path / "q.sqlite"), "monthly_requests": 4}}, tmp_path)
+
+    assert extract.fetch_exchange_rates("http://api.invalid/latest/USD") == b"{}"
+    assert get.calls == 3
+    assert ledger.status().used == 3
+
+    # One request left: a refused attempt never reaches the API and isn't retried
+    get.calls, get.failures = 0, 5
+    with pytest.raises(quota.QuotaExceededError):
+        extract.fetch_exchange_rates("http://api.invalid/latest/USD")
+    assert get.calls == 1
+    assert ledger.status().used == 4
+
+
+def test_backfill_defers_units_the_quota_does_not_cover(tmp_path):
+    queue = backfill.BackfillQueue(tmp_path / "queue.sqlite")
+    queue.enqueue(["USD"], date(2024, 1, 1), date(2024, 1, 10), days_per_unit=5)
+    ledger = quota.QuotaLedger(tmp_path / "quota.sqlite", monthly_budget=7)
+
+    def process(unit):
+        for _ in unit.days():
+            ledger.spend("backfill")
+        return 1
+
+    def admit(unit):
+        return ledger.allows("backfill", len(list(unit.days())))
+
+    assert backfill.run_worker(queue, process, "w", admit=admit) == 1
+    progress = queue.progress()
+    assert progress.units["done"] == 1 and progress.units["pending"] == 1
+
+    # Without the admission check the unit runs into the quota part way and is handed back
+    assert backfill.run_worker(queue, process, "w") == 0
+    unit = queue.claim("w")
+    assert unit.attempts == 1
+    assert ledger.status().used == 7
@@ -0,0 +1,87 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+# Ensure we import the version under src/
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root / "src"))
+
+import json_backend
+import raw_archive as ra
+
+SAMPLE_BODY = (project_root / "data" / "raw" / "sample_rates.json").read_bytes()
+
+
+def make_body(ts, base="USD"):
+    data = json.loads(SAMPLE_BODY)
+    data["time_last_update_unix"] = ts
+    data["base_code"] = base
+    return json.dumps(data).encode()
+
+
+def store(body, archive_dir, codec=None):
+    return ra.archive_payload(body, json_backend.decode_payload(body), archive_dir, codec)
+
+
+@pytest.mark.parametrize("codec", ["gzip", "zstd"])
+def test_archive_round_trip(tmp_path, codec):
+    if codec == "zstd" and ra._zstd() is None:
+        pytest.skip("zstandard is not installed")
+    entry, stored = store(SAMPLE_BODY, tmp_path, codec)
+    assert stored
+    assert entry.codec == codec
+    assert entry.stored_bytes < entry.size
+    assert entry.object_path(tmp_path).exists()
+    assert ra.read_body(entry, tmp_path) == SAMPLE_BODY
+    assert ra.read_index(tmp_path) == [entry]
+
+
+def test_identical_payload_is_stored_once(tmp_path):
+    first, stored_first = store(SAMPLE_BODY, tmp_path, "gzip")
+    second, stored_second = store(SAMPLE_BODY, tmp_path, "gzip")
+    assert stored_first and not stored_second
+    assert second.sha256 == first.sha256
+    assert len(ra.read_index(tmp_path)) == 1
+    assert len(list((tmp_path / "objects").rglob("*.json.gz"))) == 1
+
+
+def test_select_entries_filters_and_dedupes(tmp_path):
+    for ts in (100, 200, 300):
+        store(make_body(ts), tmp_path, "gzip")
+    store(make_body(200, "EUR"), tmp_path, "gzip")
+    # a re-serialised copy of an already archived snapshot gets its own object
+    reformatted = json.dumps(json.loads(make_body(200)), indent=1).encode()
+    newer, _ = store(reformatted, tmp_path, "gzip")
+
+    entries = ra.read_index(tmp_path)
+    assert len(entries) == 5
+    selected = ra.select_entries(entries, base_code="USD", since_unix=150)
+    assert [(e.base_code, e.time_last_update_unix) for e in selected] == [("USD", 200), ("USD", 300)]
+    assert selected[0] == newer
+    assert len(ra.select_entries(entries, until_unix=200)) == 3
+
+
+def test_corrupt_object_is_detected(tmp_path):
+    entry, _ = store(SAMPLE_BODY, tmp_path, "gzip")
+    entry.object_path(tmp_path).write_bytes(ra.compress(b"{}", "gzip"))
+    with pytest.raises(ValueError, match="corrupt"):
+        ra.read_body(entry, tmp_path)
+
+
+def test_replay_loads_in_bulk(tmp_path):
+    for ts in range(5):
+        store(make_body(1_750_000_000 + ts * 86400), tmp_path, "gzip")
+    batches = []
+
+    def load_rows(rows):
+        batches.append(len(rows))
+        return len(rows)
+
+    entries = ra.select_entries(ra.read_index(tmp_path))
+    payloads, loaded = ra.replay(entries, load_rows, tmp_path, batch_payloads=2)
+    n_rates = len(json.loads(SAMPLE_BODY)["conversion_rates"])
+    assert payloads == 5
+    assert loaded == 5 * n_rates
+    assert batches == [2 * n_rates, 2 * n_rates, n_rates]
@@ -0,0 +1,156 @@
+import hashlib
+import sqlite3
+import sys
+from pathlib import Path
+
+import pytest
+
+# Ensure we import the version under src/
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root / "src"))
+
+import reconcile
+from data_utilities import save_to_csv
+
+
+class SqliteCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, sql, params=()):
+        self.result = self.conn.execute(sql.replace("%s", "?"), params)
+
+    def executemany(self, sql, rows):
+        self.conn.executemany(sql.replace("%s", "?"), rows)
+
+    def fetchall(self):
+        return self.result.fetchall()
+
+    def close(self):
+        pass
+
+
+class SqliteConnection:
+    """sqlite with the MySQL functions ROW_HASH_SQL uses, storing values as MySQL would show them."""
+
+    def __init__(self):
+        self.conn = sqlite3.connect(":memory:")
+        self.conn.create_function("MD5", 1, lambda s: hashlib.md5(s.encode()).hexdigest())
+        self.conn.create_function("CONV", 3, lambda s, src, dst: str(int(s, src)))
+        self.conn.create_function("CONCAT_WS", -1, lambda sep, *args: sep.join(args))
+        self.conn.execute(f"CREATE TABLE rates ({', '.join(f'{c} TEXT' for c in reconcile.HASH_COLUMNS)})")
+
+    def cursor(self):
+        return SqliteCursor(self.conn)
+
+    def insert(self, rows):
+        self.conn.executemany(f"INSERT INTO rates VALUES ({', '.join('?' * 7)})", rows)
+
+    def rows(self):
+        return sorted(self.conn.execute("SELECT * FROM rates").fetchall())
+
+    def commit(self):
+        self.conn.commit()
+
+    def rollback(self):
+        self.conn.rollback()
+
+    def close(self):
+        self.conn.close()
+
+
+def csv_rows(day, bases=("USD", "EUR"), targets=("JPY", "GBP", "CHF")):
+    last = f"2025-06-{day:02d} 00:00:02+00:00"
+    nxt = f"2025-06-{day + 1:02d} 00:00:02+00:00"
+    return [
+        {
+            "base_code": base,
+            "target_code": target,
+            "rate": 1.25 + i / 3,
+            "time_last_update_utc": last,
+            "time_next_update_utc": nxt,
+            "time_next_update_unix": 1_750_636_802 + day,
+            "time_last_update_unix": 1_750_550_402 + day,
+        }
+        for base in bases
+        for i, target in enumerate(targets)
+    ]
+
+
+@pytest.fixture
+def setup(tmp_path):
+    for day in (20, 21, 22):
+        save_to_csv(csv_rows(day), tmp_path, f"rates_2025-06-{day + 1:02d}.csv", compress=day == 22)
+    files = reconcile.FileRows.from_directory(tmp_path)
+    db = SqliteConnection()
+    db.insert(list(files.rows_by_key.values()))
+    return files, db
+
+
+def test_canonical_row_matches_mysql_rendering():
+    row = reconcile.canonical_row(csv_rows(20)[1])
+    assert row == (
+        "USD",
+        "GBP",
+        "1.58333333",
+        "2025-06-20 00:00:02",
+        "2025-06-21 00:00:02",
+        "1750550422",
+        "1750636822",
+    )
+    assert reconcile.canonical_row({**csv_rows(20)[0], "rate": "1.2e-09"})[2] == "0.00000000"
+
+
+def test_in_sync_needs_one_query(setup):
+    files, db = setup
+    report = reconcile.compare(files, reconcile.TableRows(db, "rates"))
+    assert report.clean
+    assert report.days_checked == 3
+    assert report.queries == 1
+
+
+def test_drill_down_only_into_differing_buckets(setup):
+    files, db = setup
+    db.conn.execute(
+        "UPDATE rates SET rate = '9.00000000' WHERE base_code = 'EUR' AND target_code = 'JPY' AND time_last_update_utc LIKE '2025-06-21%'"
+    )
+    db.conn.execute(
+        "DELETE FROM rates WHERE base_code = 'USD' AND target_code = 'CHF' AND time_last_update_utc LIKE '2025-06-22%'"
+    )
+    db.insert([("USD", "XAU", "1.00000000", "2025-06-22 00:00:02", "2025-06-23 00:00:02", "1", "2")])
+
+    report = reconcile.compare(files, reconcile.TableRows(db, "rates"))
+
+    assert report.mismatched_days == ["2025-06-21", "2025-06-22"]
+    assert report.mismatched_buckets == [("2025-06-21", "EUR"), ("2025-06-22", "USD")]
+    # 1 day query + 2 base queries + 2 row queries
+    assert report.queries == 5
+    [(file_row, table_row)] = report.changed
+    assert (file_row[2], table_row[2]) == ("1.25000000", "9.00000000")
+    assert [row[1] for row in report.missing] == ["CHF"]
+    assert [row[1] for row in report.extra] == ["XAU"]
+
+
+def test_repair_makes_table_match(setup):
+    files, db = setup
+    expected = db.rows()
+    db.conn.execute("UPDATE rates SET rate = '9.00000000' WHERE target_code = 'GBP' AND base_code = 'USD'")
+    db.conn.execute("DELETE FROM rates WHERE target_code = 'JPY' AND base_code = 'EUR'")
+    db.insert([("USD", "XAU", "1.00000000", "2025-06-20 00:00:02", "2025-06-21 00:00:02", "1", "2")])
+    table = reconcile.TableRows(db, "rates")
+
+    report = reconcile.compare(files, table)
+    assert reconcile.repair(table, report) == 6
+    # Extra rows stay unless asked for
+    assert not reconcile.compare(files, table).clean
+    reconcile.repair(table, reconcile.compare(files, table), delete_extra=True)
+    assert db.rows() == expected
+    assert reconcile.compare(files, table).clean
+
+
+def test_first_file_wins_for_repeated_keys(tmp_path):
+    save_to_csv(csv_rows(20), tmp_path, "rates_2025-06-21.csv")
+    save_to_csv([{**row, "rate": 2.0} for row in csv_rows(20)], tmp_path, "rates_2025-06-22.csv")
+    files = reconcile.FileRows.from_directory(tmp_path)
+    assert files.conflicts == 6
+    assert {row[2] for row in files.rows_by_key.values()} == {"1.25000000", "1.58333333", "1.91666667"}
@@ -0,0 +1,161 @@
+import math
+import statistics
+import sys
+from pathlib import Path
+
+import pytest
+
+# Ensure we import the version under src/
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root / "src"))
+
+import rolling_stats as rs
+
+WINDOWS = (3, 5)
+
+
+def make_rows(series, base="USD", target="EUR", start_ts=1_750_000_000):
+    return [
+        {"base_code": base, "target_code": target, "rate": rate, "time_last_update_unix": start_ts + i * 86400}
+        for i, rate in enumerate(series)
+    ]
+
+
+SERIES = [1.0, 1.1, 1.05, 1.2, 1.15, 1.3, 1.25, 1.4]
+
+
+def test_incremental_stats_match_direct_computation():
+    stats = rs.RollingStats(WINDOWS)
+    assert stats.update_rows(make_rows(SERIES)) == len(SERIES)
+    snap = stats.pairs[("USD", "EUR")].snapshot()
+
+    returns = [math.log(b / a) for a, b in zip(SERIES, SERIES[1:])]
+    for w in WINDOWS:
+        assert snap[f"ma_{w}"] == pytest.approx(statistics.fmean(SERIES[-w:]))
+        assert snap[f"std_{w}"] == pytest.approx(statistics.stdev(SERIES[-w:]))
+        assert snap[f"vol_{w}"] == pytest.approx(statistics.stdev(returns[-w:]))
+        assert snap[f"n_{w}"] == w
+
+
+def test_short_history_reports_none():
+    stats = rs.RollingStats(WINDOWS)
+    stats.update_rows(make_rows([1.0]))
+    snap = stats.pairs[("USD", "EUR")].snapshot()
+    assert snap["ma_3"] == 1.0
+    assert snap["std_3"] is None
+    assert snap["vol_3"] is None
+
+
+def test_replayed_snapshot_is_ignored():
+    stats = rs.RollingStats(WINDOWS)
+    rows = make_rows(SERIES)
+    stats.update_rows(rows)
+    before = stats.pairs[("USD", "EUR")].snapshot()
+    assert stats.update_rows(rows[-2:]) == 0
+    assert stats.pairs[("USD", "EUR")].snapshot() == before
+
+
+def test_state_round_trip(tmp_path):
+    path = tmp_path / "state" / "rolling.json"
+    stats = rs.RollingStats(WINDOWS)
+    stats.update_rows(make_rows(SERIES[:5]))
+    stats.save(path)
+
+    reloaded = rs.RollingStats.load(path, WINDOWS)
+    next_rows = make_rows(SERIES)[5:]
+    reloaded.update_rows(next_rows)
+    stats.update_rows(next_rows)
+    for a, b in zip(reloaded.snapshot_rows(), stats.snapshot_rows()):
+        for key in a:
+            assert a[key] == pytest.approx(b[key])
+
+
+def test_update_statistics_persists(tmp_path):
+    path = tmp_path / "rolling.json"
+    rows = make_rows(SERIES)
+    rs.update_statistics(rows[:4], path, WINDOWS)
+    out = rs.update_statistics(rows[4:], path, WINDOWS)
+    assert len(out) == 1
+    assert out[0]["ma_5"] == pytest.approx(statistics.fmean(SERIES[-5:]))
+    assert out[0]["time_last_update_unix"] == rows[-1]["time_last_update_unix"]
+
+
+def test_bootstrap_matches_incremental():
+    rows = make_rows(SERIES) + make_rows([2.0, 2.2, 2.1], target="GBP")
+    # history arrives unordered and with a duplicated snapshot
+    shuffled = list(reversed(rows)) + rows[:2]
+    boot = rs.bootstrap_state(shuffled, WINDOWS)
+    incremental = rs.RollingStats(WINDOWS)
+    incremental.update_rows(rows)
+    for a, b in zip(boot.snapshot_rows(), incremental.snapshot_rows()):
+        assert a.keys() == b.keys()
+        for key in a:
+            assert a[key] == pytest.approx(b[key])
+
+
+def test_rolling_history_last_value_matches_incremental():
+    result = rs.rolling_history(SERIES, WINDOWS)
+    stats = rs.RollingStats(WINDOWS)
+    stats.update_rows(make_rows(SERIES))
+    snap = stats.pairs[("USD", "EUR")].snapshot()
+    for w in WINDOWS:
+        assert math.isnan(result[f"ma_{w}"][w - 2])
+        assert result[f"ma_{w}"][-1] == pytest.approx(snap[f"ma_{w}"])
+        assert result[f"vol_{w}"][-1] == pytest.approx(snap[f"vol_{w}"])
+
+
+def test_windowed_series_resync_keeps_sums_exact(monkeypatch):
+    monkeypatch.setattr(rs, "RESYNC_EVERY", 4)
+    series = rs.WindowedSeries((3,))
+    for value in [1e9, 1.0, 2.0, 3.0, 4.0, 5.0]:
+        series.append(value)
+    assert series.mean(3) == pytest.approx(4.0)
+
+
+def test_consistent_quarantined_readings_rebaseline_the_pair(tmp_path):
+    path = tmp_path / "rolling.json"
+    rows = make_rows(SERIES)
+    rs.update_statistics(rows, path, WINDOWS)
+    shifted = make_rows([2.0, 2.02, 1.99], start_ts=rows[-1]["time_last_update_unix"] + 86400)
+
+    # Held across runs until the third consistent reading
+    rs.update_statistics([], path, WINDOWS, shifted[:2], rebaseline_after=3)
+    stats = rs.RollingStats.load(path, WINDOWS)
+    assert [rate for _, rate in stats.pairs[("USD", "EUR")].held] == [2.0, 2.02]
+    assert stats.pairs[("USD", "EUR")].rates.buffer.values() == SERIES[-6:]
+
+    out = rs.update_statistics([], path, WINDOWS, shifted[2:], rebaseline_after=3)
+    pair = rs.RollingStats.load(path, WINDOWS).pairs[("USD", "EUR")]
+    assert pair.rates.buffer.values() == [2.0, 2.02, 1.99]
+    assert pair.held == []
+    assert out[0]["time_last_update_unix"] == shifted[-1]["time_last_update_unix"]
+
+
+def test_accepted_or_inconsistent_readings_reset_held_readings():
+    stats = rs.RollingStats(WINDOWS)
+    rows = make_rows(SERIES + [1.38])
+    stats.update_rows(rows[:-1])
+    pair = stats.pairs[("USD", "EUR")]
+    later = rows[-1]["time_last_update_unix"]
+
+    assert pair.hold(2.0, later) == 1
+    assert pair.hold(3.0, later + 1) == 1  # a different level starts a new run
+    stats.update_rows([{**rows[-1], "time_last_update_unix": later + 2}])
+    assert pair.held == []
+    assert stats.hold_back(make_rows([0.0, 2.0], start_ts=later + 3), rebaseline_after=1) == [("USD", "EUR")]
+
+
+def test_rebaseline_pairs_by_hand(tmp_path):
+    path = tmp_path / "rolling.json"
+    stats = rs.RollingStats(WINDOWS)
+    stats.update_rows(make_rows(SERIES) + make_rows(SERIES, target="ARS"))
+    stats.hold_back(make_rows([9.0], target="ARS", start_ts=1_760_000_000))
+    stats.save(path)
+
+    assert rs.rebaseline_pairs([("USD", "EUR"), ("USD", "ARS"), ("USD", "XXX")], path, WINDOWS) == [
+        ("USD", "EUR"),
+        ("USD", "ARS"),
+    ]
+    pairs = rs.RollingStats.load(path, WINDOWS).pairs
+    assert ("USD", "EUR") not in pairs
+    assert pairs[("USD", "ARS")].rates.buffer.values() == [9.0]
@@ -0,0 +1,99 @@
+import multiprocessing
+import sys
+from pathlib import Path
+
+import pytest
+
+# Ensure we import the version under src/
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root / "src"))
+
+import shared_rates as sr
+
+
+def rows(rates, base="USD", ts=1_750_000_000):
+    return [
+        {"base_code": base, "target_code": code, "rate": rate, "time_last_update_unix": ts}
+        for code, rate in rates.items()
+    ]
+
+
+def test_publish_and_read(tmp_path):
+    seqs = sr.publish_rows(rows({"EUR": 0.9, "JPY": 150.0}), tmp_path)
+    with sr.RatesReader("usd", tmp_path) as reader:
+        assert reader.seq == seqs["USD"] == 2
+        assert reader.get("EUR") == 0.9
+        assert reader.get("GBP") is None
+        snap = reader.snapshot()
+        assert snap.base_code == "USD"
+        assert snap.time_last_update_unix == 1_750_000_000
+        assert snap.rates == {"EUR": 0.9, "JPY": 150.0}
+
+
+def test_reader_sees_new_snapshots_and_code_changes(tmp_path):
+    publisher = sr.RatesPublisher("USD", tmp_path)
+    publisher.publish([("EUR", 0.9), ("JPY", 150.0)], 1)
+    reader = sr.RatesReader("USD", tmp_path)
+    assert reader.get("JPY") == 150.0
+    publisher.publish([("EUR", 0.91), ("JPY", 151.0)], 2)
+    assert reader.get("JPY") == 151.0
+    # Different codes bump the generation, so the cached slot index is rebuilt
+    publisher.publish([("JPY", 152.0), ("CHF", 0.8)], 3)
+    assert reader.get("JPY") == 152.0
+    assert reader.get("EUR") is None
+    assert reader.seq == 6
+
+
+def test_growing_past_capacity_replaces_segment(tmp_path):
+    publisher = sr.RatesPublisher("USD", tmp_path, capacity=2)
+    publisher.publish([("EUR", 0.9), ("JPY", 150.0)], 1)
+    reader = sr.RatesReader("USD", tmp_path)
+    publisher.publish([("EUR", 0.9), ("JPY", 150.0), ("GBP", 0.8)], 2)
+    assert reader.get("GBP") == 0.8
+    assert reader.snapshot().time_last_update_unix == 2
+
+
+def test_missing_segment_and_stuck_writer(tmp_path, monkeypatch):
+    with pytest.raises(sr.SharedRatesError, match="No shared rates segment"):
+        sr.RatesReader("USD", tmp_path)
+    sr.RatesPublisher("USD", tmp_path).publish([("EUR", 0.9)], 1)
+    path = sr.segment_path("USD", tmp_path)
+    with path.open("r+b") as f:
+        f.seek(sr.SEQ_OFFSET)
+        f.write(sr.SEQ.pack(3))
+    monkeypatch.setattr(sr, "READ_TIMEOUT", 0.05)
+    with pytest.raises(sr.SharedRatesError, match="mid-update"):
+        sr.RatesReader("USD", tmp_path).get("EUR")
+    # The next publish recovers from the half-written snapshot
+    assert sr.RatesPublisher("USD", tmp_path).publish([("EUR", 0.95)], 2) == 4
+    assert sr.RatesReader("USD", tmp_path).get("EUR") == 0.95
+
+
+def _read_until(directory, expected, queue):
+    reader = sr.RatesReader("USD", directory)
+    while True:
+        snap = reader.snapshot()
+        # Every snapshot a reader sees must be internally consistent
+        if len(set(snap.rates.values())) > 1:
+            queue.put(f"torn read at seq {snap.seq}: {snap.rates}")
+            return
+        if snap.time_last_update_unix == expected:
+            queue.put("ok")
+            return
+
+
+def test_other_processes_never_see_torn_snapshots(tmp_path):
+    codes = [f"C{i:02d}" for i in range(100)]
+    publisher = sr.RatesPublisher("USD", tmp_path)
+    publisher.publish([(code, 0.0) for code in codes], 0)
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    readers = [ctx.Process(target=_read_until, args=(tmp_path, 2000, queue)) for _ in range(2)]
+    for p in readers:
+        p.start()
+    for i in range(1, 2001):
+        publisher.publish([(code, float(i)) for code in codes], i)
+    results = [queue.get(timeout=30) for _ in readers]
+    for p in readers:
+        p.join(timeout=10)
+    assert results == ["ok", "ok"]
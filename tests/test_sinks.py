@@ -0,0 +1,179 @@
+import sys
+import threading
+from datetime import date
+from pathlib import Path
+
+import pytest
+
+# Ensure we import the version under src/
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root / "src"))
+
+import load
+import sinks
+
+ROWS = [{"base_code": "USD", "target_code": "EUR", "rate": 0.9}]
+
+
+class RecordingSink(sinks.Sink):
+    def __init__(self, name, fail=False, barrier=None, **kwargs):
+        super().__init__(name, **kwargs)
+        self.fail = fail
+        self.barrier = barrier
+        self.seen_outputs = None
+
+    def write(self, batch):
+        if self.barrier is not None:
+            # Both sinks of a wave must be inside write() at the same time
+            self.barrier.wait(timeout=5)
+        self.seen_outputs = dict(batch.outputs)
+        if self.fail:
+            raise RuntimeError(f"{self.name} broke")
+        return len(batch.rows), f"{self.name}-output"
+
+
+def make_batch(tmp_path):
+    return sinks.SinkBatch(list(ROWS), date(2025, 6, 22), tmp_path, {"table": "rates"})
+
+
+def test_default_sinks_follow_load_schema():
+    standard = sinks.build_sinks({})
+    assert [(type(s).__name__, s.name) for s in standard] == [("CsvSink", "csv"), ("MySqlSink", "mysql")]
+    assert standard[1].depends_on == ["csv"]
+
+    compact = sinks.build_sinks({"load": {"schema": "compact", "compact_table": "rc"}})
+    assert isinstance(compact[1], sinks.CompactMySqlSink)
+    assert compact[1].depends_on == []
+    assert compact[1].options["table"] == "rc"
+
+
+def test_build_sinks_from_outputs():
+    cfg = {
+        "sinks": {
+            "outputs": [
+                {"name": "csv", "type": "csv", "directory": "out"},
+                {"name": "old", "type": "mysql", "enabled": False},
+                {"name": "compact", "type": "mysql_compact", "required": False},
+            ]
+        }
+    }
+    built = sinks.build_sinks(cfg)
+    assert [s.name for s in built] == ["csv", "compact"]
+    assert built[1].required is False
+
+
+def test_build_sinks_rejects_unknown_type_and_duplicates():
+    with pytest.raises(ValueError, match="Unknown sink type"):
+        sinks.build_sinks({"sinks": {"outputs": [{"name": "x", "type": "parquet"}]}})
+    with pytest.raises(ValueError, match="unique"):
+        sinks.build_sinks({"sinks": {"outputs": [{"name": "x", "type": "csv"}, {"name": "x", "type": "csv"}]}})
+
+
+def test_plan_waves_orders_dependencies_and_detects_cycles():
+    a, b, c = RecordingSink("a"), RecordingSink("b", depends_on=["a"]), RecordingSink("c")
+    assert [[s.name for s in wave] for wave in sinks.plan_waves([b, a, c])] == [["a", "c"], ["b"]]
+    with pytest.raises(ValueError, match="cycle"):
+        sinks.plan_waves([RecordingSink("x", depends_on=["y"]), RecordingSink("y", depends_on=["x"])])
+    with pytest.raises(ValueError, match="unknown"):
+        sinks.plan_waves([RecordingSink("x", depends_on=["missing"])])
+
+
+def test_independent_sinks_run_concurrently(tmp_path):
+    barrier = threading.Barrier(2)
+    a, b = RecordingSink("a", barrier=barrier), RecordingSink("b", barrier=barrier)
+    results = sinks.run_sinks([a, b], make_batch(tmp_path))
+    assert {r.status for r in results.values()} == {"ok"}
+
+
+def test_dependant_sees_output_of_earlier_wave(tmp_path):
+    a, b = RecordingSink("a"), RecordingSink("b", depends_on=["a"])
+    results = sinks.run_sinks([a, b], make_batch(tmp_path))
+    assert b.seen_outputs == {"a": "a-output"}
+    assert results["b"].rows == 1
+
+
+def test_optional_failure_is_isolated(tmp_path):
+    ok, broken = RecordingSink("ok"), RecordingSink("broken", fail=True, required=False)
+    dependant = RecordingSink("dependant", depends_on=["broken"], required=False)
+    results = sinks.run_sinks([ok, broken, dependant], make_batch(tmp_path))
+    assert results["ok"].status == "ok"
+    assert results["broken"].status == "failed"
+    assert results["dependant"].status == "skipped"
+
+
+def test_required_failure_raises_after_other_sinks_finish(tmp_path):
+    ok, broken = RecordingSink("ok"), RecordingSink("broken", fail=True)
+    with pytest.raises(sinks.SinkError, match="broken") as excinfo:
+        sinks.run_sinks([ok, broken], make_batch(tmp_path))
+    assert isinstance(excinfo.value.__cause__, RuntimeError)
+    assert ok.seen_outputs is not None
+
+
+def test_csv_then_mysql_sink(tmp_path, monkeypatch):
+    loaded = {}
+
+    def fake_load(csv_path, table, db_config, replace=False):
+        loaded["path"], loaded["table"], loaded["replace"] = csv_path, table, replace
+        return 1
+
+    monkeypatch.setattr(load, "load_csv_to_mysql", fake_load)
+    results = sinks.run_sinks(sinks.build_sinks({}), make_batch(tmp_path))
+    csv_path = tmp_path / "data" / "processed" / "rates_2025-06-22.csv"
+    assert results["csv"].output == csv_path
+    assert csv_path.exists()
+    assert loaded == {"path": csv_path, "table": "rates", "replace": False}
+    assert results["mysql"].rows == 1
+
+
+def test_csv_sink_with_no_matching_currencies_writes_header(tmp_path):
+    rows, path = sinks.CsvSink("csv", currencies=["XXX"]).write(make_batch(tmp_path))
+    assert rows == 0
+    assert path.read_text().splitlines() == ["base_code,target_code,rate"]
+
+
+def test_sink_currencies_option_narrows_rows(tmp_path):
+    batch = make_batch(tmp_path)
+    batch.rows.append({"base_code": "USD", "target_code": "JPY", "rate": 150.0})
+    sink = sinks.CsvSink("majors", directory="out", currencies=["jpy"])
+    rows, path = sink.write(batch)
+    assert rows == 1
+    assert "JPY" in path.read_text() and "EUR" not in path.read_text()
+    assert sinks.CsvSink("all").rows_for(batch) is batch.rows
+
+
+def test_row_loader_runs_only_database_sinks(tmp_path, monkeypatch):
+    import compact_schema
+
+    loaded = []
+
+    def fake_load(csv_path, table, db_config, replace=False):
+        loaded.append(("mysql", csv_path.read_bytes().count(b"\n") - 1, replace))
+        assert tmp_path not in csv_path.parents
+        return 1
+
+    monkeypatch.setattr(load, "load_csv_to_mysql", fake_load)
+    monkeypatch.setattr(
+        compact_schema, "load_rows_compact", lambda rows, *args: loaded.append(("compact", len(rows))) or len(rows)
+    )
+    cfg = {
+        "sinks": {
+            "outputs": [
+                {"name": "majors", "type": "csv", "directory": "majors", "currencies": ["EUR"]},
+                {"name": "csv", "type": "csv"},
+                {"name": "mysql", "type": "mysql"},
+                {"name": "compact", "type": "mysql_compact"},
+            ]
+        }
+    }
+    loader = sinks.RowLoader(cfg, {"table": "rates"}, tmp_path, replace=True)
+    assert [sink.name for sink in loader.sinks] == ["csv", "mysql", "compact"]
+    assert loader(list(ROWS)) == 2
+    assert sorted(loaded) == [("compact", 1), ("mysql", 1, True)]
+    assert list(tmp_path.iterdir()) == []
+
+    monkeypatch.setattr(load, "loaded_days", lambda table, db_config, base, first, last: {first, last})
+    monkeypatch.setattr(compact_schema, "loaded_days", lambda db_config, base, first, last, *tables: {first})
+    assert loader.loaded_days("USD", date(2025, 6, 21), date(2025, 6, 23)) == {date(2025, 6, 21)}
+
+    with pytest.raises(ValueError, match="No database sink"):
+        sinks.RowLoader({"sinks": {"outputs": [{"name": "csv", "type": "csv"}]}}, {}, tmp_path)
@@ -103,3 +103,90 @@ def test_notify_failure(fake_client_and_date, tmp_path):
     # Expect failure message then file upload
     assert fake_client_and_date.posts[-1] == ("#chan", ":x: ETL *failed* for 2099-12-31 with error: oops")
     assert fake_client_and_date.uploads[-1][1] == str(log)
+
+
+def test_read_log_tail_starts_at_line_boundary(tmp_path):
+    log = tmp_path / "d.log"
+    log.write_bytes(b"first line\nsecond line\nthird line\n")
+    assert su.read_log_tail(log, max_bytes=15) == b"third line\n"
+    assert su.read_log_tail(log) == log.read_bytes()
+
+
+def test_upload_log_tail_is_gzipped(fake_client_and_date, tmp_path):
+    import gzip
+
+    log = tmp_path / "d.log"
+    log.write_text("line\n" * 10)
+    su.upload_log_tail(log, "#chan")
+    channel, payload, title = fake_client_and_date.uploads[-1]
+    assert channel == "#chan"
+    assert gzip.decompress(payload) == log.read_bytes()
+    assert "d.log" in title
+
+
+def test_notifier_coalesces_events(fake_client_and_date):
+    notifier = su.SlackNotifier("#chan", timeout=5)
+    notifier.add_event("first")
+    notifier.add_event("second")
+    assert notifier.close() is True
+    assert fake_client_and_date.posts == [("#chan", "first\nsecond")]
+    assert fake_client_and_date.uploads == []
+
+
+def test_notifier_uploads_log_tail_on_failure(fake_client_and_date, tmp_path):
+    log = tmp_path / "d.log"
+    log.write_text("boom\n")
+    notifier = su.SlackNotifier("#chan", timeout=5)
+    notifier.add_event(su.failure_message("oops"))
+    notifier.attach_log_tail(log)
+    assert notifier.close() is True
+    assert fake_client_and_date.posts[-1] == ("#chan", ":x: ETL *failed* for 2099-12-31 with error: oops")
+    assert fake_client_and_date.uploads[-1][2].endswith("d.log")
+
+
+def test_notifier_gives_up_after_timeout(monkeypatch):
+    import threading
+    import time
+
+    release = threading.Event()
+
+    class HangingClient:
+        def chat_postMessage(self, **kwargs):
+            release.wait(5)
+
+    monkeypatch.setattr(su, "_get_client", lambda: HangingClient())
+    notifier = su.SlackNotifier("#chan", timeout=0.2)
+    notifier.add_event("hello")
+    start = time.monotonic()
+    assert notifier.close() is False
+    assert time.monotonic() - start < 1
+    release.set()
+
+
+def test_notifier_disabled_without_token(monkeypatch):
+    def no_token():
+        raise ValueError("BOT_TOKEN environment variable is not set")
+
+    monkeypatch.setattr(su, "_get_client", no_token)
+    notifier = su.SlackNotifier("#chan", timeout=1)
+    notifier.add_event("hello")
+    assert notifier.close() is False
+
+
+def test_notifier_reads_token_only_when_closed(monkeypatch, fake_client_and_date):
+    import time
+
+    environment_loaded = False
+
+    def get_client():
+        if not environment_loaded:
+            raise ValueError("BOT_TOKEN environment variable is not set")
+        return fake_client_and_date
+
+    monkeypatch.setattr(su, "_get_client", get_client)
+    notifier = su.SlackNotifier("#chan", timeout=5)
+    time.sleep(0.05)  # give the worker a chance to run ahead of the pipeline
+    environment_loaded = True
+    notifier.add_event("hello")
+    assert notifier.close() is True
+    assert fake_client_and_date.posts == [("#chan", "hello")]
@@ -454,3 +454,17 @@ def test_various_rate_values(rate_value):
 
     assert len(result) == 1
     assert result[0]["rate"] == rate_value
+
+
+def test_target_currencies_are_kept_in_order(caplog):
+    raw_data = {
+        "base_code": "USD",
+        "time_last_update_utc": "Wed, 23 Jun 2025 10:00:00 +0000",
+        "time_next_update_utc": "Thu, 24 Jun 2025 10:00:00 +0000",
+        "time_last_update_unix": 1750809600,
+        "time_next_update_unix": 1750896000,
+        "conversion_rates": {"EUR": 0.8454, "GBP": 0.7312, "JPY": 149.56},
+    }
+    result = transform_rates(raw_data, ["JPY", "EUR", "CHF"])
+    assert [row["target_code"] for row in result] == ["JPY", "EUR"]
+    assert "CHF" in caplog.text
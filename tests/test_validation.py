@@ -0,0 +1,149 @@
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# Ensure we import the version under src/
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root / "src"))
+
+import rolling_stats
+import validation as val
+
+
+def row(target, rate, base="USD"):
+    return {"base_code": base, "target_code": target, "rate": rate, "time_last_update_unix": 1_750_000_000}
+
+
+def make_history():
+    rng = np.random.default_rng(0)
+    return val.History(
+        {
+            ("USD", "USD"): [1.0] * 30,
+            ("USD", "EUR"): list(0.9 * np.exp(rng.normal(0, 0.003, 30))),
+            ("USD", "JPY"): list(150 * np.exp(rng.normal(0, 0.003, 30))),
+            ("USD", "GBP"): [0.8, 0.801],
+        }
+    )
+
+
+def test_clean_snapshot_is_accepted():
+    rows = [row("USD", 1.0), row("EUR", 0.9), row("JPY", 150.2), row("GBP", 0.802)]
+    report = val.validate_snapshot(rows, make_history())
+    assert report.accepted == rows
+    assert report.flagged == []
+    assert report.new_codes == []
+    assert report.missing_codes == []
+
+
+def test_thousandfold_rate_is_flagged_by_z_and_ratio():
+    rows = [row("USD", 1.0), row("EUR", 900.0), row("JPY", 150.0), row("GBP", 0.8)]
+    report = val.validate_snapshot(rows, make_history())
+    assert [r["target_code"] for r in report.flagged] == ["EUR"]
+    assert "z-score" in report.flagged[0]["reasons"]
+    assert "x the last rate" in report.flagged[0]["reasons"]
+
+
+def test_short_history_only_uses_ratio_bounds():
+    # GBP has two observations: a 5% move is not a z-score outlier, a 20x move is a ratio outlier
+    report = val.validate_snapshot([row("GBP", 0.84)], make_history())
+    assert report.flagged == []
+    report = val.validate_snapshot([row("GBP", 16.0)], make_history())
+    assert report.flagged[0]["reasons"] == "19.98x the last rate 0.801"
+
+
+def test_non_positive_and_nan_rates_are_flagged():
+    report = val.validate_snapshot([row("EUR", 0.0), row("JPY", float("nan"))], make_history())
+    assert len(report.flagged) == 2
+    assert all("positive" in r["reasons"] for r in report.flagged)
+
+
+def test_new_and_missing_codes():
+    report = val.validate_snapshot([row("USD", 1.0), row("EUR", 0.9), row("CHF", 0.88)], make_history())
+    assert report.new_codes == ["CHF"]
+    assert report.missing_codes == ["GBP", "JPY"]
+    assert row("CHF", 0.88) in report.accepted
+
+
+def test_missing_codes_respect_target_currencies(tmp_path):
+    rows = [row("USD", 1.0), row("EUR", 0.9)]
+    report = val.validate_snapshot(rows, make_history(), currencies=["USD", "EUR", "GBP"])
+    assert report.missing_codes == ["GBP"]
+    # JPY and GBP are outside the projection, so nothing counts as missing
+    report = val.apply_validation(rows, make_history(), "quarantine", tmp_path, "q.csv", currencies=["USD", "EUR"])
+    assert report.missing_codes == []
+
+
+def test_empty_history_accepts_positive_rates():
+    report = val.validate_snapshot([row("EUR", 0.9)], val.History({}))
+    assert report.accepted == [row("EUR", 0.9)]
+    assert report.new_codes == ["EUR"]
+
+
+def test_apply_quarantine_writes_flagged_rows(tmp_path):
+    rows = [row("USD", 1.0), row("EUR", 900.0), row("JPY", 150.0), row("GBP", 0.8)]
+    report = val.apply_validation(rows, make_history(), "quarantine", tmp_path, "q.csv")
+    assert [r["target_code"] for r in report.accepted] == ["USD", "JPY", "GBP"]
+    assert report.quarantine_path == tmp_path / "q.csv"
+    assert "EUR" in report.quarantine_path.read_text()
+
+
+def test_apply_flag_loads_everything(tmp_path):
+    rows = [row("USD", 1.0), row("EUR", 900.0), row("JPY", 150.0), row("GBP", 0.8)]
+    report = val.apply_validation(rows, make_history(), "flag", tmp_path, "q.csv")
+    assert report.accepted == rows
+    assert len(report.flagged) == 1
+
+
+def test_apply_fail_raises(tmp_path):
+    rows = [row("USD", 1.0), row("EUR", 900.0), row("JPY", 150.0), row("GBP", 0.8)]
+    with pytest.raises(val.ValidationError):
+        val.apply_validation(rows, make_history(), "fail", tmp_path, "q.csv")
+
+
+def test_too_many_missing_codes_raises(tmp_path):
+    with pytest.raises(val.ValidationError, match="missing"):
+        val.apply_validation([row("USD", 1.0)], make_history(), "quarantine", tmp_path, "q.csv")
+
+
+def test_history_from_rolling_stats(tmp_path):
+    state = tmp_path / "rolling.json"
+    stats = rolling_stats.RollingStats((3,))
+    stats.update_rows([{**row("EUR", r), "time_last_update_unix": i} for i, r in enumerate([0.9, 0.91, 0.92])])
+    stats.save(state)
+    history = val.History.from_rolling_stats(state, (3,))
+    assert history.keys == [("USD", "EUR")]
+    assert history.rates[0].tolist() == [0.9, 0.91, 0.92]
+
+
+def test_years_of_history_validates_quickly():
+    rng = np.random.default_rng(1)
+    codes = [f"C{i:03d}" for i in range(170)]
+    history = val.History({("USD", c): list(np.exp(rng.normal(0, 0.01, 365 * 5))) for c in codes})
+    rows = [row(c, 1.0) for c in codes]
+    start = time.perf_counter()
+    report = val.validate_snapshot(rows, history)
+    assert time.perf_counter() - start < 0.5
+    assert len(report.accepted) == len(codes)
+
+
+def test_lasting_level_shift_is_accepted_after_rebaseline(tmp_path):
+    state = tmp_path / "rolling.json"
+    base_ts = 1_750_000_000
+
+    def snapshot(ts, ars):
+        return [{**row("EUR", 0.9), "time_last_update_unix": ts}, {**row("ARS", ars), "time_last_update_unix": ts}]
+
+    for i in range(30):
+        rolling_stats.update_statistics(snapshot(base_ts + i, 1000 * (1 + 0.001 * i)), state, (7, 30))
+
+    flagged_days = []
+    for day in range(1, 6):
+        history = val.History.from_rolling_stats(state, (7, 30))
+        report = val.apply_validation(snapshot(base_ts + 100 + day, 2000 + day), history, quarantine_dir=tmp_path)
+        flagged_days += [day] * len(report.flagged)
+        rolling_stats.update_statistics(report.accepted, state, (7, 30), report.flagged, rebaseline_after=3)
+    # Quarantined until the third consistent reading re-baselines the pair
+    assert flagged_days == [1, 2, 3]
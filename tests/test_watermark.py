@@ -0,0 +1,159 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+# Ensure we import the version under src/
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root / "src"))
+
+import db_utilities
+import watermark as wm
+
+
+class FakeCursor:
+    def __init__(self, db):
+        self.db = db
+
+    def execute(self, sql, params=None):
+        self.db.executed.append((sql, params))
+        if "CREATE TABLE" in sql.upper():
+            self.db.has_table = True
+            return
+        if not self.db.has_table:
+            raise MissingTable()
+        if "SELECT" in sql.upper():
+            value = self.db.rows.get(params[0])
+            self.result = (value,) if value is not None else None
+        else:
+            base, ts = params
+            self.db.rows[base] = max(ts, self.db.rows.get(base, ts))
+
+    def fetchone(self):
+        return self.result
+
+    def close(self):
+        pass
+
+
+class MissingTable(Exception):
+    errno = wm.NO_SUCH_TABLE
+
+
+class FakeDB:
+    def __init__(self, rows=None, has_table=True):
+        self.rows = dict(rows or {})
+        self.has_table = has_table
+        self.executed = []
+        self.connections = 0
+
+    def connect(self, cfg):
+        self.connections += 1
+        return self
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    db = FakeDB()
+    monkeypatch.setattr(db_utilities, "connect_to_mysql", db.connect)
+    monkeypatch.setattr(db_utilities, "connect_to_mysql_once", db.connect)
+    return db
+
+
+@pytest.fixture
+def state(tmp_path):
+    return tmp_path / "state" / "watermarks.json"
+
+
+RAW = {"base_code": "USD", "time_last_update_unix": 200}
+
+
+def test_new_when_no_watermark(fake_db, state):
+    assert wm.has_new_data(RAW, {}, state) is True
+
+
+def test_local_mirror_short_circuits_without_db(fake_db, state):
+    wm.write_local_watermark("USD", 200, state)
+    assert wm.has_new_data(RAW, {}, state) is False
+    assert fake_db.connections == 0
+
+
+def test_db_watermark_refreshes_local_mirror(fake_db, state):
+    fake_db.rows["USD"] = 200
+    assert wm.has_new_data(RAW, {}, state) is False
+    assert json.loads(state.read_text())["USD"]["time_last_update_unix"] == 200
+
+
+def test_newer_payload_is_new(fake_db, state):
+    wm.write_local_watermark("USD", 100, state)
+    fake_db.rows["USD"] = 100
+    assert wm.has_new_data(RAW, {}, state) is True
+
+
+def test_db_failure_falls_back_to_local(monkeypatch, state):
+    attempts = []
+
+    def broken(cfg):
+        attempts.append(cfg)
+        raise ConnectionError("db down")
+
+    monkeypatch.setattr(db_utilities, "connect_to_mysql_once", broken)
+    monkeypatch.setattr(db_utilities, "connect_to_mysql", lambda cfg: pytest.fail("read should not retry"))
+    assert wm.get_watermark("USD", {}, state) is None
+    assert len(attempts) == 1
+
+
+def test_missing_table_is_created_on_first_write(fake_db, state):
+    fake_db.has_table = False
+    assert wm.get_watermark("USD", {}, state) is None
+    wm.record_watermark("USD", 300, {}, state)
+    assert fake_db.has_table
+    assert "CREATE TABLE IF NOT EXISTS etl_watermarks" in fake_db.executed[-2][0]
+    assert fake_db.rows["USD"] == 300
+
+
+def test_db_write_failure_keeps_local_mirror(monkeypatch, state):
+    def broken(cfg):
+        raise ConnectionError("db down")
+
+    monkeypatch.setattr(db_utilities, "connect_to_mysql", broken)
+    wm.record_watermark("USD", 300, {}, state)
+    assert wm.read_local_watermarks(state)["USD"]["time_last_update_unix"] == 300
+
+
+def test_record_watermark_writes_db_and_mirror(fake_db, state):
+    wm.record_watermark("USD", 300, {}, state)
+    assert fake_db.rows["USD"] == 300
+    assert "ON DUPLICATE KEY UPDATE" in fake_db.executed[-1][0]
+    assert wm.read_local_watermarks(state)["USD"]["time_last_update_unix"] == 300
+
+
+def test_forced_reload_of_older_payload_keeps_watermarks(fake_db, state):
+    wm.record_watermark("USD", 300, {}, state)
+    wm.record_watermark("USD", 200, {}, state)
+    assert fake_db.rows["USD"] == 300
+    assert wm.read_local_watermarks(state)["USD"]["time_last_update_unix"] == 300
+
+
+def test_record_watermark_without_db(state):
+    wm.record_watermark("EUR", 5, None, state)
+    assert wm.get_watermark("EUR", None, state) == 5
+
+
+def test_corrupt_state_file_is_ignored(state):
+    state.parent.mkdir(parents=True)
+    state.write_text("{not json")
+    assert wm.read_local_watermarks(state) == {}